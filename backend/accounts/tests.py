@@ -1,3 +1,129 @@
-from django.test import TestCase
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from saas import authentication, fake_key_server
+from saas.fake_key_server import FakeKeyServer, make_signing_key
+from saas.token_verifier import FirebaseTokenVerifier, InvalidTokenError, PublicKeyCache
+
+PROJECT_ID = 'test-project'
+
+
+def make_token(private_key, kid, **overrides):
+    return fake_key_server.make_token(private_key, kid, PROJECT_ID, **overrides)
+
+
+class FirebaseTokenVerifierTests(SimpleTestCase):
+    def setUp(self):
+        self.server = FakeKeyServer()
+        self.private_key = self.server.add_key('key-1')
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        self.verifier = FirebaseTokenVerifier(PROJECT_ID, key_cache=PublicKeyCache(url=self.server.url))
+
+    def test_valid_token_is_decoded(self):
+        decoded = self.verifier.verify(make_token(self.private_key, 'key-1'))
+        self.assertEqual(decoded['uid'], 'user-123')
+        self.assertEqual(decoded['email'], 'owner@example.com')
+
+    def test_keys_are_fetched_once(self):
+        for i in range(5):
+            self.verifier.verify(make_token(self.private_key, 'key-1', sub=f'user-{i}'))
+        self.assertEqual(self.server.hits, 1)
+
+    def test_repeat_token_skips_signature_check(self):
+        token = make_token(self.private_key, 'key-1')
+        self.verifier.verify(token)
+        with mock.patch('saas.token_verifier.jwt.decode', side_effect=AssertionError('decoded twice')):
+            self.assertEqual(self.verifier.verify(token)['uid'], 'user-123')
+
+    async def test_averify_matches_verify(self):
+        token = make_token(self.private_key, 'key-1')
+        decoded = await self.verifier.averify(token)
+        self.assertEqual(decoded['uid'], 'user-123')
+        with mock.patch('saas.token_verifier.jwt.decode', side_effect=AssertionError('decoded twice')):
+            self.assertEqual((await self.verifier.averify(token))['uid'], 'user-123')
+
+    def test_rejects_wrong_audience(self):
+        with self.assertRaises(InvalidTokenError):
+            self.verifier.verify(make_token(self.private_key, 'key-1', aud='other-project'))
+
+    def test_rejects_expired_token(self):
+        now = int(time.time())
+        token = make_token(self.private_key, 'key-1', iat=now - 7200, exp=now - 3600)
+        with self.assertRaises(InvalidTokenError):
+            self.verifier.verify(token)
+
+    def test_rejects_token_signed_by_other_key(self):
+        other_key, _ = make_signing_key('key-1')
+        with self.assertRaises(InvalidTokenError):
+            self.verifier.verify(make_token(other_key, 'key-1'))
+
+    def test_unknown_kid_triggers_refresh(self):
+        self.verifier.verify(make_token(self.private_key, 'key-1'))
+        rotated_key = self.server.add_key('key-2')
+        self.verifier.key_cache.min_refresh_interval = 0
+
+        decoded = self.verifier.verify(make_token(rotated_key, 'key-2'))
+        self.assertEqual(decoded['uid'], 'user-123')
+        self.assertEqual(self.server.hits, 2)
+
+
+class FirebaseAuthenticationUserCacheTests(TestCase):
+    def setUp(self):
+        authentication.user_cache.clear()
+        cache.clear()
+        self.factory = RequestFactory()
+        self.claims = {'uid': 'user-123', 'email': 'owner@example.com', 'name': 'Jane Doe'}
+        patcher = mock.patch.object(authentication.token_verifier, 'verify', side_effect=lambda token: dict(self.claims))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def authenticate(self):
+        request = self.factory.get('/api/products/', HTTP_AUTHORIZATION='Bearer token')
+        user, _ = authentication.FirebaseAuthentication().authenticate(request)
+        return user
+
+    def auth_user_queries(self, queries):
+        return [q for q in queries if 'auth_user' in q['sql']]
+
+    def test_first_request_creates_user(self):
+        user = self.authenticate()
+        self.assertEqual(user.username, 'user-123')
+        self.assertEqual(user.first_name, 'Jane')
+        self.assertTrue(User.objects.filter(username='user-123').exists())
+
+    def test_repeat_requests_skip_auth_user(self):
+        self.authenticate()
+        with CaptureQueriesContext(connection) as ctx:
+            for _ in range(5):
+                self.assertEqual(self.authenticate().username, 'user-123')
+        self.assertEqual(self.auth_user_queries(ctx.captured_queries), [])
+
+    def test_shared_cache_serves_other_processes(self):
+        self.authenticate()
+        authentication.user_cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            self.authenticate()
+        self.assertEqual(self.auth_user_queries(ctx.captured_queries), [])
+
+    def test_admin_claim_change_is_synced_once(self):
+        self.authenticate()
+        self.claims['admin'] = True
+        self.assertTrue(self.authenticate().is_superuser)
+        self.assertTrue(User.objects.get(username='user-123').is_staff)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.authenticate()
+        self.assertEqual(self.auth_user_queries(ctx.captured_queries), [])
+
+    def test_user_save_invalidates_cache(self):
+        self.authenticate()
+        User.objects.get(username='user-123').delete()
+        User.objects.create(username='user-123', email='new@example.com')
+        self.assertEqual(self.authenticate().email, 'new@example.com')
@@ -0,0 +1,138 @@
+# companies/analytics.py
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import TruncDate
+
+from .models import DailySales, Order, OrderItem, ProductDailySales
+
+ROLLUP_BATCH_SIZE = 1000
+
+
+def _upsert_increments(model, key_fields, value_fields, rows):
+    """Add ``rows`` onto the rollup table in INSERT ... ON CONFLICT statements.
+
+    ``bulk_create(update_conflicts=True)`` can only overwrite columns, but
+    rollups must be incremented, so the statement is written by hand. The
+    syntax is shared by PostgreSQL and SQLite.
+    """
+    if not rows:
+        return
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    columns = [model._meta.get_field(name).column for name in key_fields + value_fields]
+    placeholders = '(' + ', '.join(['%s'] * len(columns)) + ')'
+    updates = ', '.join(
+        f'{qn(column)} = {table}.{qn(column)} + excluded.{qn(column)}'
+        for column in columns[len(key_fields):]
+    )
+    conflict = ', '.join(qn(column) for column in columns[:len(key_fields)])
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), ROLLUP_BATCH_SIZE):
+            batch = rows[start:start + ROLLUP_BATCH_SIZE]
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(qn(column) for column in columns)}) "
+                f"VALUES {', '.join([placeholders] * len(batch))} "
+                f"ON CONFLICT ({conflict}) DO UPDATE SET {updates}",
+                [value for row in batch for value in row],
+            )
+
+
+def apply_orders_to_rollups(orders, sign=1):
+    """Add (``sign=1``) or subtract (``sign=-1``) ``orders`` from the rollups.
+
+    ``orders`` is an Order queryset. Orders are bucketed by the local date
+    they were created on. Costs two aggregate queries and two upserts no
+    matter how many orders are passed.
+    """
+    money = DecimalField(max_digits=14, decimal_places=2)
+    items = OrderItem.objects.filter(order__in=orders)
+
+    product_rows = list(
+        items
+        .annotate(day=TruncDate('order__created_at'))
+        .values('order__user_id', 'product_id', 'day')
+        .annotate(sold=Sum('quantity'), amount=Sum(F('price') * F('quantity'), output_field=money))
+        .order_by()
+    )
+    order_rows = list(
+        orders
+        .annotate(day=TruncDate('created_at'))
+        .values('user_id', 'day')
+        .annotate(orders_count=Count('pk'), amount=Sum('total_amount', output_field=money))
+        .order_by()
+    )
+
+    items_sold = {}
+    for row in product_rows:
+        key = (row['order__user_id'], row['day'])
+        items_sold[key] = items_sold.get(key, 0) + row['sold']
+
+    _upsert_increments(
+        DailySales, ['user', 'date'], ['orders_count', 'items_sold', 'revenue'],
+        [
+            (
+                row['user_id'], row['day'], sign * row['orders_count'],
+                sign * items_sold.get((row['user_id'], row['day']), 0), sign * (row['amount'] or 0),
+            )
+            for row in order_rows
+        ],
+    )
+    _upsert_increments(
+        ProductDailySales, ['user', 'product', 'date'], ['quantity', 'revenue'],
+        [
+            (row['order__user_id'], row['product_id'], row['day'], sign * row['sold'], sign * row['amount'])
+            for row in product_rows
+        ],
+    )
+
+
+def apply_status_change(orders, old_status, new_status):
+    """Update the rollups for ``orders`` moving from ``old_status`` to ``new_status``.
+
+    Only paid orders count towards sales.
+    """
+    if old_status != 'paid' and new_status == 'paid':
+        apply_orders_to_rollups(orders, 1)
+    elif old_status == 'paid' and new_status != 'paid':
+        apply_orders_to_rollups(orders, -1)
+
+
+def transition_orders(order_ids, new_status):
+    """Set the status of many orders and keep the rollups in step.
+
+    The orders are locked (in id order, so concurrent callers cannot
+    deadlock) while their current status is read. Returns the ids whose
+    status changed.
+    """
+    with transaction.atomic():
+        current = list(
+            Order.objects.select_for_update().filter(pk__in=order_ids).order_by('pk').values_list('pk', 'status')
+        )
+        changed = [pk for pk, status in current if status != new_status]
+        if not changed:
+            return []
+
+        by_status = {}
+        for pk, status in current:
+            if status != new_status:
+                by_status.setdefault(status, []).append(pk)
+        Order.objects.filter(pk__in=changed).update(status=new_status)
+        for old_status, pks in by_status.items():
+            apply_status_change(Order.objects.filter(pk__in=pks), old_status, new_status)
+    return changed
+
+
+def rebuild_sales_rollups(start, end, user=None):
+    """Recompute the rollups of the dates ``start``..``end`` (inclusive)."""
+    with transaction.atomic():
+        tenant_rows = DailySales.objects.filter(date__range=(start, end))
+        product_rows = ProductDailySales.objects.filter(date__range=(start, end))
+        orders = Order.objects.filter(status='paid', created_at__date__range=(start, end))
+        if user is not None:
+            tenant_rows = tenant_rows.filter(user=user)
+            product_rows = product_rows.filter(user=user)
+            orders = orders.filter(user=user)
+        tenant_rows.delete()
+        product_rows.delete()
+        apply_orders_to_rollups(orders, 1)
@@ -0,0 +1,183 @@
+# companies/bulk.py
+from django.db import connection, transaction
+from django.db.models import DecimalField, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Round
+from django.utils import timezone
+
+from .cache import invalidate_catalog
+from .filters import filter_products
+from .models import Category, Product
+from .search import refresh_search_index, remove_from_search_index
+from .signals import bulk_catalog_write, recount_product_counts, refresh_primary_categories
+
+ProductCategory = Product.categories.through
+
+BULK_BATCH_SIZE = 1000
+
+
+def resolve_category_ids(user, names):
+    """Map category names to ids, creating the missing ones.
+
+    One SELECT for the existing names, one INSERT for the rest and, only if
+    something had to be created, one more SELECT for the new ids.
+    """
+    names = set(names)
+    if not names:
+        return {}
+    ids = dict(Category.objects.filter(user=user, name__in=names).values_list('name', 'id'))
+    missing = names - set(ids)
+    if missing:
+        # ignore_conflicts: a concurrent request may create the same names
+        Category.objects.bulk_create(
+            [Category(user=user, name=name, description=f'{name} products') for name in missing],
+            ignore_conflicts=True,
+        )
+        ids.update(Category.objects.filter(user=user, name__in=missing).values_list('name', 'id'))
+    return ids
+
+
+def import_products(user, rows):
+    """Insert already validated products in a single transaction.
+
+    ``rows`` is a list of ``(fields, category_names)`` pairs as returned by
+    ``companies.validators``. Returns the created products.
+    """
+    with transaction.atomic():
+        all_names = {name for _, names in rows for name in names}
+        category_ids = resolve_category_ids(user, all_names)
+
+        products = Product.objects.bulk_create(
+            [
+                Product(
+                    user=user,
+                    primary_category_id=category_ids[names[0]] if names else None,
+                    **fields
+                )
+                for fields, names in rows
+            ],
+            batch_size=BULK_BATCH_SIZE,
+        )
+
+        links = [
+            ProductCategory(product_id=product.pk, category_id=category_ids[name])
+            for product, (_, names) in zip(products, rows)
+            for name in names
+        ]
+        ProductCategory.objects.bulk_create(links, batch_size=BULK_BATCH_SIZE)
+
+        # Bulk inserts bypass m2m_changed, so fix up the counters here
+        recount_product_counts(list(category_ids.values()))
+        refresh_search_index([product.pk for product in products])
+        invalidate_catalog(user.id)
+
+    return products
+
+
+def select_products(user, ids=None, filters=None):
+    """Products of ``user`` chosen by id list and/or filters parsed by
+    ``companies.filters.parse_filter_object``"""
+    products = Product.objects.filter(user=user)
+    if ids is not None:
+        products = products.filter(pk__in=ids)
+    return filter_products(products, filters or {})
+
+
+def _chunks(ids, size=BULK_BATCH_SIZE):
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def link_categories(products, category_ids):
+    """Link every product of a queryset to each of ``category_ids``.
+
+    One INSERT ... SELECT whatever the number of links; existing links are
+    kept.
+    """
+    category_ids = [int(pk) for pk in category_ids]
+    if not category_ids:
+        return
+    qn = connection.ops.quote_name
+    selected, params = products.values('pk').query.get_compiler(connection=connection).as_sql()
+    # The WHERE lets SQLite tell ON CONFLICT apart from a join constraint
+    sql = (
+        f"INSERT INTO {qn(ProductCategory._meta.db_table)} (product_id, category_id) "
+        f"SELECT selected.pk, c.id FROM ({selected}) selected, {qn(Category._meta.db_table)} c "
+        f"WHERE c.id IN ({', '.join(['%s'] * len(category_ids))}) "
+        f"ON CONFLICT (product_id, category_id) DO NOTHING"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*params, *category_ids])
+
+
+def batch_update_products(user, products, patch):
+    """Apply a cleaned batch patch.
+
+    The selected ids are read once, since the patch may change the fields
+    that selected them, then every statement runs per chunk of
+    BULK_BATCH_SIZE ids. Returns the number of products matched.
+    """
+    with transaction.atomic(), bulk_catalog_write():
+        product_ids = list(products.values_list('pk', flat=True))
+        if not product_ids:
+            return 0
+
+        updates = {}
+        if 'price' in patch:
+            updates['price'] = patch['price']
+        if 'price_percent' in patch:
+            factor = 1 + patch['price_percent'] / 100
+            updates['price'] = Round(F('price') * Value(factor, output_field=DecimalField()), 2)
+        for field in ('is_available', 'badge'):
+            if field in patch:
+                updates[field] = patch[field]
+        updates['updated_at'] = timezone.now()
+
+        added_ids = []
+        if patch.get('add_categories'):
+            added_ids = list(resolve_category_ids(user, patch['add_categories']).values())
+        removed_ids = []
+        if patch.get('remove_categories'):
+            removed_ids = list(
+                Category.objects.filter(user=user, name__in=patch['remove_categories']).values_list('pk', flat=True)
+            )
+        touched_categories = set(added_ids) | set(removed_ids)
+
+        for chunk in _chunks(product_ids):
+            selected = Product.objects.filter(pk__in=chunk)
+            selected.update(**updates)
+            if added_ids:
+                link_categories(selected, added_ids)
+            if removed_ids:
+                ProductCategory.objects.filter(product_id__in=chunk, category_id__in=removed_ids).delete()
+            if touched_categories:
+                refresh_primary_categories(
+                    selected.filter(
+                        Q(primary_category__isnull=True) | ~Q(primary_category__in=Subquery(
+                            ProductCategory.objects.filter(product_id=OuterRef('pk')).values('category_id')
+                        ))
+                    )
+                )
+                refresh_search_index(chunk)
+
+        if touched_categories:
+            recount_product_counts(list(touched_categories))
+        invalidate_catalog(user.id)
+
+    return len(product_ids)
+
+
+def batch_delete_products(user, products):
+    """Delete many products, fixing counters in one statement afterwards"""
+    with transaction.atomic(), bulk_catalog_write():
+        selected = Product.objects.filter(pk__in=products.values('pk'))
+        category_ids = list(
+            ProductCategory.objects.filter(product__in=selected).values_list('category_id', flat=True).distinct()
+        )
+        remove_from_search_index(selected)
+        deleted = selected.delete()[1].get(Product._meta.label, 0)
+        if not deleted:
+            return 0
+        recount_product_counts(category_ids)
+        invalidate_catalog(user.id)
+
+    return deleted
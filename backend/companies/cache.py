@@ -0,0 +1,186 @@
+# companies/cache.py
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from django.dispatch import Signal
+
+from .models import Category, Product, StoreConfig
+
+# Sent with ``user_id`` once a tenant's catalog version has been bumped,
+# i.e. after the change committed.
+catalog_changed = Signal()
+
+METRIC_KEYS = {
+    'hits': 'catalog:metrics:hits',
+    'misses': 'catalog:metrics:misses',
+}
+
+
+def _version_key(user_id):
+    return f'catalog:version:{user_id}'
+
+
+def catalog_version(user_id):
+    """Current catalog version of a tenant.
+
+    Versions are seeded from the clock, so a flushed or evicted version key
+    can never bring back responses cached under an older number.
+    """
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def _modified_key(user_id):
+    return f'catalog:modified:{user_id}'
+
+
+def bump_catalog_version(user_id):
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), time.time_ns(), None)
+    cache.set(_modified_key(user_id), int(time.time()), None)
+    catalog_changed.send(sender=None, user_id=user_id)
+
+
+def catalog_last_modified(user_id):
+    """Epoch seconds of the tenant's last catalog change.
+
+    Recorded on every version bump; only when that entry is gone do we fall
+    back to the ``updated_at`` columns.
+    """
+    key = _modified_key(user_id)
+    modified = cache.get(key)
+    if modified is None:
+        latest = [
+            model.objects.filter(user_id=user_id).aggregate(latest=Max('updated_at'))['latest']
+            for model in (Product, Category, StoreConfig)
+        ]
+        latest = [dt for dt in latest if dt is not None]
+        modified = int(max(latest).timestamp()) if latest else 0
+        cache.add(key, modified, None)
+    return modified
+
+
+def invalidate_catalog(user_id):
+    """Bump the tenant's catalog version once the current transaction commits.
+
+    Bumping before the commit would let a concurrent reader cache the old
+    rows under the new version.
+    """
+    transaction.on_commit(lambda: bump_catalog_version(user_id))
+
+
+def _incr_metric(name):
+    key = METRIC_KEYS[name]
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def catalog_cache_metrics():
+    values = cache.get_many(METRIC_KEYS.values())
+    hits = values.get(METRIC_KEYS['hits'], 0)
+    misses = values.get(METRIC_KEYS['misses'], 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else None,
+    }
+
+
+def _catalog_key(user_id, version, name, params):
+    query = '&'.join(f'{k}={v}' for k, v in sorted((params or {}).items()))
+    digest = hashlib.sha1(query.encode('utf-8')).hexdigest()
+    return f'catalog:{user_id}:{version}:{name}:{digest}'
+
+
+def _etag(key):
+    return f'"{hashlib.sha1(key.encode("utf-8")).hexdigest()}"'
+
+
+def catalog_cache_key(user_id, name, params=None):
+    return _catalog_key(user_id, catalog_version(user_id), name, params)
+
+
+def catalog_etag(user_id, name, params=None):
+    return _etag(catalog_cache_key(user_id, name, params))
+
+
+def cached_catalog_response(user_id, name, params, build):
+    """Read-through cache for catalog payloads.
+
+    Returns ``(data, hit)``; ``build`` is only called on a miss.
+    """
+    key = catalog_cache_key(user_id, name, params)
+    data = cache.get(key)
+    if data is not None:
+        _incr_metric('hits')
+        return data, True
+
+    _incr_metric('misses')
+    data = build()
+    cache.set(key, data, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300))
+    return data, False
+
+
+# Async counterparts for the ASGI read path. They use the cache's native
+# async API and only fall back to a thread for database work.
+
+async def acatalog_version(user_id):
+    key = _version_key(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), None)
+        version = await cache.aget(key)
+    return version
+
+
+async def acatalog_last_modified(user_id):
+    modified = await cache.aget(_modified_key(user_id))
+    if modified is None:
+        modified = await sync_to_async(catalog_last_modified)(user_id)
+    return modified
+
+
+async def acatalog_cache_key(user_id, name, params=None):
+    return _catalog_key(user_id, await acatalog_version(user_id), name, params)
+
+
+async def acatalog_etag(user_id, name, params=None):
+    return _etag(await acatalog_cache_key(user_id, name, params))
+
+
+async def _aincr_metric(name):
+    key = METRIC_KEYS[name]
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 0, None)
+        await cache.aincr(key)
+
+
+async def acached_catalog_response(user_id, name, params, build):
+    """Async ``cached_catalog_response``; ``build`` is a coroutine function."""
+    key = await acatalog_cache_key(user_id, name, params)
+    data = await cache.aget(key)
+    if data is not None:
+        await _aincr_metric('hits')
+        return data, True
+
+    await _aincr_metric('misses')
+    data = await build()
+    await cache.aset(key, data, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300))
+    return data, False
@@ -0,0 +1,30 @@
+# companies/checks.py
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Backends whose entries other worker processes cannot see
+PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """The versioned catalog cache needs one cache shared by all workers.
+
+    With a per-process cache a write bumps the catalog version in one worker
+    only, and the others keep answering If-None-Match with 304 and serving
+    the old catalog (likewise for cached users, tenants and replica pins).
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend in PROCESS_LOCAL_CACHES and not getattr(settings, 'ALLOW_PROCESS_LOCAL_CACHE', False):
+        return [Error(
+            f'The default cache ({backend}) is not shared between processes.',
+            hint=(
+                'Configure a shared backend such as django.core.cache.backends.redis.RedisCache '
+                '(set REDIS_URL), or set ALLOW_PROCESS_LOCAL_CACHE = True for a single-process server.'
+            ),
+            id='companies.E001',
+        )]
+    return []
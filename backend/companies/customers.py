@@ -0,0 +1,100 @@
+# companies/customers.py
+import csv
+import io
+from itertools import islice
+
+from django.db import connection, transaction
+
+from .models import Customer
+from .validators import clean_customer_data
+
+UPSERT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+
+def iter_csv_rows(binary_file):
+    """Stream the rows of an uploaded or opened CSV file as dicts"""
+    return csv.DictReader(io.TextIOWrapper(binary_file, encoding='utf-8-sig', newline=''))
+
+
+def _chunks(iterable, size):
+    iterator = iter(enumerate(iterable, start=1))
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+UPSERT_FIELDS = ['user', 'name', 'email', 'phone', 'address']
+
+
+def _upsert_chunk(user, customers):
+    """Insert or update one chunk; returns (inserted, updated).
+
+    The INSERT itself reports the emails it added, so the split cannot be
+    skewed by a concurrent import the way a SELECT beforehand could. The
+    remaining rows then get one upsert.
+    """
+    qn = connection.ops.quote_name
+    columns = ', '.join(qn(Customer._meta.get_field(name).column) for name in UPSERT_FIELDS)
+    placeholders = ', '.join(['(' + ', '.join(['%s'] * len(UPSERT_FIELDS)) + ')'] * len(customers))
+    sql = (
+        f"INSERT INTO {qn(Customer._meta.db_table)} ({columns}) VALUES {placeholders} "
+        f"ON CONFLICT ({qn('user_id')}, {qn('email')}) DO NOTHING RETURNING {qn('email')}"
+    )
+    params = [
+        value
+        for customer in customers
+        for value in (user.id, customer.name, customer.email, customer.phone, customer.address)
+    ]
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            inserted = {email for (email,) in cursor.fetchall()}
+        existing = [customer for customer in customers if customer.email not in inserted]
+        if existing:
+            Customer.objects.bulk_create(
+                existing,
+                update_conflicts=True,
+                unique_fields=['user', 'email'],
+                update_fields=['name', 'phone', 'address'],
+            )
+    return len(inserted), len(existing)
+
+
+def upsert_customers(user, rows, chunk_size=UPSERT_CHUNK_SIZE):
+    """Insert or update customers by email, ``chunk_size`` rows per statement.
+
+    ``rows`` may be any iterable (e.g. ``iter_csv_rows``) and is consumed
+    lazily, so memory stays flat however long the input is. Invalid rows are
+    skipped and reported; when an email repeats within a chunk the last row
+    wins. Every chunk commits on its own.
+
+    Returns ``{'inserted', 'updated', 'rejected', 'errors'}``.
+    """
+    report = {'inserted': 0, 'updated': 0, 'rejected': 0, 'errors': []}
+
+    def reject(index, message):
+        report['rejected'] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({'row': index, 'error': message})
+
+    for chunk in _chunks(rows, chunk_size):
+        by_email = {}
+        for index, row in chunk:
+            try:
+                fields = clean_customer_data(row)
+            except ValueError as e:
+                reject(index, str(e))
+                continue
+            if fields['email'] in by_email:
+                reject(by_email[fields['email']][0], f'Superseded by row {index} with the same email')
+            by_email[fields['email']] = (index, Customer(user=user, **fields))
+
+        if by_email:
+            inserted, updated = _upsert_chunk(user, [customer for _, customer in by_email.values()])
+            report['inserted'] += inserted
+            report['updated'] += updated
+
+    return report
@@ -0,0 +1,218 @@
+# companies/filters.py
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count, Exists, OuterRef, Q
+
+from .models import Category, Product
+from .validators import BADGE_CHOICES
+
+ProductCategory = Product.categories.through
+
+# (min, max) price ranges reported by the price facet; max is exclusive
+PRICE_BUCKETS = [
+    (Decimal('0'), Decimal('25')),
+    (Decimal('25'), Decimal('50')),
+    (Decimal('50'), Decimal('100')),
+    (Decimal('100'), Decimal('250')),
+    (Decimal('250'), None),
+]
+
+# Minimum ratings reported by the rating facet
+RATING_THRESHOLDS = [4, 3, 2, 1]
+
+
+def _parse_decimal(value, name):
+    try:
+        number = Decimal(str(value))
+    except (TypeError, ValueError, InvalidOperation):
+        raise ValueError(f'Invalid {name}')
+    if not number.is_finite() or number < 0:
+        raise ValueError(f'Invalid {name}')
+    return number
+
+
+# Names accepted by parse_product_filters
+FILTER_NAMES = {'category', 'badge', 'min_price', 'max_price', 'is_available', 'min_rating'}
+
+
+def _values(params, name):
+    """Every value of ``name`` in a QueryDict, or in a JSON object where a
+    list stands for a repeated parameter"""
+    if hasattr(params, 'getlist'):
+        return params.getlist(name)
+    value = params.get(name)
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _parse_bool(value, name):
+    value = str(value).lower()
+    if value in ['true', '1', 'yes']:
+        return True
+    if value in ['false', '0', 'no']:
+        return False
+    raise ValueError(f'Invalid {name}')
+
+
+def parse_product_filters(query_params):
+    """Read the product list filters from the query string.
+
+    ``category`` and ``badge`` may be repeated (any of the values matches);
+    ``min_price``, ``max_price``, ``is_available`` and ``min_rating`` narrow
+    the list further. A JSON object is read the same way. Raises ValueError
+    with a user-facing message.
+    """
+    filters = {}
+
+    categories = sorted({str(name).strip() for name in _values(query_params, 'category') if str(name).strip()})
+    if categories:
+        filters['category'] = categories
+
+    badges = sorted({str(badge) for badge in _values(query_params, 'badge') if badge})
+    if badges:
+        unknown = set(badges) - set(BADGE_CHOICES)
+        if unknown:
+            raise ValueError(f'Invalid badge: {", ".join(sorted(unknown))}')
+        filters['badge'] = badges
+
+    for name in ('min_price', 'max_price'):
+        if query_params.get(name) not in (None, ''):
+            filters[name] = _parse_decimal(query_params.get(name), name)
+    if 'min_price' in filters and 'max_price' in filters and filters['min_price'] > filters['max_price']:
+        raise ValueError('min_price cannot be greater than max_price')
+
+    if query_params.get('is_available') not in (None, ''):
+        filters['is_available'] = _parse_bool(query_params.get('is_available'), 'is_available')
+
+    if query_params.get('min_rating') not in (None, ''):
+        try:
+            min_rating = float(query_params.get('min_rating'))
+        except (TypeError, ValueError):
+            raise ValueError('Invalid min_rating')
+        if not (0 <= min_rating <= 5):
+            raise ValueError('min_rating must be between 0 and 5')
+        filters['min_rating'] = min_rating
+
+    return filters
+
+
+def parse_filter_object(data):
+    """``parse_product_filters`` for a JSON object, e.g. the batch API's
+    ``filter``; unknown names are rejected rather than ignored"""
+    if not isinstance(data, dict):
+        raise ValueError('filter must be an object')
+    unknown = set(data) - FILTER_NAMES
+    if unknown:
+        raise ValueError(f'Unknown filter: {", ".join(sorted(unknown))}')
+    return parse_product_filters(data)
+
+
+def filter_cache_params(filters):
+    """Flat, stable representation of ``filters`` for catalog cache keys"""
+    return {
+        f'filter_{name}': ','.join(map(str, value)) if isinstance(value, list) else value
+        for name, value in filters.items()
+    }
+
+
+def _in_categories(category_filter):
+    return Exists(ProductCategory.objects.filter(product_id=OuterRef('pk'), category__name__in=category_filter))
+
+
+def product_filter_q(filters, exclude=None):
+    """Compile ``filters`` into one Q, leaving out the ``exclude`` dimension.
+
+    Every condition is a plain column comparison on ``product`` (or an
+    EXISTS on the link table), so they combine with the ``(user, ...)``
+    indexes instead of joining and de-duplicating.
+    """
+    q = Q()
+    if 'category' in filters and exclude != 'category':
+        q &= Q(_in_categories(filters['category']))
+    if 'badge' in filters and exclude != 'badge':
+        q &= Q(badge__in=filters['badge'])
+    if exclude != 'price':
+        if 'min_price' in filters:
+            q &= Q(price__gte=filters['min_price'])
+        if 'max_price' in filters:
+            q &= Q(price__lte=filters['max_price'])
+    if 'is_available' in filters and exclude != 'is_available':
+        q &= Q(is_available=filters['is_available'])
+    if 'min_rating' in filters and exclude != 'rating':
+        q &= Q(rating__gte=filters['min_rating'])
+    return q
+
+
+def filter_products(queryset, filters):
+    return queryset.filter(product_filter_q(filters)) if filters else queryset
+
+
+def category_counts(user, filters):
+    """Products per category id, with every filter but ``category`` applied.
+
+    A single GROUP BY over the link table, restricted to the matching
+    products by a subquery, so the cost does not grow with the number of
+    categories.
+    """
+    products = Product.objects.filter(user=user).filter(product_filter_q(filters, exclude='category'))
+    return dict(
+        ProductCategory.objects
+        .filter(product__in=products.values('pk'))
+        .order_by()
+        .values('category_id')
+        .annotate(total=Count('product_id'))
+        .values_list('category_id', 'total')
+    )
+
+
+def facet_counts(user, filters):
+    """Counts for every value of every facet.
+
+    Each dimension is counted with all the *other* filters applied, so a
+    client can show how many products picking another value would give.
+    Three queries: the tenant's categories, the category counts and one
+    aggregate for the other dimensions.
+    """
+    categories = list(Category.objects.filter(user=user).order_by('name').values_list('id', 'name'))
+    per_category = category_counts(user, filters) if categories else {}
+
+    # Every remaining dimension is narrowed by the category filter, so it is
+    # applied once to the rows instead of once per count
+    products = Product.objects.filter(user=user)
+    if 'category' in filters:
+        products = products.filter(_in_categories(filters['category']))
+    others = {name: value for name, value in filters.items() if name != 'category'}
+
+    aggregates = {}
+    for badge in BADGE_CHOICES:
+        aggregates[f'badge_{badge}'] = Count('pk', filter=product_filter_q(others, exclude='badge') & Q(badge=badge))
+    for value in (True, False):
+        aggregates[f'is_available_{value}'] = Count(
+            'pk', filter=product_filter_q(others, exclude='is_available') & Q(is_available=value)
+        )
+    for index, (low, high) in enumerate(PRICE_BUCKETS):
+        bucket = Q(price__gte=low) if high is None else Q(price__gte=low, price__lt=high)
+        aggregates[f'price_{index}'] = Count('pk', filter=product_filter_q(others, exclude='price') & bucket)
+    for threshold in RATING_THRESHOLDS:
+        aggregates[f'rating_{threshold}'] = Count(
+            'pk', filter=product_filter_q(others, exclude='rating') & Q(rating__gte=threshold)
+        )
+
+    counts = products.aggregate(**aggregates)
+    return {
+        'category': [
+            {'value': name, 'count': per_category.get(category_id, 0)} for category_id, name in categories
+        ],
+        'badge': [{'value': badge, 'count': counts[f'badge_{badge}']} for badge in BADGE_CHOICES],
+        'is_available': [
+            {'value': value, 'count': counts[f'is_available_{value}']} for value in (True, False)
+        ],
+        'price': [
+            {'min': str(low), 'max': str(high) if high is not None else None, 'count': counts[f'price_{index}']}
+            for index, (low, high) in enumerate(PRICE_BUCKETS)
+        ],
+        'rating': [
+            {'min': threshold, 'count': counts[f'rating_{threshold}']} for threshold in RATING_THRESHOLDS
+        ],
+    }
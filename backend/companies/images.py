@@ -0,0 +1,115 @@
+# companies/images.py
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from .cache import bump_catalog_version
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels; images are never upscaled
+VARIANT_SIZES = {
+    'thumbnail': 200,
+    'card': 600,
+    'full': 1600,
+}
+
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2),
+    thread_name_prefix='image-variants',
+)
+
+
+def _encode(image, fmt):
+    pil_format, options = VARIANT_FORMATS[fmt]
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        # JPEG has no alpha channel: flatten onto white
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A') if 'A' in image.getbands() else None)
+        image = background
+    buffer = io.BytesIO()
+    # No exif/icc arguments are passed, so metadata is stripped
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def build_variants(product_id, source):
+    """Resize ``source`` into every size and format and store the files.
+
+    Returns the variant map recorded on ``Product.image_variants``.
+    """
+    with Image.open(source) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ('RGB', 'RGBA'):
+            original = original.convert('RGBA' if 'transparency' in original.info else 'RGB')
+
+        variants = {}
+        for name, size in VARIANT_SIZES.items():
+            resized = original.copy()
+            resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+            variant = {'width': resized.width, 'height': resized.height}
+            for fmt in VARIANT_FORMATS:
+                path = f'products/variants/{product_id}/{name}.{fmt}'
+                variant[fmt] = default_storage.save(path, ContentFile(_encode(resized, fmt)))
+            variants[name] = variant
+    return variants
+
+
+def _variant_paths(variants):
+    return {variant[fmt] for variant in (variants or {}).values() for fmt in VARIANT_FORMATS if fmt in variant}
+
+
+def generate_image_variants(product_id):
+    """Build and record the variants of a product's current image"""
+    product = Product.objects.filter(pk=product_id).only('id', 'user_id', 'image', 'image_variants').first()
+    if product is None or not product.image:
+        return None
+
+    image_name = product.image.name
+    with product.image.open('rb') as source:
+        variants = build_variants(product.id, source)
+
+    # Only record the result if the image was not replaced in the meantime
+    updated = Product.objects.filter(pk=product.id, image=image_name).update(image_variants=variants)
+    if updated:
+        stale = _variant_paths(product.image_variants) - _variant_paths(variants)
+    else:
+        stale = _variant_paths(variants)
+    # Content-addressed files may be shared with other products
+    if not getattr(default_storage, 'content_addressed', False):
+        for path in stale:
+            default_storage.delete(path)
+
+    if updated:
+        bump_catalog_version(product.user_id)
+        logger.info(f"Generated image variants for product {product.id}")
+        return variants
+    return None
+
+
+def _run(product_id):
+    close_old_connections()
+    try:
+        generate_image_variants(product_id)
+    except Exception as e:
+        logger.error(f"Error generating image variants for product {product_id}: {str(e)}")
+    finally:
+        close_old_connections()
+
+
+def schedule_image_variants(product):
+    """Queue variant generation on the worker pool once the upload commits"""
+    product_id = product.pk
+    transaction.on_commit(lambda: _executor.submit(_run, product_id))
@@ -0,0 +1,41 @@
+# Helpers shared by the bench_* commands
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    """Run the block in a transaction that is always rolled back"""
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback
+    except Rollback:
+        pass
+
+
+def time_runs(func, repeat):
+    """Milliseconds of ``repeat`` calls of ``func``, after one warm-up call"""
+    func()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def summary(timings):
+    return f"median {statistics.median(timings):.1f} ms, best {min(timings):.1f} ms"
+
+
+def percentile_summary(timings):
+    percentiles = statistics.quantiles(timings, n=100)
+    return f"p50 {percentiles[49]:.1f} ms, p95 {percentiles[94]:.1f} ms, max {max(timings):.1f} ms"
@@ -0,0 +1,63 @@
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+PATHS = {
+    'sync': '/api/products/',
+    'async': '/api/async/products/',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Load a running server with product list reads and report throughput and latency. "
+        "Run it against the same project served by gunicorn (WSGI) and uvicorn (ASGI) to compare them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help="Base URL of the server")
+        parser.add_argument('--token', required=True, help="Firebase ID token of a tenant")
+        parser.add_argument('--view', choices=sorted(PATHS), default='sync', help="Which product list to call")
+        parser.add_argument('--query', default='limit=50', help="Query string of every request")
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=50)
+
+    def handle(self, *args, **options):
+        if options['requests'] < 2:
+            raise CommandError("--requests must be at least 2")
+        url = f"{options['url'].rstrip('/')}{PATHS[options['view']]}?{options['query']}"
+        headers = {'Authorization': f"Bearer {options['token']}"}
+
+        def fetch(_):
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(urllib.request.Request(url, headers=headers)) as response:
+                    response.read()
+                    status = response.status
+            except urllib.error.HTTPError as e:
+                status = e.code
+            return status, time.perf_counter() - started
+
+        # One request first, so a bad token or URL fails fast
+        status, _ = fetch(None)
+        if status != 200:
+            raise CommandError(f"GET {url} returned {status}")
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = list(pool.map(fetch, range(options['requests'])))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency * 1000 for _, latency in results)
+        errors = sum(1 for status, _ in results if status != 200)
+        percentiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f"{len(results)} requests, concurrency {options['concurrency']}: "
+            f"{len(results) / elapsed:.0f} req/s, "
+            f"p50 {percentiles[49]:.1f} ms, p95 {percentiles[94]:.1f} ms, p99 {percentiles[98]:.1f} ms, "
+            f"{errors} errors"
+        )
@@ -0,0 +1,65 @@
+import csv
+import io
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from companies.customers import UPSERT_CHUNK_SIZE, iter_csv_rows, upsert_customers
+from companies.models import Customer
+from companies.validators import clean_customer_data
+
+from ._bench import rolled_back, summary, time_runs
+
+
+class Command(BaseCommand):
+    help = (
+        "Time upserting a generated customer CSV with upsert_customers, into an empty tenant and into one "
+        "that already has every customer, against one update_or_create per row. Everything is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--chunk-size', type=int, default=UPSERT_CHUNK_SIZE)
+        parser.add_argument('--repeat', type=int, default=3, help="Timed runs of each path")
+        parser.add_argument('--skip-per-row', action='store_true', help="Only time upsert_customers")
+
+    def handle(self, *args, **options):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['name', 'email', 'phone', 'address'])
+        for i in range(options['rows']):
+            writer.writerow([f'Customer {i}', f'customer{i}@example.com', f'+2547{i:08d}', f'{i} Bench Street'])
+        data = buffer.getvalue().encode('utf-8')
+
+        def upsert():
+            report = upsert_customers(user, iter_csv_rows(io.BytesIO(data)), chunk_size=options['chunk_size'])
+            if report['rejected']:
+                raise CommandError(f"Generated rows were rejected: {report['errors'][:5]}")
+
+        def rolled_back_upsert():
+            with rolled_back():
+                upsert()
+
+        with rolled_back():
+            user = User.objects.create(username=f'bench-customers-{time.time_ns()}')
+            rows = options['rows']
+
+            self.stdout.write(f"{rows} new customers: {summary(time_runs(rolled_back_upsert, options['repeat']))}")
+            upsert()
+            self.stdout.write(
+                f"{rows} existing customers: {summary(time_runs(rolled_back_upsert, options['repeat']))}"
+            )
+
+            if options['skip_per_row']:
+                return
+
+            def per_row():
+                with rolled_back():
+                    for row in iter_csv_rows(io.BytesIO(data)):
+                        fields = clean_customer_data(row)
+                        Customer.objects.update_or_create(user=user, email=fields.pop('email'), defaults=fields)
+
+            self.stdout.write(
+                f"{rows} existing customers, one by one: {summary(time_runs(per_row, options['repeat']))}"
+            )
@@ -0,0 +1,77 @@
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from companies.filters import facet_counts
+from companies.models import Category, Product
+from companies.validators import BADGE_CHOICES
+
+from ._bench import rolled_back, summary, time_runs
+
+ProductCategory = Product.categories.through
+
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        "Time facet_counts on a generated catalog. The catalog is created in a transaction "
+        "that is rolled back afterwards, so nothing is left in the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100000)
+        parser.add_argument('--categories', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per filter set")
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            user = self.seed(options['products'], options['categories'])
+            self.run(user, options['repeat'])
+
+    def seed(self, product_count, category_count):
+        rng = random.Random(0)
+        user = User.objects.create(username=f'bench-facets-{time.time_ns()}')
+        categories = Category.objects.bulk_create(
+            [Category(user=user, name=f'Category {i}') for i in range(category_count)]
+        )
+        products = Product.objects.bulk_create(
+            [
+                Product(
+                    user=user,
+                    name=f'Product {i}',
+                    price=Decimal(rng.randint(100, 50000)) / 100,
+                    rating=rng.randint(0, 50) / 10,
+                    badge=rng.choice([None, *BADGE_CHOICES]),
+                    is_available=rng.random() < 0.8,
+                )
+                for i in range(product_count)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        ProductCategory.objects.bulk_create(
+            [
+                ProductCategory(product_id=product.pk, category_id=category.pk)
+                for product in products
+                for category in rng.sample(categories, rng.randint(1, min(3, category_count)))
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        self.stdout.write(f"Seeded {product_count} products in {category_count} categories")
+        return user
+
+    def run(self, user, repeat):
+        filter_sets = {
+            'none': {},
+            'category': {'category': ['Category 0', 'Category 1']},
+            'category+price+available': {
+                'category': ['Category 0'], 'min_price': Decimal('25'), 'max_price': Decimal('250'),
+                'is_available': True,
+            },
+        }
+        for label, filters in filter_sets.items():
+            timings = time_runs(lambda: facet_counts(user, filters), repeat)
+            self.stdout.write(f"{label}: {summary(timings)}")
@@ -0,0 +1,59 @@
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from companies.bulk import import_products
+from companies.models import Category, Product
+from companies.validators import clean_category_names, clean_product_data
+
+from ._bench import rolled_back, summary, time_runs
+
+
+class Command(BaseCommand):
+    help = (
+        "Time importing generated product rows with the bulk import against creating them one by one "
+        "as ProductAPIView.post does. Everything is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=3, help="Timed runs of each path")
+        parser.add_argument('--skip-per-row', action='store_true', help="Only time the bulk import")
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        rows = [
+            {
+                'name': f'Product {i}',
+                'price': f'{rng.randint(100, 50000) / 100:.2f}',
+                'description': 'Generated by bench_product_import',
+                'categories': [f'Category {rng.randrange(options["categories"])}' for _ in range(2)],
+            }
+            for i in range(options['rows'])
+        ]
+
+        with rolled_back():
+            user = User.objects.create(username=f'bench-import-{time.time_ns()}')
+
+            def bulk():
+                with rolled_back():
+                    cleaned = [(clean_product_data(row), clean_category_names(row['categories'])) for row in rows]
+                    import_products(user, cleaned)
+
+            self.stdout.write(f"bulk import of {len(rows)} rows: {summary(time_runs(bulk, options['repeat']))}")
+
+            if options['skip_per_row']:
+                return
+
+            def per_row():
+                with rolled_back():
+                    for row in rows:
+                        product = Product.objects.create(user=user, **clean_product_data(row))
+                        for name in clean_category_names(row['categories']):
+                            category, _ = Category.objects.get_or_create(user=user, name=name)
+                            product.categories.add(category)
+
+            self.stdout.write(f"one by one, {len(rows)} rows: {summary(time_runs(per_row, options['repeat']))}")
@@ -0,0 +1,90 @@
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from companies.models import Category, Product
+from companies.search import refresh_search_index, search_products
+
+from ._bench import percentile_summary, rolled_back, time_runs
+
+ProductCategory = Product.categories.through
+
+BATCH_SIZE = 5000
+
+ADJECTIVES = ['red', 'blue', 'green', 'leather', 'cotton', 'wooden', 'steel', 'organic', 'vintage', 'compact']
+NOUNS = ['chair', 'table', 'lamp', 'shirt', 'jacket', 'kettle', 'speaker', 'backpack', 'notebook', 'blender']
+FILLER = ['durable', 'handmade', 'lightweight', 'waterproof', 'classic', 'modern', 'portable', 'premium', 'soft',
+          'everyday', 'gift', 'travel', 'kitchen', 'office', 'outdoor', 'studio', 'warranty', 'recycled']
+
+QUERIES = {
+    'broad word': 'chair',
+    'two words': 'leather jacket',
+    'prefix': 'back',
+    'one product': '4242',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Time search_products on a generated tenant catalog and report p50/p95 latency per query. "
+        "The catalog and its search index are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100000)
+        parser.add_argument('--categories', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=50, help="Timed runs per query")
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 2:
+            raise CommandError("--repeat must be at least 2")
+        with rolled_back():
+            user = self.seed(options['products'], options['categories'])
+            self.run(user, options['repeat'])
+
+    def seed(self, product_count, category_count):
+        rng = random.Random(0)
+        user = User.objects.create(username=f'bench-search-{time.time_ns()}')
+        categories = Category.objects.bulk_create(
+            [Category(user=user, name=f'{rng.choice(FILLER).title()} {i}') for i in range(category_count)]
+        )
+        products = Product.objects.bulk_create(
+            [
+                Product(
+                    user=user,
+                    name=f'{rng.choice(ADJECTIVES).title()} {rng.choice(NOUNS)} {i}',
+                    description=' '.join(rng.choices(FILLER + NOUNS, k=rng.randint(10, 40))),
+                    price=Decimal(rng.randint(100, 50000)) / 100,
+                )
+                for i in range(product_count)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        ProductCategory.objects.bulk_create(
+            [
+                ProductCategory(product_id=product.pk, category_id=category.pk)
+                for product in products
+                for category in rng.sample(categories, rng.randint(1, min(3, category_count)))
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        started = time.perf_counter()
+        refresh_search_index(Product.objects.filter(user=user))
+        self.stdout.write(
+            f"Seeded and indexed {product_count} products in {category_count} categories "
+            f"(indexing took {time.perf_counter() - started:.1f} s)"
+        )
+        return user
+
+    def run(self, user, repeat):
+        for label, query in QUERIES.items():
+            first_page = search_products(user.pk, query)
+            timings = time_runs(lambda: search_products(user.pk, query), repeat)
+            self.stdout.write(f"{label} ({query!r}), first page: {percentile_summary(timings)}")
+            if len(first_page) == 20:
+                after = first_page[-1][:2]
+                timings = time_runs(lambda: search_products(user.pk, query, after=after), repeat)
+                self.stdout.write(f"{label} ({query!r}), second page: {percentile_summary(timings)}")
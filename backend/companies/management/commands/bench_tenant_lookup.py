@@ -0,0 +1,102 @@
+import random
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from companies.models import BusinessProfile
+from companies.tenants import forget_tenant, lookup_tenant, tenant_cache
+from middleware.tenant_middleware import TenantMiddleware
+
+from ._bench import rolled_back, summary, time_runs
+
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        "Time resolving requests to tenants across a generated set of business profiles: cold (database), "
+        "from the shared cache, and from the in-process map. The profiles are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenants', type=int, default=10000)
+        parser.add_argument('--requests', type=int, default=10000, help="Lookups per timed run")
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per path")
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            subdomains = self.seed(options['tenants'])
+            rng = random.Random(0)
+            # Mostly known tenants, with some hosts that have no profile
+            hosts = [
+                f"{rng.choice(subdomains) if rng.random() < 0.9 else f'missing-{i}'}.example.com"
+                for i in range(options['requests'])
+            ]
+            try:
+                with override_settings(ALLOWED_HOSTS=['.example.com']):
+                    self.run(hosts, options['repeat'])
+            finally:
+                self.forget(hosts)
+
+    def seed(self, tenant_count):
+        prefix = f'bench{time.time_ns()}'
+        users = User.objects.bulk_create(
+            [User(username=f'{prefix}-{i}') for i in range(tenant_count)], batch_size=BATCH_SIZE
+        )
+        BusinessProfile.objects.bulk_create(
+            [
+                BusinessProfile(user=user, business_name=f'Shop {i}', subdomain=f'{prefix}-{i}')
+                for i, user in enumerate(users)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        self.stdout.write(f"Seeded {tenant_count} tenants")
+        return [f'{prefix}-{i}' for i in range(tenant_count)]
+
+    def forget(self, hosts):
+        forget_tenant(*{host.split('.', 1)[0] for host in hosts})
+
+    def run(self, hosts, repeat):
+        subdomains = [host.split('.', 1)[0] for host in hosts]
+
+        def cold():
+            self.forget(hosts)
+            for subdomain in subdomains:
+                lookup_tenant(subdomain)
+
+        def shared_cache():
+            tenant_cache.clear()
+            for subdomain in subdomains:
+                lookup_tenant(subdomain)
+
+        def local():
+            for subdomain in subdomains:
+                lookup_tenant(subdomain)
+
+        factory = RequestFactory()
+        requests = [factory.get('/api/storefront/', HTTP_HOST=host) for host in hosts]
+        middleware = TenantMiddleware(lambda request: HttpResponse())
+
+        def through_middleware():
+            for request in requests:
+                middleware(request)
+
+        self.stdout.write(f"shared cache: {settings.CACHES['default']['BACKEND']}")
+        for label, func in [
+            ('cold, database', cold),
+            ('shared cache', shared_cache),
+            ('in-process map', local),
+            ('TenantMiddleware, warm', through_middleware),
+        ]:
+            self.stdout.write(f"{label}, {len(hosts)} lookups: {summary(time_runs(func, repeat))}")
+
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            through_middleware()
+        self.stdout.write(f"queries for {len(hosts)} warm requests: {len(queries)}")
@@ -0,0 +1,56 @@
+import time
+
+import firebase_admin
+from firebase_admin import auth, credentials
+from django.core.management.base import BaseCommand
+
+from saas.authentication import cred_path
+from saas.fake_key_server import FakeKeyServer, make_token
+from saas.token_verifier import FirebaseTokenVerifier, PublicKeyCache
+
+PROJECT_ID = 'bench-project'
+KID = 'bench-key'
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare ID token verifications per second through firebase_admin.auth.verify_id_token "
+        "and saas.token_verifier. Tokens are signed by a local fake key server, so no network is needed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tokens', type=int, default=2000, help="Calls timed per path")
+
+    def handle(self, *args, **options):
+        server = FakeKeyServer()
+        private_key = server.add_key(KID)
+        server.start()
+        try:
+            tokens = [make_token(private_key, KID, PROJECT_ID, sub=f'user-{i}') for i in range(options['tokens'])]
+            repeated = [tokens[0]] * len(tokens)
+
+            app = firebase_admin.initialize_app(
+                credentials.Certificate(cred_path), {'projectId': PROJECT_ID}, name=f'bench-{time.time_ns()}'
+            )
+            try:
+                # firebase_admin has no option for the certificate URL; point it at the fake server.
+                auth._get_client(app)._token_verifier.id_token_verifier.cert_url = server.url
+                self.report('firebase_admin, new tokens', lambda t: auth.verify_id_token(t, app=app), tokens)
+                self.report('firebase_admin, same token', lambda t: auth.verify_id_token(t, app=app), repeated)
+            finally:
+                firebase_admin.delete_app(app)
+
+            verifier = FirebaseTokenVerifier(PROJECT_ID, key_cache=PublicKeyCache(url=server.url))
+            self.report('token_verifier, new tokens', verifier.verify, tokens)
+            self.report('token_verifier, same token', verifier.verify, repeated)
+            self.stdout.write(f"key server hits: {server.hits}")
+        finally:
+            server.stop()
+
+    def report(self, label, verify, tokens):
+        verify(tokens[0])
+        started = time.perf_counter()
+        for token in tokens:
+            verify(token)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"{label}: {len(tokens) / elapsed:.0f} verifications/s")
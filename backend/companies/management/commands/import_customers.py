@@ -0,0 +1,27 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from companies.customers import UPSERT_CHUNK_SIZE, iter_csv_rows, upsert_customers
+
+
+class Command(BaseCommand):
+    help = "Insert or update a tenant's customers from a CSV file (name,email,phone,address)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help="Tenant the customers belong to")
+        parser.add_argument('path', help="CSV file to import")
+        parser.add_argument('--chunk-size', type=int, default=UPSERT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(f"Unknown user: {options['username']}")
+
+        with open(options['path'], 'rb') as csv_file:
+            report = upsert_customers(user, iter_csv_rows(csv_file), chunk_size=options['chunk_size'])
+
+        for error in report['errors']:
+            self.stderr.write(f"Row {error['row']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['inserted']} inserted, {report['updated']} updated, {report['rejected']} rejected"
+        ))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from companies.payments import CALLBACK_BATCH_SIZE, process_payment_callbacks
+
+
+class Command(BaseCommand):
+    help = "Apply staged payment callbacks: create payments and mark covered orders paid"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=CALLBACK_BATCH_SIZE)
+        parser.add_argument(
+            '--loop', type=float, default=None,
+            help="Keep running, sleeping this many seconds whenever the queue is empty"
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            # Drain the queue batch by batch; deferred callbacks are skipped
+            # until their next attempt is due
+            while True:
+                result = process_payment_callbacks(limit=options['batch_size'])
+                if not (result['applied'] or result['rejected'] or result['deferred']):
+                    break
+                self.stdout.write(
+                    f"Applied {result['applied']}, rejected {result['rejected']}, "
+                    f"deferred {result['deferred']}, {result['orders_paid']} orders paid"
+                )
+            if options['loop'] is None:
+                break
+            time.sleep(options['loop'])
+        self.stdout.write(self.style.SUCCESS("Payment callback queue is empty"))
@@ -0,0 +1,37 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from companies.analytics import rebuild_sales_rollups
+
+
+def parse_date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Invalid date: {value} (expected YYYY-MM-DD)")
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily sales rollups for a date range from paid orders"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', required=True, help="First day to rebuild (YYYY-MM-DD)")
+        parser.add_argument('--end', help="Last day to rebuild, inclusive (defaults to --start)")
+        parser.add_argument('--user', help="Only rebuild this tenant (username)")
+
+    def handle(self, *args, **options):
+        start = parse_date(options['start'])
+        end = parse_date(options['end']) if options['end'] else start
+        if end < start:
+            raise CommandError("--end must not be before --start")
+
+        user = None
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f"Unknown user: {options['user']}")
+
+        rebuild_sales_rollups(start, end, user=user)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt sales rollups from {start} to {end}"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from companies.search import refresh_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text product search index"
+
+    def handle(self, *args, **options):
+        refresh_search_index()
+        self.stdout.write(self.style.SUCCESS("Rebuilt the product search index"))
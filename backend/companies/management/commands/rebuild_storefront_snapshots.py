@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from companies.snapshots import write_snapshots
+
+
+class Command(BaseCommand):
+    help = "Rebuild the pre-rendered storefront snapshots of every store"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help="Worker processes (default: one per CPU; 1 renders in this process)"
+        )
+
+    def handle(self, *args, **options):
+        result = write_snapshots(workers=options['workers'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {result['written']} storefront snapshots "
+            f"({result['skipped']} skipped, {result['failed']} failed)"
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from companies.signals import recount_product_counts
+
+
+class Command(BaseCommand):
+    help = "Recompute Category.product_count from the product/category links"
+
+    def handle(self, *args, **options):
+        updated = recount_product_counts()
+        self.stdout.write(self.style.SUCCESS(f"Recounted products for {updated} categories"))
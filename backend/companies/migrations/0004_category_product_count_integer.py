@@ -0,0 +1,46 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:56
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def clear_product_count(apps, schema_editor):
+    # Old values were free text (e.g. "150+") and cannot be cast to integers
+    Category = apps.get_model('companies', 'Category')
+    Category.objects.update(product_count=None)
+
+
+def recount_product_count(apps, schema_editor):
+    Category = apps.get_model('companies', 'Category')
+    Product = apps.get_model('companies', 'Product')
+    ProductCategory = Product.categories.through
+    linked = (
+        ProductCategory.objects
+        .filter(category_id=OuterRef('pk'))
+        .order_by()
+        .values('category_id')
+        .annotate(total=Count('product_id'))
+        .values('total')
+    )
+    Category.objects.update(product_count=Coalesce(Subquery(linked), Value(0)))
+
+
+class Migration(migrations.Migration):
+    # Data and schema changes on the same table must not share a transaction
+    # on PostgreSQL ("pending trigger events").
+    atomic = False
+
+    dependencies = [
+        ('companies', '0003_product_user_id_desc_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_product_count, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='category',
+            name='product_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(recount_product_count, migrations.RunPython.noop),
+    ]
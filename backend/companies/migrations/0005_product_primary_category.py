@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Min, OuterRef, Subquery
+
+
+def populate_primary_category(apps, schema_editor):
+    # Same choice the serializer used to make: the category with the lowest id
+    Product = apps.get_model('companies', 'Product')
+    ProductCategory = Product.categories.through
+    first_linked = (
+        ProductCategory.objects
+        .filter(product_id=OuterRef('pk'))
+        .order_by()
+        .values('product_id')
+        .annotate(first=Min('category_id'))
+        .values('first')
+    )
+    Product.objects.update(primary_category_id=Subquery(first_linked))
+
+
+class Migration(migrations.Migration):
+    # Data and schema changes on the same table must not share a transaction
+    # on PostgreSQL ("pending trigger events").
+    atomic = False
+
+    dependencies = [
+        ('companies', '0004_category_product_count_integer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='primary_category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='companies.category'),
+        ),
+        migrations.RunPython(populate_primary_category, migrations.RunPython.noop),
+    ]
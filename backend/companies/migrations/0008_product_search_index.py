@@ -0,0 +1,63 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:20
+
+from django.db import migrations
+
+POSTGRES_BACKFILL = """
+    UPDATE product AS p SET search_vector =
+        setweight(to_tsvector('english', coalesce(p.name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(c.name, ' ')
+            FROM category c JOIN product_categories pc ON pc.category_id = c.id
+            WHERE pc.product_id = p.id
+        ), '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(p.description, '')), 'C')
+"""
+
+SQLITE_BACKFILL = """
+    INSERT INTO product_fts (rowid, name, categories, description, user_id)
+    SELECT p.id, p.name, coalesce((
+        SELECT group_concat(c.name, ' ')
+        FROM category c JOIN product_categories pc ON pc.category_id = c.id
+        WHERE pc.product_id = p.id
+    ), ''), coalesce(p.description, ''), p.user_id
+    FROM product p
+"""
+
+
+def create_search_index(apps, schema_editor):
+    # The index is maintained by companies.search; the model does not know about it
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('ALTER TABLE product ADD COLUMN search_vector tsvector')
+        schema_editor.execute(POSTGRES_BACKFILL)
+        schema_editor.execute(
+            'CREATE INDEX product_search_gin ON product USING GIN (search_vector)'
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE product_fts USING fts5("
+            "name, categories, description, user_id UNINDEXED, "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        schema_editor.execute(SQLITE_BACKFILL)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS product_search_gin')
+        schema_editor.execute('ALTER TABLE product DROP COLUMN IF EXISTS search_vector')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS product_fts')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('companies', '0007_product_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
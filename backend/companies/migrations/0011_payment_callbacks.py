@@ -0,0 +1,48 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0010_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentCallback',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(choices=[('card', 'Card'), ('mpesa', 'Mpesa')], max_length=20)),
+                ('transaction_id', models.CharField(max_length=100)),
+                ('order_reference', models.CharField(max_length=100)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('applied', 'Applied'), ('rejected', 'Rejected')], default='pending', max_length=20)),
+                ('error', models.CharField(blank=True, max_length=255, null=True)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'payment_callback',
+            },
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='transaction_id',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='payment',
+            constraint=models.UniqueConstraint(fields=('method', 'transaction_id'), name='payment_method_transaction_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentcallback',
+            index=models.Index(fields=['status', 'id'], name='payment_callback_status_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='paymentcallback',
+            constraint=models.UniqueConstraint(fields=('provider', 'transaction_id'), name='payment_callback_provider_txn_uniq'),
+        ),
+    ]
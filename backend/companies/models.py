@@ -50,6 +50,7 @@ class StoreConfig(models.Model):
         choices=[('modern', 'Modern'), ('minimal', 'Minimal'), ('classic', 'Classic')],
         default='modern'
     )
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.store_name} ({self.user.username})"
@@ -63,7 +64,9 @@ class Category(models.Model):
     name = models.CharField(max_length=255)
     image = models.URLField(max_length=500, blank=True, null=True)
     description = models.TextField(blank=True, null=True)
-    product_count = models.CharField(max_length=50, blank=True, null=True)
+    # Maintained by companies.signals; repair with `manage.py recount_category_products`
+    product_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.name} ({self.user.username})"
@@ -86,6 +89,9 @@ class Product(models.Model):
     null=True,
     validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])]
     )
+    # Resized copies of `image`, filled in by companies.images:
+    # {"thumbnail": {"width": .., "height": .., "webp": path, "jpeg": path}, ...}
+    image_variants = models.JSONField(default=dict, blank=True)
     rating = models.FloatField(default=0.0, validators=[MinValueValidator(0), MaxValueValidator(5)])
     reviews_count = models.IntegerField(default=0)
     is_available = models.BooleanField(default=True)
@@ -103,12 +109,26 @@ class Product(models.Model):
         null=True
     )
     categories = models.ManyToManyField(Category, related_name='products')
+    # Denormalized from categories so listings need no per-row lookup; kept in
+    # sync by companies.signals
+    primary_category = models.ForeignKey(
+        Category, on_delete=models.SET_NULL, related_name='+', blank=True, null=True
+    )
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.name} ({self.user.username})"
 
     class Meta:
         db_table = 'product'
+        indexes = [
+            # Keyset pagination of a tenant's catalog, newest first
+            models.Index(fields=['user', '-id'], name='product_user_id_desc_idx'),
+            # Faceted filtering (companies.filters)
+            models.Index(fields=['user', 'is_available', 'price'], name='product_user_avail_price_idx'),
+            models.Index(fields=['user', 'badge'], name='product_user_badge_idx'),
+            models.Index(fields=['user', 'rating'], name='product_user_rating_idx'),
+        ]
 
 # Customer Model (linked to User)
 class Customer(models.Model):
@@ -143,6 +163,10 @@ class Order(models.Model):
 
     class Meta:
         db_table = 'order'
+        indexes = [
+            # Keyset pagination of a tenant's order history, newest first
+            models.Index(fields=['user', '-created_at', '-id'], name='order_user_created_desc_idx'),
+        ]
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
@@ -166,9 +190,80 @@ class Payment(models.Model):
         default='cash'
     )
     paid_at = models.DateTimeField(auto_now_add=True)
+    # Provider reference (M-Pesa receipt, card charge id); unique per method
+    transaction_id = models.CharField(max_length=100, blank=True, null=True)
 
     def __str__(self):
         return f"Payment {self.amount} for Order {self.order.id}"
 
     class Meta:
-        db_table = 'payment'
\ No newline at end of file
+        db_table = 'payment'
+        constraints = [
+            models.UniqueConstraint(fields=['method', 'transaction_id'], name='payment_method_transaction_uniq'),
+        ]
+
+
+# Payment provider callbacks waiting to be applied; written by the callback
+# endpoint and drained by companies.payments.process_payment_callbacks
+class PaymentCallback(models.Model):
+    provider = models.CharField(max_length=20, choices=[('card', 'Card'), ('mpesa', 'Mpesa')])
+    transaction_id = models.CharField(max_length=100)
+    order_reference = models.CharField(max_length=100)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=20,
+        choices=[('pending', 'Pending'), ('applied', 'Applied'), ('rejected', 'Rejected')],
+        default='pending'
+    )
+    error = models.CharField(max_length=255, blank=True, null=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+    # Set while a callback waits for its order to appear
+    next_attempt_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.provider} {self.transaction_id} ({self.status})"
+
+    class Meta:
+        db_table = 'payment_callback'
+        constraints = [
+            models.UniqueConstraint(fields=['provider', 'transaction_id'], name='payment_callback_provider_txn_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'id'], name='payment_callback_status_idx'),
+        ]
+
+
+# Sales rollups, maintained incrementally by companies.analytics from paid
+# orders; rebuild with `manage.py rebuild_sales_rollups`
+class DailySales(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_sales')
+    date = models.DateField()
+    orders_count = models.IntegerField(default=0)
+    items_sold = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.date}: {self.revenue} ({self.user.username})"
+
+    class Meta:
+        db_table = 'daily_sales'
+        unique_together = ('user', 'date')
+
+class ProductDailySales(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='product_daily_sales')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    date = models.DateField()
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.date}: {self.product_id} x {self.quantity} ({self.user.username})"
+
+    class Meta:
+        db_table = 'product_daily_sales'
+        unique_together = ('user', 'product', 'date')
+        indexes = [
+            models.Index(fields=['user', 'date'], name='product_sales_user_date_idx'),
+        ]
@@ -0,0 +1,68 @@
+# companies/orders.py
+from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Customer, Order, OrderItem, Product
+from .validators import fit_decimal_field
+
+
+class OrderError(ValueError):
+    pass
+
+
+def order_total_subquery():
+    """SUM(price * quantity) of an order's items, correlated on ``pk``"""
+    money = DecimalField(max_digits=10, decimal_places=2)
+    total = (
+        OrderItem.objects
+        .filter(order_id=OuterRef('pk'))
+        .order_by()
+        .values('order_id')
+        .annotate(total=Sum(F('price') * F('quantity'), output_field=money))
+        .values('total')
+    )
+    return Coalesce(Subquery(total, output_field=money), Value(0), output_field=money)
+
+
+def place_order(user, customer_id, quantities):
+    """Create an order with its items in one transaction.
+
+    ``quantities`` maps product ids to quantities (see
+    ``validators.clean_order_data``). Prices are read in one query and
+    copied onto the items, the items are inserted with one bulk INSERT and
+    the total is computed by the database from those rows. Only the new
+    order row is written and no existing row is locked, so concurrent
+    checkouts cannot deadlock or overwrite each other's totals.
+    """
+    with transaction.atomic():
+        customer = Customer.objects.filter(user=user, pk=customer_id).only('pk').first()
+        if customer is None:
+            raise OrderError('Customer not found')
+
+        prices = dict(
+            Product.objects
+            .filter(user=user, pk__in=list(quantities), is_available=True)
+            .values_list('pk', 'price')
+        )
+        missing = sorted(set(quantities) - set(prices))
+        if missing:
+            raise OrderError(f'Unknown or unavailable products: {", ".join(map(str, missing))}')
+        # The database computes the stored total; refuse one it cannot hold
+        try:
+            fit_decimal_field(
+                sum(prices[product_id] * quantity for product_id, quantity in quantities.items()),
+                Order, 'total_amount', 'Order total',
+            )
+        except ValueError as e:
+            raise OrderError(str(e))
+
+        order = Order.objects.create(user=user, customer=customer)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product_id=product_id, quantity=quantity, price=prices[product_id])
+            for product_id, quantity in sorted(quantities.items())
+        ])
+        Order.objects.filter(pk=order.pk).update(total_amount=order_total_subquery())
+        order.refresh_from_db(fields=['total_amount'])
+
+    return order
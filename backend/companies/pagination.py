@@ -0,0 +1,122 @@
+# companies/pagination.py
+import base64
+import datetime
+import json
+
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    """Turn the keyset position of the last row into an opaque token."""
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Inverse of ``encode_cursor``; returns None for an empty cursor."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+    if not isinstance(values, dict):
+        raise InvalidCursor('Invalid cursor')
+    return values
+
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    if value in (None, ''):
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid limit')
+    if limit < 1:
+        raise ValueError('Limit must be positive')
+    return min(limit, maximum)
+
+
+def decode_id_cursor(cursor):
+    """Decode a cursor produced by ``paginate_by_id`` into the last seen id."""
+    values = decode_cursor(cursor)
+    if values is None:
+        return None
+    try:
+        return int(values['id'])
+    except (KeyError, TypeError, ValueError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def decode_score_cursor(cursor):
+    """Decode a ``(score, id)`` cursor of a ranked result list."""
+    values = decode_cursor(cursor)
+    if values is None:
+        return None
+    try:
+        return float(values['score']), int(values['id'])
+    except (KeyError, TypeError, ValueError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def decode_created_cursor(cursor):
+    """Decode a cursor produced by ``paginate_by_created``."""
+    values = decode_cursor(cursor)
+    if values is None:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(values['created_at']), int(values['id'])
+    except (KeyError, TypeError, ValueError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def paginate_by_created(queryset, after, limit):
+    """Keyset pagination over ``(-created_at, -id)``: returns (rows, next_cursor).
+
+    ``after`` is the ``(created_at, id)`` of the last row already seen.
+    """
+    if after is not None:
+        created_at, last_id = after
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=last_id))
+
+    rows = list(queryset.order_by('-created_at', '-id')[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor({'created_at': rows[-1].created_at.isoformat(), 'id': rows[-1].id})
+    return rows, next_cursor
+
+
+def paginate_by_id(queryset, last_id, limit):
+    """Keyset pagination over ``-id``: returns (rows, next_cursor)."""
+    if last_id is not None:
+        queryset = queryset.filter(id__lt=last_id)
+
+    rows = list(queryset.order_by('-id')[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor({'id': rows[-1].id})
+    return rows, next_cursor
+
+
+async def apaginate_by_id(queryset, last_id, limit, chunk_size=DEFAULT_PAGE_SIZE):
+    """Async ``paginate_by_id``, streaming the page with ``aiterator``."""
+    if last_id is not None:
+        queryset = queryset.filter(id__lt=last_id)
+
+    # chunk_size is required for prefetch_related() to run with aiterator()
+    rows = [row async for row in queryset.order_by('-id')[:limit + 1].aiterator(chunk_size=chunk_size)]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor({'id': rows[-1].id})
+    return rows, next_cursor
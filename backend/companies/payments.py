@@ -0,0 +1,150 @@
+# companies/payments.py
+import re
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from .analytics import transition_orders
+from .models import Order, Payment, PaymentCallback
+
+CALLBACK_BATCH_SIZE = 500
+
+PROVIDERS = [value for value, _ in PaymentCallback._meta.get_field('provider').choices]
+
+# Order ids as customers type them; ASCII only, since str.isdigit() also
+# accepts characters such as '²' that int() refuses
+ORDER_REFERENCE_RE = re.compile(r'[0-9]{1,18}')
+
+
+def _order_id(reference):
+    """The order id a callback refers to, or None when it is not one"""
+    return int(reference) if ORDER_REFERENCE_RE.fullmatch(reference) else None
+
+
+def parse_callback(provider, payload):
+    """Extract ``(transaction_id, order_reference, amount)`` from a callback.
+
+    M-Pesa C2B confirmations (``TransID``, ``TransAmount``, ``BillRefNumber``)
+    are understood natively; otherwise the body must carry
+    ``transaction_id``, ``order_id`` and ``amount``. Raises ValueError.
+    """
+    if provider not in PROVIDERS:
+        raise ValueError('Unknown payment provider')
+    if not isinstance(payload, dict):
+        raise ValueError('Expected an object')
+
+    if provider == 'mpesa' and 'TransID' in payload:
+        transaction_id, reference, amount = payload.get('TransID'), payload.get('BillRefNumber'), payload.get('TransAmount')
+    else:
+        transaction_id, reference, amount = payload.get('transaction_id'), payload.get('order_id'), payload.get('amount')
+
+    transaction_id = str(transaction_id or '').strip()
+    reference = str(reference or '').strip()
+    if not transaction_id or len(transaction_id) > 100:
+        raise ValueError('Invalid transaction id')
+    if not ORDER_REFERENCE_RE.fullmatch(reference):
+        raise ValueError('Invalid order reference')
+    try:
+        amount = Decimal(str(amount))
+    except (TypeError, ValueError, InvalidOperation):
+        raise ValueError('Invalid amount')
+    if not amount.is_finite() or amount <= 0:
+        raise ValueError('Invalid amount')
+    return transaction_id, reference, amount.quantize(Decimal('0.01'))
+
+
+def stage_callback(provider, payload):
+    """Append a callback to the staging table: a single INSERT.
+
+    Retries of an already staged transaction are ignored by the unique
+    (provider, transaction_id) constraint, so they cost the same and never
+    create a second row.
+    """
+    transaction_id, reference, amount = parse_callback(provider, payload)
+    PaymentCallback.objects.bulk_create(
+        [PaymentCallback(
+            provider=provider,
+            transaction_id=transaction_id,
+            order_reference=reference,
+            amount=amount,
+            payload=payload,
+        )],
+        ignore_conflicts=True,
+    )
+    return transaction_id
+
+
+def process_payment_callbacks(limit=CALLBACK_BATCH_SIZE):
+    """Apply up to ``limit`` staged callbacks in one transaction.
+
+    Creates the Payment rows in bulk and moves pending orders whose payments
+    now cover ``total_amount`` to ``paid``. Concurrent processors skip each
+    other's locked rows. A callback may arrive before its order is visible,
+    so one without an order stays pending and is retried every
+    PAYMENT_CALLBACK_RETRY_DELAY seconds until PAYMENT_CALLBACK_RETRY_WINDOW
+    seconds after it was received; only then is it rejected. Returns
+    ``{'applied', 'rejected', 'deferred', 'orders_paid'}``.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        callbacks = list(
+            PaymentCallback.objects
+            .select_for_update(skip_locked=True)
+            .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now), status='pending')
+            .order_by('id')[:limit]
+        )
+        if not callbacks:
+            return {'applied': 0, 'rejected': 0, 'deferred': 0, 'orders_paid': 0}
+
+        order_ids = {_order_id(cb.order_reference) for cb in callbacks} - {None}
+        orders = Order.objects.filter(pk__in=order_ids).only('id', 'status').in_bulk()
+
+        retry_until = now - timedelta(seconds=getattr(settings, 'PAYMENT_CALLBACK_RETRY_WINDOW', 3600))
+        next_attempt_at = now + timedelta(seconds=getattr(settings, 'PAYMENT_CALLBACK_RETRY_DELAY', 30))
+        payments, applied, rejected, deferred = [], [], [], []
+        for callback in callbacks:
+            order_id = _order_id(callback.order_reference)
+            order = orders.get(order_id)
+            if order is None and order_id is not None and callback.received_at > retry_until:
+                deferred.append(callback.pk)
+                continue
+            if order_id is None:
+                # Staged before references were checked; fails on its own
+                callback.error = 'Invalid order reference'
+            elif order is None:
+                callback.error = 'Unknown order'
+            elif order.status == 'cancelled':
+                callback.error = 'Order is cancelled'
+            else:
+                payments.append(Payment(
+                    order_id=order.id,
+                    amount=callback.amount,
+                    method=callback.provider,
+                    transaction_id=callback.transaction_id,
+                ))
+                applied.append(callback.pk)
+                continue
+            callback.status = 'rejected'
+            callback.processed_at = now
+            rejected.append(callback)
+
+        # The payment constraint makes a replayed callback a no-op as well
+        Payment.objects.bulk_create(payments, ignore_conflicts=True)
+        PaymentCallback.objects.filter(pk__in=applied).update(status='applied', processed_at=now)
+        PaymentCallback.objects.bulk_update(rejected, ['status', 'error', 'processed_at'])
+        PaymentCallback.objects.filter(pk__in=deferred).update(next_attempt_at=next_attempt_at)
+
+        covered = list(
+            Order.objects
+            .filter(pk__in={payment.order_id for payment in payments}, status='pending')
+            .annotate(paid=Sum('payments__amount'))
+            .filter(paid__gte=F('total_amount'))
+            .values_list('pk', flat=True)
+        )
+        paid = transition_orders(covered, 'paid') if covered else []
+
+    return {'applied': len(applied), 'rejected': len(rejected), 'deferred': len(deferred), 'orders_paid': len(paid)}
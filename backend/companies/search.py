@@ -0,0 +1,245 @@
+# companies/search.py
+"""Full-text product search.
+
+Products are indexed on their name, category names and description, in that
+order of weight. PostgreSQL keeps a ``tsvector`` in ``product.search_vector``
+(GIN indexed); SQLite keeps an FTS5 table, ``product_fts``. Both are
+created by migration 0008 and kept current by ``refresh_search_index``, which
+the signals and the bulk write paths call.
+"""
+import html
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import QuerySet
+
+from .models import Category, Product
+
+ProductCategory = Product.categories.through
+
+FTS_TABLE = 'product_fts'
+
+# Private-use characters mark highlighted terms; the text is escaped before
+# they are turned into <mark> tags, so product text can never inject HTML.
+MARK_START = '\ue000'
+MARK_END = '\ue001'
+
+TERM_RE = re.compile(r'\w+')
+MAX_TERMS = 16
+
+
+def search_terms(query):
+    """Split a user query into at most ``MAX_TERMS`` lower-case words."""
+    return TERM_RE.findall((query or '').lower())[:MAX_TERMS]
+
+
+def render_highlight(text):
+    if not text:
+        return text or ''
+    return html.escape(text).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+def _config():
+    return getattr(settings, 'SEARCH_CONFIG', 'english')
+
+
+def _tables():
+    qn = connection.ops.quote_name
+    return {
+        'product': qn(Product._meta.db_table),
+        'category': qn(Category._meta.db_table),
+        'links': qn(ProductCategory._meta.db_table),
+    }
+
+
+def _id_list(ids):
+    return [int(pk) for pk in ids]
+
+
+def _subquery(products):
+    """SQL and params selecting the ids of a product queryset"""
+    sql, params = products.values('pk').query.get_compiler(connection=connection).as_sql()
+    return sql, list(params)
+
+
+def _no_ids(product_ids):
+    # A queryset is sent as a subquery, never evaluated here
+    return not isinstance(product_ids, QuerySet) and not product_ids
+
+
+class PostgresSearch:
+    def refresh(self, product_ids):
+        t = _tables()
+        sql = f"""
+            UPDATE {t['product']} AS p SET search_vector =
+                setweight(to_tsvector(%s::regconfig, coalesce(p.name, '')), 'A') ||
+                setweight(to_tsvector(%s::regconfig, coalesce((
+                    SELECT string_agg(c.name, ' ')
+                    FROM {t['category']} c JOIN {t['links']} pc ON pc.category_id = c.id
+                    WHERE pc.product_id = p.id
+                ), '')), 'B') ||
+                setweight(to_tsvector(%s::regconfig, coalesce(p.description, '')), 'C')
+        """
+        params = [_config()] * 3
+        if isinstance(product_ids, QuerySet):
+            subquery, subquery_params = _subquery(product_ids)
+            sql += f' WHERE p.id IN ({subquery})'
+            params.extend(subquery_params)
+        elif product_ids is not None:
+            sql += ' WHERE p.id = ANY(%s)'
+            params.append(_id_list(product_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+    def remove(self, product_ids):
+        # The vector lives on the product row and goes away with it
+        pass
+
+    def search(self, user_id, terms, after, limit):
+        t = _tables()
+        query = ' & '.join(f'{term}:*' for term in terms)
+        options = f'StartSel={MARK_START}, StopSel={MARK_END}'
+        keyset, keyset_params = '', []
+        if after is not None:
+            keyset = 'AND (ts_rank(p.search_vector, q.query)::float8 < %s OR (ts_rank(p.search_vector, q.query)::float8 = %s AND p.id < %s))'
+            keyset_params = [after[0], after[0], after[1]]
+        # Headlines are expensive, so only the rows of the page get one
+        sql = f"""
+            WITH q AS (SELECT to_tsquery(%s::regconfig, %s) AS query)
+            SELECT page.id, page.score,
+                   ts_headline(%s::regconfig, page.name, q.query, %s),
+                   ts_headline(%s::regconfig, coalesce(page.description, ''), q.query, %s)
+            FROM (
+                SELECT p.id, p.name, p.description, ts_rank(p.search_vector, q.query)::float8 AS score
+                FROM {t['product']} p, q
+                WHERE p.user_id = %s AND p.search_vector @@ q.query {keyset}
+                ORDER BY score DESC, p.id DESC
+                LIMIT %s
+            ) page, q
+            ORDER BY page.score DESC, page.id DESC
+        """
+        params = [
+            _config(), query,
+            _config(), f'{options}, HighlightAll=true',
+            _config(), f'{options}, MaxWords=30, MinWords=12, MaxFragments=2',
+            user_id, *keyset_params, limit,
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+class SqliteSearch:
+    def refresh(self, product_ids):
+        t = _tables()
+        where, params = '', []
+        if isinstance(product_ids, QuerySet):
+            subquery, params = _subquery(product_ids)
+            where = f'WHERE p.id IN ({subquery})'
+        elif product_ids is not None:
+            product_ids = _id_list(product_ids)
+            if not product_ids:
+                return
+            where = f"WHERE p.id IN ({', '.join(['%s'] * len(product_ids))})"
+            params = product_ids
+        with connection.cursor() as cursor:
+            if product_ids is None:
+                cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(f"""
+                INSERT OR REPLACE INTO {FTS_TABLE} (rowid, name, categories, description, user_id)
+                SELECT p.id, p.name, coalesce((
+                    SELECT group_concat(c.name, ' ')
+                    FROM {t['category']} c JOIN {t['links']} pc ON pc.category_id = c.id
+                    WHERE pc.product_id = p.id
+                ), ''), coalesce(p.description, ''), p.user_id
+                FROM {t['product']} p {where}
+            """, params)
+
+    def remove(self, product_ids):
+        if isinstance(product_ids, QuerySet):
+            subquery, params = _subquery(product_ids)
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({subquery})', params)
+            return
+        product_ids = _id_list(product_ids)
+        if product_ids:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(product_ids))})",
+                    product_ids,
+                )
+
+    def search(self, user_id, terms, after, limit):
+        query = ' '.join(f'"{term}"*' for term in terms)
+        keyset, keyset_params = '', []
+        if after is not None:
+            keyset = 'WHERE score < %s OR (score = %s AND id < %s)'
+            keyset_params = [after[0], after[0], after[1]]
+        # bm25() is lower-is-better; negate it so both backends sort DESC
+        sql = f"""
+            SELECT id, score, name_hl, description_hl FROM (
+                SELECT rowid AS id,
+                       -bm25({FTS_TABLE}, 10.0, 5.0, 1.0) AS score,
+                       highlight({FTS_TABLE}, 0, %s, %s) AS name_hl,
+                       snippet({FTS_TABLE}, 2, %s, %s, '…', 24) AS description_hl
+                FROM {FTS_TABLE}
+                WHERE {FTS_TABLE} MATCH %s AND user_id = %s
+            ) {keyset}
+            ORDER BY score DESC, id DESC
+            LIMIT %s
+        """
+        params = [MARK_START, MARK_END, MARK_START, MARK_END, query, user_id, *keyset_params, limit]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+BACKENDS = {
+    'postgresql': PostgresSearch,
+    'sqlite': SqliteSearch,
+}
+
+
+def get_backend():
+    try:
+        return BACKENDS[connection.vendor]()
+    except KeyError:
+        raise NotImplementedError(f'Product search is not supported on {connection.vendor}')
+
+
+def refresh_search_index(product_ids=None):
+    """Re-index the given products (all of them when ``product_ids`` is None).
+
+    ``product_ids`` is a list of ids or a queryset of products.
+    """
+    if product_ids is not None and _no_ids(product_ids):
+        return
+    if connection.vendor in BACKENDS:
+        get_backend().refresh(product_ids)
+
+
+def remove_from_search_index(product_ids):
+    """Drop the given products from the index.
+
+    A queryset of products must be passed before they are deleted.
+    """
+    if not _no_ids(product_ids) and connection.vendor in BACKENDS:
+        get_backend().remove(product_ids)
+
+
+def search_products(user_id, query, after=None, limit=20):
+    """Ranked matches for ``query`` among one tenant's products.
+
+    ``after`` is the ``(score, id)`` of the last row of the previous page.
+    Returns a list of ``(product_id, score, name_highlight,
+    description_highlight)`` with the highlights rendered as safe HTML.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    rows = get_backend().search(user_id, terms, after, limit)
+    return [
+        (product_id, float(score), render_highlight(name), render_highlight(description))
+        for product_id, score, name, description in rows
+    ]
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from .models import StoreConfig, Category, Product, Customer, Order, OrderItem, Payment
+from django.db.models import Prefetch
 from django.conf import settings
+from django.core.files.storage import default_storage
 
 # StoreConfig Serializer
 class StoreConfigSerializer(serializers.ModelSerializer):
@@ -14,7 +16,24 @@ class StoreConfigSerializer(serializers.ModelSerializer):
 
 
 
-class ProductSerializer(serializers.ModelSerializer):
+# Product image URLs, shared by the full and the summary product serializers
+class ProductImageMixin:
+    def get_image(self, obj):
+        request = self.context.get('request')  # pick up request if passed
+        if obj.image:
+            if request:
+                return request.build_absolute_uri(obj.image.url)
+            else:
+                return f"{settings.MEDIA_URL}{obj.image}"
+        return None
+
+    def _media_url(self, path):
+        request = self.context.get('request')
+        url = default_storage.url(path)
+        return request.build_absolute_uri(url) if request else url
+
+
+class ProductSerializer(ProductImageMixin, serializers.ModelSerializer):
     categories = serializers.SlugRelatedField(
         many=True,
         read_only=True,
@@ -22,27 +41,43 @@ class ProductSerializer(serializers.ModelSerializer):
     )
     primary_category = serializers.SerializerMethodField()
     image = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
         fields = [
             "id", "name", "description", "price",
-            "image", "rating", "reviews_count", "is_available",
+            "image", "image_variants", "image_srcset", "rating", "reviews_count", "is_available",
             "badge", "categories", "primary_category"
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load everything the serializer reads in a fixed number of queries"""
+        return queryset.select_related('primary_category').prefetch_related('categories')
+
     def get_primary_category(self, obj):
-        first_category = obj.categories.first()
-        return first_category.name if first_category else "Uncategorized"
-    
-    def get_image(self, obj):
-        request = self.context.get('request')  # pick up request if passed
-        if obj.image:
-            if request:
-                return request.build_absolute_uri(obj.image.url)
-            else:
-                return f"{settings.MEDIA_URL}{obj.image}"
-        return None
+        if obj.primary_category_id is None:
+            return "Uncategorized"
+        return obj.primary_category.name
+
+    def get_image_variants(self, obj):
+        variants = {}
+        for name, variant in (obj.image_variants or {}).items():
+            variants[name] = {
+                'width': variant['width'],
+                'height': variant['height'],
+                'webp': self._media_url(variant['webp']),
+                'jpeg': self._media_url(variant['jpeg']),
+            }
+        return variants
+
+    def get_image_srcset(self, obj):
+        variants = sorted((obj.image_variants or {}).values(), key=lambda v: v['width'])
+        if not variants:
+            return None
+        return ', '.join(f"{self._media_url(v['webp'])} {v['width']}w" for v in variants)
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -54,10 +89,10 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'image', 'description', 'count', 'productCount']
 
     def get_count(self, obj):
-        return f'{obj.products.count()}+ products'
+        return f'{obj.product_count}+ products'
 
     def get_productCount(self, obj):
-        return obj.products.count()
+        return obj.product_count
 
 # Customer Serializer
 class CustomerSerializer(serializers.ModelSerializer):
@@ -65,6 +100,14 @@ class CustomerSerializer(serializers.ModelSerializer):
         model = Customer
         fields = ['id', 'name', 'email', 'phone', 'address']
 
+# Slim product for order listings
+class ProductSummarySerializer(ProductImageMixin, serializers.ModelSerializer):
+    image = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        fields = ["id", "name", "price", "image"]
+
 # Order Item Serializer
 class OrderItemSerializer(serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
@@ -91,6 +134,28 @@ class OrderSerializer(serializers.ModelSerializer):
             'status', 'created_at'
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset, summary=False):
+        """Fixed prefetch plan: one query each for orders (with customers),
+        items (with products) and, for full products, their categories"""
+        items = OrderItem.objects.select_related('product')
+        if summary:
+            items = items.only('id', 'order_id', 'quantity', 'price', 'product__id', 'product__name',
+                               'product__price', 'product__image')
+        else:
+            items = items.select_related('product__primary_category')
+        lookups = [Prefetch('items', queryset=items)]
+        if not summary:
+            lookups.append('items__product__categories')
+        return queryset.select_related('customer').prefetch_related(*lookups)
+
+# Order with slim product summaries in its items
+class OrderItemSummarySerializer(OrderItemSerializer):
+    product = ProductSummarySerializer(read_only=True)
+
+class OrderSummarySerializer(OrderSerializer):
+    items = OrderItemSummarySerializer(many=True, read_only=True)
+
 # Payment Serializer
 class PaymentSerializer(serializers.ModelSerializer):
     order = OrderSerializer(read_only=True)
@@ -0,0 +1,298 @@
+# companies/signals.py
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models import Count, F, Min, OuterRef, QuerySet, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .analytics import apply_orders_to_rollups, apply_status_change
+from .cache import catalog_changed, invalidate_catalog
+from .models import BusinessProfile, Category, Order, Product, StoreConfig
+from .search import refresh_search_index, remove_from_search_index
+from .snapshots import remove_snapshot, schedule_snapshot
+from .tenants import forget_tenant, normalize_subdomain
+from saas.db_router import pin_to_primary
+
+ProductCategory = Product.categories.through
+
+# Set while a set-based write is running; it maintains counters and bumps the
+# catalog version itself instead of once per row.
+_bulk_write = ContextVar('bulk_catalog_write', default=False)
+
+
+@contextmanager
+def bulk_catalog_write():
+    token = _bulk_write.set(True)
+    try:
+        yield
+    finally:
+        _bulk_write.reset(token)
+
+
+def adjust_product_counts(category_ids, delta):
+    """Atomically shift ``Category.product_count`` for the given categories."""
+    if category_ids and delta:
+        Category.objects.filter(pk__in=category_ids).update(product_count=F('product_count') + delta)
+
+
+def recount_product_counts(category_ids=None):
+    """Recompute counters from the through table in a single UPDATE.
+
+    Returns the number of categories updated.
+    """
+    linked = (
+        ProductCategory.objects
+        .filter(category_id=OuterRef('pk'))
+        .order_by()
+        .values('category_id')
+        .annotate(total=Count('product_id'))
+        .values('total')
+    )
+    categories = Category.objects.all()
+    if category_ids is not None:
+        categories = categories.filter(pk__in=category_ids)
+    return categories.update(product_count=Coalesce(Subquery(linked), Value(0)))
+
+
+def refresh_primary_categories(product_ids, only_missing=False):
+    """Point ``Product.primary_category`` at the lowest linked category.
+
+    ``product_ids`` may also be a queryset of products. With
+    ``only_missing`` products that already have one are left alone.
+    """
+    if not isinstance(product_ids, QuerySet) and not product_ids:
+        return 0
+    first_linked = (
+        ProductCategory.objects
+        .filter(product_id=OuterRef('pk'))
+        .order_by()
+        .values('product_id')
+        .annotate(first=Min('category_id'))
+        .values('first')
+    )
+    products = Product.objects.filter(pk__in=product_ids)
+    if only_missing:
+        products = products.filter(primary_category__isnull=True)
+    return products.update(primary_category_id=Subquery(first_linked))
+
+
+@receiver(m2m_changed, sender=ProductCategory)
+def update_category_product_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'post_add':
+        # Django only reports the links it actually inserted
+        if reverse:
+            adjust_product_counts([instance.pk], len(pk_set))
+        else:
+            adjust_product_counts(pk_set, 1)
+
+    elif action == 'pre_remove':
+        # remove() reports every requested id, linked or not
+        if reverse:
+            links = ProductCategory.objects.filter(category_id=instance.pk, product_id__in=pk_set)
+            instance._removed_links = list(links.values_list('product_id', flat=True))
+        else:
+            links = ProductCategory.objects.filter(product_id=instance.pk, category_id__in=pk_set)
+            instance._removed_links = list(links.values_list('category_id', flat=True))
+
+    elif action == 'post_remove':
+        removed = getattr(instance, '_removed_links', [])
+        if reverse:
+            adjust_product_counts([instance.pk], -len(removed))
+        else:
+            adjust_product_counts(removed, -1)
+
+    elif action == 'pre_clear':
+        if reverse:
+            instance._removed_links = list(instance.products.values_list('pk', flat=True))
+        else:
+            instance._removed_links = list(instance.categories.values_list('pk', flat=True))
+
+    elif action == 'post_clear':
+        removed = getattr(instance, '_removed_links', [])
+        if reverse:
+            adjust_product_counts([instance.pk], -len(removed))
+        else:
+            adjust_product_counts(removed, -1)
+
+
+@receiver(m2m_changed, sender=ProductCategory)
+def update_primary_category(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'post_add':
+        if reverse:
+            refresh_primary_categories(pk_set, only_missing=True)
+        elif instance.primary_category_id is None:
+            refresh_primary_categories([instance.pk], only_missing=True)
+            instance.refresh_from_db(fields=['primary_category'])
+
+    elif action in ('post_remove', 'post_clear'):
+        removed = getattr(instance, '_removed_links', [])
+        if reverse:
+            affected = Product.objects.filter(pk__in=removed, primary_category=instance)
+            refresh_primary_categories(list(affected.values_list('pk', flat=True)))
+        elif instance.primary_category_id in removed:
+            refresh_primary_categories([instance.pk])
+            instance.refresh_from_db(fields=['primary_category'])
+
+
+@receiver(pre_delete, sender=Category)
+def remember_primary_category_products(sender, instance, **kwargs):
+    instance._primary_for = list(
+        Product.objects.filter(primary_category=instance).values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Category)
+def replace_deleted_primary_category(sender, instance, **kwargs):
+    refresh_primary_categories(getattr(instance, '_primary_for', []))
+
+
+@receiver(pre_delete, sender=Product)
+def release_category_product_counts(sender, instance, **kwargs):
+    if _bulk_write.get():
+        return
+    # The cascade removes through rows without sending m2m_changed
+    category_ids = list(instance.categories.values_list('pk', flat=True))
+    adjust_product_counts(category_ids, -1)
+
+
+SEARCHABLE_FIELDS = {'name', 'description'}
+
+
+@receiver(post_save, sender=Product)
+def index_saved_product(sender, instance, update_fields=None, **kwargs):
+    if _bulk_write.get():
+        return
+    if update_fields is not None and not SEARCHABLE_FIELDS.intersection(update_fields):
+        return
+    refresh_search_index([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_deleted_product(sender, instance, **kwargs):
+    if _bulk_write.get():
+        return
+    remove_from_search_index([instance.pk])
+
+
+@receiver(m2m_changed, sender=ProductCategory)
+def index_linked_products(sender, instance, action, reverse, pk_set, **kwargs):
+    # Category names are part of the indexed text
+    if action == 'post_add':
+        refresh_search_index(list(pk_set) if reverse else [instance.pk])
+    elif action in ('post_remove', 'post_clear'):
+        refresh_search_index(getattr(instance, '_removed_links', []) if reverse else [instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def index_renamed_category_products(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and 'name' not in update_fields):
+        return
+    refresh_search_index(list(
+        ProductCategory.objects.filter(category_id=instance.pk).values_list('product_id', flat=True)
+    ))
+
+
+@receiver(pre_delete, sender=Category)
+def remember_linked_products(sender, instance, **kwargs):
+    instance._linked_products = list(
+        ProductCategory.objects.filter(category_id=instance.pk).values_list('product_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Category)
+def reindex_unlinked_products(sender, instance, **kwargs):
+    refresh_search_index(getattr(instance, '_linked_products', []))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=StoreConfig)
+@receiver(post_delete, sender=StoreConfig)
+def invalidate_catalog_on_write(sender, instance, **kwargs):
+    if _bulk_write.get():
+        return
+    invalidate_catalog(instance.user_id)
+
+
+@receiver(m2m_changed, sender=ProductCategory)
+def invalidate_catalog_on_links(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_catalog(instance.user_id)
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_status(sender, instance, update_fields=None, **kwargs):
+    if instance.pk is None or (update_fields is not None and 'status' not in update_fields):
+        return
+    instance._previous_status = (
+        Order.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Order)
+def update_sales_rollups(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'status' not in update_fields:
+        return
+    previous = None if created else getattr(instance, '_previous_status', None)
+    apply_status_change(Order.objects.filter(pk=instance.pk), previous, instance.status)
+    instance._previous_status = instance.status
+
+
+@receiver(pre_delete, sender=Order)
+def remove_deleted_order_sales(sender, instance, **kwargs):
+    # Runs before the items cascade away
+    if instance.status == 'paid':
+        apply_orders_to_rollups(Order.objects.filter(pk=instance.pk), -1)
+
+
+@receiver(pre_save, sender=BusinessProfile)
+def remember_subdomain(sender, instance, **kwargs):
+    if instance.pk is not None:
+        instance._previous_subdomain = (
+            BusinessProfile.objects.filter(pk=instance.pk).values_list('subdomain', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=BusinessProfile)
+@receiver(post_delete, sender=BusinessProfile)
+def invalidate_tenant(sender, instance, **kwargs):
+    # A new subdomain may be cached as missing, the old one as this tenant
+    forget_tenant(
+        normalize_subdomain(instance.subdomain),
+        normalize_subdomain(getattr(instance, '_previous_subdomain', None)),
+    )
+
+
+@receiver(catalog_changed)
+def refresh_catalog_snapshot(sender, user_id, **kwargs):
+    schedule_snapshot(user_id)
+
+
+@receiver(catalog_changed)
+def pin_changed_catalog(sender, user_id, **kwargs):
+    # A replica still behind would get its old rows cached under the new
+    # catalog version, so read the tenant from the primary for a while
+    pin_to_primary(user_id)
+
+
+@receiver(post_save, sender=BusinessProfile)
+def refresh_profile_snapshot(sender, instance, **kwargs):
+    previous, user_id = getattr(instance, '_previous_subdomain', None), instance.user_id
+
+    def refresh():
+        if previous != instance.subdomain:
+            remove_snapshot(previous)
+        schedule_snapshot(user_id)
+
+    transaction.on_commit(refresh)
+
+
+@receiver(post_delete, sender=BusinessProfile)
+def remove_profile_snapshot(sender, instance, **kwargs):
+    subdomain = instance.subdomain
+    transaction.on_commit(lambda: remove_snapshot(subdomain))
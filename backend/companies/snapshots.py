@@ -0,0 +1,236 @@
+# companies/snapshots.py
+"""Pre-rendered storefront documents.
+
+Each store with a subdomain gets ``<subdomain>.json`` in
+``MEDIA_ROOT/<STOREFRONT_SNAPSHOT_DIR>``, next to ``.json.gz`` and, when the
+``brotli`` package is installed, ``.json.br`` copies, so a web server can
+send them as they are (nginx ``gzip_static``/``brotli_static``). Catalog
+changes rebuild a store's files after a debounce; every file is replaced
+atomically, so readers never see a partial document.
+"""
+import gzip
+import json
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, connections
+
+from .cache import catalog_version
+from .models import BusinessProfile, Category, Product, StoreConfig
+from .serializers import CategorySerializer, ProductSerializer, StoreConfigSerializer
+from .tenants import normalize_subdomain
+
+try:
+    import brotli
+except ImportError:  # optional: only the plain and gzip files are written
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+
+def snapshot_dir():
+    return Path(settings.MEDIA_ROOT) / getattr(settings, 'STOREFRONT_SNAPSHOT_DIR', 'storefronts')
+
+
+def snapshot_paths(subdomain):
+    """Files of one store's snapshot, keyed by encoding.
+
+    ``subdomain`` must already be normalized; it becomes the file name.
+    """
+    base = snapshot_dir() / f'{subdomain}.json'
+    paths = {'identity': base, 'gzip': base.with_name(f'{base.name}.gz')}
+    if brotli is not None:
+        paths['br'] = base.with_name(f'{base.name}.br')
+    return paths
+
+
+def build_snapshot(profile):
+    """The storefront document of ``profile``'s store, as a dict.
+
+    Same shapes as the storefront API, with every product in one list;
+    media URLs are relative to the site.
+    """
+    user_id = profile.user_id
+    config = StoreConfig.objects.filter(user_id=user_id).first()
+    categories = Category.objects.filter(user_id=user_id).order_by('name')
+    products = ProductSerializer.setup_eager_loading(Product.objects.filter(user_id=user_id).order_by('-id'))
+    return {
+        'version': SNAPSHOT_VERSION,
+        'store': StoreConfigSerializer(config or StoreConfig(user_id=user_id)).data,
+        'business_name': profile.business_name,
+        'subdomain': profile.subdomain,
+        'categories': CategorySerializer(categories, many=True).data,
+        'products': ProductSerializer(products, many=True).data,
+    }
+
+
+def _replace(path, data):
+    """Write ``data`` next to ``path`` and rename it into place."""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        # mkstemp creates 0600 files; the web server must be able to read them
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def write_snapshot(user_id):
+    """Rebuild one store's snapshot files.
+
+    Returns the plain JSON path, or None for tenants without a subdomain
+    and for renders overtaken by a catalog change (whose own rebuild is
+    scheduled). Files whose content did not change are left alone.
+    """
+    version = catalog_version(user_id)
+    profile = BusinessProfile.objects.filter(user_id=user_id).only('user_id', 'business_name', 'subdomain').first()
+    subdomain = normalize_subdomain(profile.subdomain) if profile is not None else None
+    if subdomain is None:
+        return None
+
+    document = json.dumps(
+        build_snapshot(profile), cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')
+    ).encode('utf-8')
+    paths = snapshot_paths(subdomain)
+    paths['identity'].parent.mkdir(parents=True, exist_ok=True)
+
+    try:
+        if paths['identity'].read_bytes() == document and all(path.exists() for path in paths.values()):
+            return paths['identity']
+    except FileNotFoundError:
+        pass
+
+    # The compressed copies go first, so the plain file is never newer than them
+    files = {'gzip': gzip.compress(document, compresslevel=9, mtime=0)}
+    if 'br' in paths:
+        files['br'] = brotli.compress(document, quality=11)
+    files['identity'] = document
+    for encoding, data in files.items():
+        # Another process may be rendering the same store; an older render
+        # must not replace a newer one
+        if catalog_version(user_id) != version:
+            logger.info(f"Dropped stale storefront snapshot for user {user_id}")
+            return None
+        _replace(paths[encoding], data)
+    return paths['identity']
+
+
+def remove_snapshot(subdomain):
+    subdomain = normalize_subdomain(subdomain)
+    if subdomain is None:
+        return
+    for path in snapshot_paths(subdomain).values():
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _run(user_id):
+    close_old_connections()
+    try:
+        return write_snapshot(user_id)
+    except Exception as e:
+        logger.error(f"Error writing storefront snapshot for user {user_id}: {str(e)}")
+        return False
+    finally:
+        close_old_connections()
+
+
+def _init_worker():
+    # Forked workers inherit a configured Django; spawned ones start bare
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def write_snapshots(user_ids=None, workers=None):
+    """Rebuild the snapshots of ``user_ids`` (every store when None).
+
+    Rendering is CPU bound, so stores are spread over a pool of ``workers``
+    processes; ``workers=1`` renders in this process. Returns
+    ``{'written', 'skipped', 'failed'}``.
+    """
+    if user_ids is None:
+        user_ids = list(
+            BusinessProfile.objects.exclude(subdomain__isnull=True).exclude(subdomain='')
+            .order_by('user_id').values_list('user_id', flat=True)
+        )
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(user_ids) <= 1:
+        results = [_run(user_id) for user_id in user_ids]
+    else:
+        # Children must open their own connections, not share ours
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            results = list(pool.map(_run, user_ids, chunksize=max(1, len(user_ids) // (workers * 4))))
+
+    return {
+        'written': sum(1 for result in results if result),
+        'skipped': sum(1 for result in results if result is None),
+        'failed': sum(1 for result in results if result is False),
+    }
+
+
+class SnapshotScheduler:
+    """Debounces rebuild requests per tenant.
+
+    Every change of a tenant (re)starts its timer, so ``callback`` runs
+    once ``delay`` seconds have passed without a change. The tenant is
+    released before ``callback`` runs, so a change made during a rebuild
+    schedules another one.
+    """
+
+    def __init__(self, callback, delay):
+        self.callback = callback
+        self.delay = delay
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def schedule(self, user_id):
+        timer = threading.Timer(self.delay, self._fire, args=(user_id,))
+        timer.daemon = True
+        with self._lock:
+            previous = self._pending.get(user_id)
+            if previous is not None:
+                previous.cancel()
+            self._pending[user_id] = timer
+        timer.start()
+
+    def _fire(self, user_id):
+        with self._lock:
+            # A timer replaced while it was already firing must not run
+            if self._pending.get(user_id) is not threading.current_thread():
+                return
+            del self._pending[user_id]
+        self.callback(user_id)
+
+
+snapshot_scheduler = SnapshotScheduler(_run, getattr(settings, 'STOREFRONT_SNAPSHOT_DEBOUNCE', 5))
+
+
+def schedule_snapshot(user_id):
+    """Rebuild a tenant's snapshot once its catalog has been quiet for a bit.
+
+    Call after the change has committed.
+    """
+    if getattr(settings, 'STOREFRONT_SNAPSHOTS', True):
+        snapshot_scheduler.schedule(user_id)
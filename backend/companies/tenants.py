@@ -0,0 +1,116 @@
+# companies/tenants.py
+"""Subdomain -> tenant lookup for middleware.tenant_middleware.
+
+Resolved tenants are kept in a per-process TTL map in front of the shared
+Django cache, so a warm lookup is a dictionary access. Saving or deleting a
+BusinessProfile drops its entries (see companies.signals); other processes
+pick the change up once their local entry expires.
+"""
+import ipaddress
+import re
+from collections import namedtuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from saas.ttl_cache import TTLCache
+
+from .models import BusinessProfile
+
+Tenant = namedtuple('Tenant', ['profile_id', 'user_id', 'subdomain', 'business_name'])
+
+SUBDOMAIN_RE = re.compile(r'^[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?$')
+
+# Stored for subdomains without a profile, so probing random hosts is as
+# cheap as hitting a real tenant.
+MISSING = False
+
+tenant_cache = TTLCache(
+    maxsize=getattr(settings, 'TENANT_CACHE_SIZE', 20000),
+    ttl=getattr(settings, 'TENANT_CACHE_TTL', 30),
+)
+
+
+def _tenant_cache_key(subdomain):
+    return f'tenant:{subdomain}'
+
+
+def normalize_subdomain(value, from_host=False):
+    """The tenant label of a ``retailer-domain`` header or a request host.
+
+    The first DNS label is used, so ``acme`` and ``acme.example.com`` both
+    give ``acme``. Bare hosts (``localhost``) and IP addresses have no
+    tenant. Returns None when nothing usable is left.
+    """
+    value = (value or '').strip().lower().rstrip('.')
+    if not value:
+        return None
+    if from_host:
+        # get_host() keeps the port; IPv6 literals are bracketed
+        if value.startswith('['):
+            return None
+        value = value.rsplit(':', 1)[0]
+        try:
+            ipaddress.ip_address(value)
+            return None
+        except ValueError:
+            pass
+        if '.' not in value:
+            return None
+    label = value.split('.', 1)[0]
+    return label if SUBDOMAIN_RE.match(label) else None
+
+
+def _load_tenant(subdomain):
+    row = (
+        BusinessProfile.objects
+        .filter(subdomain=subdomain)
+        .values_list('pk', 'user_id', 'business_name')
+        .first()
+    )
+    return Tenant(row[0], row[1], subdomain, row[2]) if row else MISSING
+
+
+def lookup_tenant(subdomain):
+    """Return the Tenant serving ``subdomain``, or None."""
+    if not subdomain:
+        return None
+    entry = tenant_cache.get(subdomain)
+    if entry is not None:
+        return entry or None
+
+    key = _tenant_cache_key(subdomain)
+    entry = cache.get(key)
+    if entry is None:
+        entry = _load_tenant(subdomain)
+        cache.set(key, entry, getattr(settings, 'TENANT_SHARED_CACHE_TIMEOUT', 3600))
+    tenant_cache.set(subdomain, entry)
+    return entry or None
+
+
+async def alookup_tenant(subdomain):
+    """Async ``lookup_tenant``; only a local miss leaves the event loop."""
+    if not subdomain:
+        return None
+    entry = tenant_cache.get(subdomain)
+    if entry is not None:
+        return entry or None
+    return await sync_to_async(lookup_tenant)(subdomain)
+
+
+def forget_tenant(*subdomains):
+    subdomains = {subdomain for subdomain in subdomains if subdomain}
+    for subdomain in subdomains:
+        tenant_cache.delete(subdomain)
+    if subdomains:
+        cache.delete_many([_tenant_cache_key(subdomain) for subdomain in subdomains])
+
+
+def request_subdomain(request):
+    """The subdomain a request is addressed to: the ``retailer-domain``
+    header when present, otherwise the host."""
+    header = request.headers.get('retailer-domain')
+    if header:
+        return normalize_subdomain(header)
+    return normalize_subdomain(request.get_host(), from_host=True)
@@ -1,3 +1,1466 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections
+from django.conf import settings
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from companies.analytics import transition_orders
+from companies.bulk import batch_delete_products, batch_update_products
+from companies.images import build_variants, generate_image_variants
+from companies.cache import bump_catalog_version, catalog_cache_metrics
+from companies.checks import check_shared_cache
+from companies.filters import facet_counts
+from companies.models import (
+    BusinessProfile, Category, Customer, DailySales, Order, OrderItem, PaymentCallback, Product, ProductDailySales, StoreConfig,
+)
+from companies.customers import upsert_customers
+from companies.orders import place_order
+from companies.payments import process_payment_callbacks
+from companies.search import refresh_search_index
+from companies.serializers import ProductSerializer
+from companies.snapshots import SnapshotScheduler, build_snapshot, snapshot_paths, write_snapshot
+from companies.tenants import tenant_cache
+from middleware.tenant_middleware import TenantMiddleware
+
+
+# Snapshot rebuilds run on timer threads; SnapshotTests turns them back on
+@override_settings(STOREFRONT_SNAPSHOTS=False)
+class CatalogTestCase(APITestCase):
+    """Authenticated tenant with helpers to seed a catalog."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='tenant-1')
+        self.client.force_authenticate(self.user)
+
+    def make_products(self, count, user=None, **fields):
+        user = user or self.user
+        return Product.objects.bulk_create([
+            Product(user=user, name=f'Product {i}', price=Decimal('10.00') + i, **fields)
+            for i in range(count)
+        ])
+
+
+class ProductPaginationTests(CatalogTestCase):
+    def test_pages_follow_next_cursor(self):
+        self.make_products(25)
+        seen = []
+        url = '/api/products/?limit=10'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(p['id'] for p in response.data['products'])
+            cursor = response.data['next']
+            url = f'/api/products/?limit=10&cursor={cursor}' if cursor else None
+
+        expected = list(Product.objects.filter(user=self.user).order_by('-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_last_page_has_no_cursor(self):
+        self.make_products(3)
+        response = self.client.get('/api/products/?limit=10')
+        self.assertEqual(response.data['count'], 3)
+        self.assertIsNone(response.data['next'])
+        self.assertIsNone(response.data['total'])
+
+    def test_include_total(self):
+        self.make_products(12)
+        response = self.client.get('/api/products/?limit=5&include_total=true')
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(response.data['total'], 12)
+
+    def test_other_tenants_are_excluded(self):
+        other = User.objects.create(username='tenant-2')
+        self.make_products(4, user=other)
+        self.make_products(2)
+        response = self.client.get('/api/products/')
+        self.assertEqual(response.data['count'], 2)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get('/api/products/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+
+
+class ProductExportTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        products = self.make_products(5)
+        category = Category.objects.create(user=self.user, name='Audio')
+        products[0].categories.add(category)
+
+    def read(self, response):
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_ndjson_export(self):
+        response = self.client.get('/api/products/export/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = self.read(response).splitlines()
+        self.assertEqual(len(lines), 5)
+        first = json.loads(lines[0])
+        self.assertEqual(first['categories'], ['Audio'])
+
+    def test_json_array_export(self):
+        response = self.client.get('/api/products/export/?output=json')
+        rows = json.loads(self.read(response))
+        self.assertEqual([row['name'] for row in rows], [f'Product {i}' for i in range(5)])
+
+    def test_chunks_are_stitched_together(self):
+        with mock.patch('companies.views.export.EXPORT_CHUNK_SIZE', 2):
+            response = self.client.get('/api/products/export/?output=json')
+            rows = json.loads(self.read(response))
+        self.assertEqual(len(rows), 5)
+
+    def test_unknown_output(self):
+        response = self.client.get('/api/products/export/?output=xml')
+        self.assertEqual(response.status_code, 400)
+
+
+class CategoryProductCountTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.audio = Category.objects.create(user=self.user, name='Audio')
+        self.video = Category.objects.create(user=self.user, name='Video')
+        self.products = self.make_products(3)
+
+    def counts(self):
+        return dict(Category.objects.values_list('name', 'product_count'))
+
+    def test_add_and_remove(self):
+        for product in self.products:
+            product.categories.add(self.audio)
+        self.products[0].categories.add(self.audio, self.video)
+        self.assertEqual(self.counts(), {'Audio': 3, 'Video': 1})
+
+        self.products[0].categories.remove(self.audio, self.video)
+        self.products[1].categories.remove(self.video)  # not linked
+        self.assertEqual(self.counts(), {'Audio': 2, 'Video': 0})
+
+    def test_reverse_side_and_clear(self):
+        self.audio.products.add(*self.products)
+        self.assertEqual(self.counts()['Audio'], 3)
+        self.products[2].categories.add(self.video)
+
+        self.audio.products.clear()
+        self.products[2].categories.clear()
+        self.assertEqual(self.counts(), {'Audio': 0, 'Video': 0})
+
+    def test_product_delete(self):
+        self.products[0].categories.add(self.audio, self.video)
+        self.products[1].categories.add(self.audio)
+        Product.objects.filter(pk=self.products[0].pk).delete()
+        self.assertEqual(self.counts(), {'Audio': 1, 'Video': 0})
+
+    def test_recount_repairs_drift(self):
+        self.audio.products.add(*self.products)
+        Category.objects.update(product_count=42)
+        call_command('recount_category_products', stdout=io.StringIO())
+        self.assertEqual(self.counts(), {'Audio': 3, 'Video': 0})
+
+    def test_category_list_does_not_count_per_row(self):
+        self.audio.products.add(*self.products)
+        for i in range(10):
+            Category.objects.create(user=self.user, name=f'Extra {i}')
+        bump_catalog_version(self.user.id)
+        # One query for the store config, one for the categories
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/categories/')
+        audio = next(c for c in response.data['categories'] if c['name'] == 'Audio')
+        self.assertEqual(audio['productCount'], 3)
+        self.assertEqual(audio['count'], '3+ products')
+
+
+class PrimaryCategoryTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.audio = Category.objects.create(user=self.user, name='Audio')
+        self.video = Category.objects.create(user=self.user, name='Video')
+        self.product = self.make_products(1)[0]
+
+    def primary(self):
+        return Product.objects.get(pk=self.product.pk).primary_category
+
+    def test_first_category_becomes_primary(self):
+        self.product.categories.add(self.video)
+        self.product.categories.add(self.audio)
+        self.assertEqual(self.primary(), self.video)
+
+    def test_removing_primary_falls_back(self):
+        self.product.categories.add(self.audio, self.video)
+        self.product.categories.remove(self.audio)
+        self.assertEqual(self.primary(), self.video)
+        self.product.categories.clear()
+        self.assertIsNone(self.primary())
+
+    def test_reverse_side(self):
+        self.audio.products.add(self.product)
+        self.assertEqual(self.primary(), self.audio)
+        self.video.products.add(self.product)
+        self.audio.products.remove(self.product)
+        self.assertEqual(self.primary(), self.video)
+
+    def test_deleting_category_falls_back(self):
+        self.product.categories.add(self.audio, self.video)
+        self.audio.delete()
+        self.assertEqual(self.primary(), self.video)
+
+    def test_list_query_count_is_constant(self):
+        products = self.make_products(1000)
+        ProductCategory = Product.categories.through
+        ProductCategory.objects.bulk_create(
+            [ProductCategory(product=p, category=self.audio) for p in products]
+            + [ProductCategory(product=p, category=self.video) for p in products[::2]]
+        )
+        Product.objects.filter(user=self.user).update(primary_category=self.audio)
+
+        # Products, then categories prefetch
+        with self.assertNumQueries(2):
+            queryset = ProductSerializer.setup_eager_loading(Product.objects.filter(user=self.user))
+            data = ProductSerializer(queryset, many=True).data
+        self.assertEqual(len(data), 1001)
+        self.assertEqual(data[-1]['primary_category'], 'Audio')
+
+        bump_catalog_version(self.user.id)
+        # Store config, products page, categories prefetch
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/products/?limit=200')
+        self.assertEqual(response.data['count'], 200)
+
+
+class CatalogCacheTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.make_products(3)
+        Category.objects.create(user=self.user, name='Audio')
+
+    def test_warm_reads_hit_no_database(self):
+        for url in ['/api/products/', '/api/categories/']:
+            self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+            with self.assertNumQueries(0):
+                response = self.client.get(url)
+            self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_write_bumps_version(self):
+        self.client.get('/api/products/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_products(1)[0].save()
+        response = self.client.get('/api/products/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['count'], 4)
+
+    def test_category_link_bumps_version(self):
+        self.client.get('/api/categories/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.first().categories.add(Category.objects.get(name='Audio'))
+        response = self.client.get('/api/categories/')
+        self.assertEqual(response.data['categories'][0]['productCount'], 1)
+
+    def test_store_config_bumps_version(self):
+        self.client.get('/api/categories/')
+        with self.captureOnCommitCallbacks(execute=True):
+            StoreConfig.objects.create(user=self.user, store_name='Gadget Hub')
+        response = self.client.get('/api/categories/')
+        self.assertEqual(response.data['store']['name'], 'Gadget Hub')
+
+    def test_tenants_do_not_share_entries(self):
+        self.client.get('/api/products/')
+        other = User.objects.create(username='tenant-2')
+        self.client.force_authenticate(other)
+        response = self.client.get('/api/products/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['count'], 0)
+
+    def test_metrics(self):
+        self.client.get('/api/products/')
+        self.client.get('/api/products/')
+        self.assertEqual(catalog_cache_metrics(), {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+        self.assertEqual(self.client.get('/api/cache/metrics/').status_code, 403)
+
+
+class SharedCacheCheckTests(CatalogTestCase):
+    def test_process_local_cache_is_refused(self):
+        locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with override_settings(CACHES=locmem, ALLOW_PROCESS_LOCAL_CACHE=False):
+            self.assertEqual([error.id for error in check_shared_cache(None)], ['companies.E001'])
+        with override_settings(CACHES=locmem, ALLOW_PROCESS_LOCAL_CACHE=True):
+            self.assertEqual(check_shared_cache(None), [])
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://x'}}
+        with override_settings(CACHES=redis, ALLOW_PROCESS_LOCAL_CACHE=False):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+class ConditionalGetTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.make_products(3)
+
+    def test_if_none_match_returns_304_without_queries(self):
+        for url in ['/api/products/?limit=2', '/api/categories/']:
+            response = self.client.get(url)
+            etag = response['ETag']
+            with self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], etag)
+
+    def test_if_modified_since(self):
+        response = self.client.get('/api/products/')
+        response = self.client.get('/api/products/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_pages_have_distinct_etags(self):
+        first = self.client.get('/api/products/?limit=1')
+        second = self.client.get('/api/products/?limit=2')
+        self.assertNotEqual(first['ETag'], second['ETag'])
+
+    def test_write_changes_validators(self):
+        response = self.client.get('/api/products/')
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.first().save()
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_last_modified_falls_back_to_updated_at(self):
+        latest = Product.objects.order_by('-updated_at').first().updated_at
+        response = self.client.get('/api/products/')
+        self.assertEqual(response['Last-Modified'], http_date(int(latest.timestamp())))
+
+
+class ProductImportTests(CatalogTestCase):
+    def test_json_import(self):
+        Category.objects.create(user=self.user, name='Audio')
+        rows = [
+            {'name': f'Speaker {i}', 'price': '19.99', 'categories': ['Audio', 'Sale']}
+            for i in range(50)
+        ] + [{'name': 'Plain', 'price': 5, 'inStock': 'false'}]
+
+        with self.assertNumQueries(9):
+            response = self.client.post('/api/products/import/', rows, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['imported'], 51)
+
+        counts = dict(Category.objects.values_list('name', 'product_count'))
+        self.assertEqual(counts, {'Audio': 50, 'Sale': 50})
+        speaker = Product.objects.get(name='Speaker 3')
+        self.assertEqual(speaker.primary_category.name, 'Audio')
+        self.assertFalse(Product.objects.get(name='Plain').is_available)
+
+    def test_csv_import(self):
+        upload = io.BytesIO(
+            b'name,price,originalPrice,rating,reviews,inStock,badge,categories\n'
+            b'Headphones,49.50,60,4.5,10,true,sale,Audio|Wireless\n'
+            b'Cable,3,,,,,,\n'
+        )
+        upload.name = 'products.csv'
+        response = self.client.post('/api/products/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        headphones = Product.objects.get(name='Headphones')
+        self.assertEqual(headphones.price, Decimal('49.50'))
+        self.assertEqual(headphones.badge, 'sale')
+        self.assertEqual(sorted(headphones.categories.values_list('name', flat=True)), ['Audio', 'Wireless'])
+        self.assertEqual(Product.objects.get(name='Cable').categories.count(), 0)
+
+    def test_invalid_rows_reject_the_import(self):
+        rows = [
+            {'name': 'Good', 'price': 1},
+            {'name': 'Bad price', 'price': 'abc'},
+            {'price': 2},
+            {'name': 'NaN price', 'price': 'NaN'},
+            {'name': 'Infinite original', 'price': 1, 'originalPrice': 'Infinity'},
+            {'name': 'x' * 256, 'price': 1},
+            {'name': 'Huge price', 'price': '1e12'},
+            {'name': 'Huge original', 'price': 1, 'originalPrice': '99999999.995'},
+            {'name': 'Odd badge', 'price': 1, 'badge': 'clearance'},
+            {'name': 'Rounded', 'price': '9.999'},
+        ]
+        response = self.client.post('/api/products/import/', rows, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'], [
+            {'row': 2, 'error': 'Invalid price format'},
+            {'row': 3, 'error': 'name is required'},
+            {'row': 4, 'error': 'Invalid price format'},
+            {'row': 5, 'error': 'Invalid original price format'},
+            {'row': 6, 'error': 'name is too long'},
+            {'row': 7, 'error': 'Price is too large'},
+            {'row': 8, 'error': 'Original price is too large'},
+            {'row': 9, 'error': 'Invalid badge'},
+        ])
+        self.assertFalse(Product.objects.exists())
+
+    def test_create_rejects_non_finite_price(self):
+        response = self.client.post('/api/products/', {'name': 'Lamp', 'price': 'NaN'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Invalid price format')
+
+
+class ProductBatchTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.audio = Category.objects.create(user=self.user, name='Audio')
+        self.products = self.make_products(20)
+        for product in self.products[:10]:
+            product.categories.add(self.audio)
+
+    def test_percentage_reprice_by_category(self):
+        body = {'filter': {'category': 'Audio'}, 'patch': {'price_percent': -10}}
+        with self.assertNumQueries(4):
+            response = self.client.patch('/api/products/batch/', body, format='json')
+        self.assertEqual(response.data['updated'], 10)
+        self.assertEqual(Product.objects.get(pk=self.products[5].pk).price, Decimal('13.50'))
+        self.assertEqual(Product.objects.get(pk=self.products[15].pk).price, Decimal('25.00'))
+
+    def test_mark_out_of_stock_by_ids(self):
+        ids = [p.pk for p in self.products[:3]]
+        body = {'ids': ids, 'patch': {'is_available': False, 'badge': 'out_of_stock'}}
+        response = self.client.patch('/api/products/batch/', body, format='json')
+        self.assertEqual(response.data['updated'], 3)
+        self.assertEqual(Product.objects.filter(is_available=False, badge='out_of_stock').count(), 3)
+
+    def test_add_and_remove_categories(self):
+        body = {'all': True, 'patch': {'add_categories': ['Sale'], 'remove_categories': ['Audio']}}
+        response = self.client.patch('/api/products/batch/', body, format='json')
+        self.assertEqual(response.data['updated'], 20)
+        counts = dict(Category.objects.values_list('name', 'product_count'))
+        self.assertEqual(counts, {'Audio': 0, 'Sale': 20})
+        self.assertFalse(Product.objects.exclude(primary_category__name='Sale').exists())
+
+    def test_other_tenants_are_untouched(self):
+        other = User.objects.create(username='tenant-2')
+        foreign = self.make_products(1, user=other)[0]
+        body = {'ids': [foreign.pk], 'patch': {'price': '1.00'}}
+        response = self.client.patch('/api/products/batch/', body, format='json')
+        self.assertEqual(response.data['updated'], 0)
+        self.assertEqual(Product.objects.get(pk=foreign.pk).price, Decimal('10.00'))
+
+    def test_batch_delete(self):
+        body = {'filter': {'category': 'Audio'}}
+        response = self.client.delete('/api/products/batch/', body, format='json')
+        self.assertEqual(response.data['deleted'], 10)
+        self.assertEqual(Product.objects.count(), 10)
+        self.assertEqual(Category.objects.get(pk=self.audio.pk).product_count, 0)
+
+    def test_patch_may_change_what_selected_the_products(self):
+        body = {'filter': {'category': 'Audio'}, 'patch': {'remove_categories': ['Audio'], 'add_categories': ['Sale']}}
+        response = self.client.patch('/api/products/batch/', body, format='json')
+        self.assertEqual(response.data['updated'], 10)
+        counts = dict(Category.objects.values_list('name', 'product_count'))
+        self.assertEqual(counts, {'Audio': 0, 'Sale': 10})
+        self.assertEqual(Product.objects.filter(primary_category__name='Sale').count(), 10)
+
+    def test_non_finite_price_patch_is_rejected(self):
+        for patch in ({'price': 'NaN'}, {'price_percent': 'Infinity'}):
+            response = self.client.patch('/api/products/batch/', {'ids': [1], 'patch': patch}, format='json')
+            self.assertEqual(response.status_code, 400)
+
+    def test_selection_is_required(self):
+        response = self.client.patch('/api/products/batch/', {'patch': {'price': 1}}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.patch('/api/products/batch/', {'ids': [1], 'patch': {'colour': 'red'}}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_bad_selections_are_rejected(self):
+        for body in [
+            {'filter': {}},
+            {'filter': {'min_price': ''}},
+            {'filter': {'categroy': 'Audio'}},
+            {'filter': {'min_price': 'abc'}},
+            {'filter': {'min_price': 'NaN'}},
+            {'filter': {'badge': 'bogus'}},
+            {'filter': {'is_available': 'maybe'}},
+            {'ids': [True]},
+            {'all': True, 'ids': [1]},
+        ]:
+            response = self.client.delete('/api/products/batch/', body, format='json')
+            self.assertEqual(response.status_code, 400, body)
+        self.assertEqual(Product.objects.count(), 20)
+
+    def test_delete_everything_needs_all(self):
+        response = self.client.delete('/api/products/batch/', {'all': True}, format='json')
+        self.assertEqual(response.data['deleted'], 20)
+
+
+class ProductCategoryUpdateTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = self.make_products(1)[0]
+        self.product.categories.add(
+            Category.objects.create(user=self.user, name='Audio'),
+            Category.objects.create(user=self.user, name='Video'),
+        )
+        self.url = f'/api/products/{self.product.pk}/'
+
+    def link_writes(self, queries):
+        table = connection.ops.quote_name(Product.categories.through._meta.db_table)
+        target = re.compile(rf'^\s*(INSERT( OR IGNORE)? INTO|DELETE FROM) {re.escape(table)}', re.IGNORECASE)
+        return [q['sql'] for q in queries if target.match(q['sql'])]
+
+    def names(self):
+        return sorted(self.product.categories.values_list('name', flat=True))
+
+    def test_unchanged_categories_cost_no_writes(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.put(self.url, {'categories': ['Video', 'Audio']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.link_writes(ctx.captured_queries), [])
+        self.assertEqual(self.names(), ['Audio', 'Video'])
+
+    def test_only_the_difference_is_written(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.put(self.url, {'categories': ['Audio', 'Sale', 'New']}, format='json')
+        self.assertEqual(len(self.link_writes(ctx.captured_queries)), 2)  # one DELETE, one INSERT
+        self.assertEqual(self.names(), ['Audio', 'New', 'Sale'])
+        counts = dict(Category.objects.values_list('name', 'product_count'))
+        self.assertEqual(counts, {'Audio': 1, 'Video': 0, 'Sale': 1, 'New': 1})
+
+    def test_multipart_sends_every_category(self):
+        response = self.client.put(self.url, {'categories': ['Audio', 'Sale']}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.names(), ['Audio', 'Sale'])
+
+
+def make_image_upload(size=(2400, 1200), fmt='PNG', name='photo.png'):
+    buffer = io.BytesIO()
+    image = Image.new('RGB', size, (200, 30, 30))
+    exif = Image.Exif()
+    exif[0x010F] = 'CameraMaker'
+    image.save(buffer, fmt, exif=exif.tobytes())
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=f'image/{fmt.lower()}')
+
+
+class ImageVariantTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_variants_are_generated_and_recorded(self):
+        product = Product.objects.create(
+            user=self.user, name='Lamp', price=10, image=make_image_upload(fmt='JPEG', name='lamp.jpg')
+        )
+        variants = generate_image_variants(product.pk)
+        self.assertEqual(set(variants), {'thumbnail', 'card', 'full'})
+        self.assertEqual((variants['thumbnail']['width'], variants['thumbnail']['height']), (200, 100))
+        self.assertEqual(variants['full']['width'], 1600)
+
+        with default_storage.open(variants['card']['jpeg']) as f, Image.open(f) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(len(image.getexif()), 0)
+        with default_storage.open(variants['card']['webp']) as f, Image.open(f) as image:
+            self.assertEqual(image.format, 'WEBP')
+
+        data = ProductSerializer(Product.objects.get(pk=product.pk)).data
+        self.assertTrue(data['image_variants']['thumbnail']['webp'].endswith('.webp'))
+        self.assertIn('200w', data['image_srcset'])
+
+    def test_small_images_are_not_upscaled(self):
+        product = Product.objects.create(user=self.user, name='Icon', price=1, image=make_image_upload(size=(120, 80)))
+        variants = generate_image_variants(product.pk)
+        self.assertEqual(variants['full']['width'], 120)
+
+    def test_replaced_image_discards_result(self):
+        product = Product.objects.create(user=self.user, name='Lamp', price=10, image=make_image_upload())
+        built = {}
+
+        def build_then_replace(product_id, source):
+            built.update(build_variants(product_id, source))
+            Product.objects.filter(pk=product_id).update(image='products/other.png')
+            return dict(built)
+
+        with mock.patch('companies.images.build_variants', side_effect=build_then_replace):
+            self.assertIsNone(generate_image_variants(product.pk))
+        self.assertEqual(Product.objects.get(pk=product.pk).image_variants, {})
+
+    def test_upload_schedules_generation_after_commit(self):
+        with mock.patch('companies.images._executor') as executor:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    '/api/products/', {'name': 'Lamp', 'price': '10', 'image': make_image_upload()}, format='multipart'
+                )
+        self.assertEqual(response.status_code, 201)
+        executor.submit.assert_called_once()
+        self.assertEqual(executor.submit.call_args.args[1], response.data['product_id'])
+
+
+class MediaStorageTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_identical_uploads_share_one_file(self):
+        other = User.objects.create(username='tenant-2')
+        first = Product.objects.create(user=self.user, name='A', price=1, image=make_image_upload(name='a.png'))
+        second = Product.objects.create(user=other, name='B', price=1, image=make_image_upload(name='b.PNG'))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name, r'^products/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.png$')
+
+        third = Product.objects.create(user=self.user, name='C', price=1, image=make_image_upload(size=(10, 10)))
+        self.assertNotEqual(third.image.name, first.image.name)
+
+    def test_media_is_served_as_immutable(self):
+        name = default_storage.save('products/a.png', make_image_upload())
+        response = self.client.get(f'/media/{name}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Content-Type'], 'image/png')
+        response.close()
+
+    def test_legacy_media_gets_a_short_max_age(self):
+        digest = 'abcd' + 'ef' * 30
+        with self.settings(MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/'):
+            for path in [f'products/ab/cd/{digest}.png', f'ab/cd/{digest}']:
+                self.assertEqual(
+                    self.client.get(f'/media/{path}')['Cache-Control'], 'public, max-age=31536000, immutable'
+                )
+            for path in ['products/photo.png', f'products/{digest}.png', f'products/ab/ce/{digest}.png']:
+                self.assertEqual(self.client.get(f'/media/{path}')['Cache-Control'], 'public, max-age=3600')
+            with self.settings(MEDIA_CACHE_MAX_AGE=60):
+                self.assertEqual(self.client.get('/media/products/photo.png')['Cache-Control'], 'public, max-age=60')
+
+    def test_accel_redirect(self):
+        name = default_storage.save('products/a.png', make_image_upload())
+        with self.settings(MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/'):
+            response = self.client.get(f'/media/{name}')
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{name}')
+        self.assertEqual(response.content, b'')
+
+    def test_sendfile(self):
+        name = default_storage.save('products/a.png', make_image_upload())
+        with self.settings(MEDIA_SENDFILE=True):
+            response = self.client.get(f'/media/{name}')
+        self.assertEqual(response['X-Sendfile'], default_storage.path(name))
+
+    def test_missing_and_escaping_paths(self):
+        self.assertEqual(self.client.get('/media/products/missing.png').status_code, 404)
+        self.assertEqual(self.client.get('/media/../saas/settings.py').status_code, 404)
+
+
+class AsyncCatalogTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        from saas import authentication
+        authentication.user_cache.clear()
+        claims = {'uid': self.user.username}
+        for method in ('verify', 'averify'):
+            patcher = mock.patch.object(authentication.token_verifier, method, return_value=claims)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.products = self.make_products(3)
+        self.audio = Category.objects.create(user=self.user, name='Audio')
+
+    auth_headers = {'Authorization': 'Bearer token'}
+
+    async def test_requires_token(self):
+        response = await self.async_client.get('/api/async/products/')
+        self.assertEqual(response.status_code, 401)
+
+    async def test_products_page(self):
+        response = await self.async_client.get(
+            '/api/async/products/?limit=2&include_total=true', headers=self.auth_headers
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(data['total'], 3)
+        self.assertIsNotNone(data['next'])
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+    async def test_shares_cache_with_sync_view(self):
+        sync_response = await sync_to_async(self.client.get)('/api/categories/')
+        response = await self.async_client.get('/api/async/categories/', headers=self.auth_headers)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response['ETag'], sync_response['ETag'])
+        self.assertEqual(response.json()['categories'][0]['name'], 'Audio')
+
+    async def test_if_none_match_returns_304(self):
+        response = await self.async_client.get('/api/async/products/', headers=self.auth_headers)
+        response = await self.async_client.get(
+            '/api/async/products/', headers={'Authorization': 'Bearer token', 'If-None-Match': response['ETag']}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_filters_and_facets_match_the_sync_view(self):
+        await self.audio.products.aadd(self.products[0])
+        url = '/api/products/?category=Audio&include_total=true&facets=true'
+        sync_response = await sync_to_async(self.client.get)(url)
+        response = await self.async_client.get(url.replace('/api/', '/api/async/'), headers=self.auth_headers)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response['ETag'], sync_response['ETag'])
+        data = response.json()
+        self.assertEqual([p['id'] for p in data['products']], [self.products[0].pk])
+        self.assertEqual(data['total'], 1)
+        self.assertEqual(data['facets']['category'], [{'value': 'Audio', 'count': 1}])
+
+        response = await self.async_client.get('/api/async/products/?min_price=x', headers=self.auth_headers)
+        self.assertEqual(response.status_code, 400)
+
+    async def test_export_streams_from_an_async_iterator(self):
+        with mock.patch('companies.views.export.EXPORT_CHUNK_SIZE', 2):
+            response = await self.async_client.get('/api/products/export/?output=json', headers=self.auth_headers)
+            self.assertTrue(response.is_async)
+            body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(json.loads(body)), 3)
+
+
+class ProductSearchTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.headphones = Product.objects.create(
+            user=self.user, name='Wireless Headphones', price=Decimal('99.00'),
+            description='Over-ear, noise cancelling',
+        )
+        self.cable = Product.objects.create(
+            user=self.user, name='USB Cable', price=Decimal('5.00'),
+            description='Works with <b>wireless</b> chargers',
+        )
+        self.speaker = Product.objects.create(user=self.user, name='Speaker', price=Decimal('49.00'))
+        self.speaker.categories.add(Category.objects.create(user=self.user, name='Audio'))
+
+    def search(self, query, **params):
+        return self.client.get('/api/products/search/', {'q': query, **params})
+
+    def ids(self, response):
+        return [result['id'] for result in response.data['results']]
+
+    def test_name_match_ranks_above_description_match(self):
+        response = self.search('wireless')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.ids(response), [self.headphones.id, self.cable.id])
+
+    def test_matches_category_names_and_prefixes(self):
+        self.assertEqual(self.ids(self.search('audio')), [self.speaker.id])
+        self.assertEqual(self.ids(self.search('headph')), [self.headphones.id])
+
+    def test_highlights_are_escaped(self):
+        results = self.search('wireless').data['results']
+        self.assertEqual(results[0]['highlight']['name'], '<mark>Wireless</mark> Headphones')
+        self.assertIn('&lt;b&gt;<mark>wireless</mark>&lt;/b&gt;', results[1]['highlight']['description'])
+
+    def test_other_tenants_are_not_searched(self):
+        other = User.objects.create(username='tenant-2')
+        Product.objects.create(user=other, name='Wireless Mouse', price=Decimal('20.00'))
+        self.assertNotIn('Wireless Mouse', [r['name'] for r in self.search('wireless').data['results']])
+
+    def test_pages_follow_next_cursor(self):
+        Product.objects.bulk_create([
+            Product(user=self.user, name=f'Lamp {i}', price=Decimal('10.00')) for i in range(7)
+        ])
+        refresh_search_index(list(Product.objects.filter(name__startswith='Lamp').values_list('pk', flat=True)))
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 3, **({'cursor': cursor} if cursor else {})}
+            response = self.search('lamp', **params)
+            seen.extend(self.ids(response))
+            cursor = response.data['next']
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(len(set(seen)), 7)
+
+    def test_index_follows_writes(self):
+        self.headphones.name = 'Studio Monitors'
+        self.headphones.save()
+        self.assertEqual(self.ids(self.search('monitors')), [self.headphones.id])
+
+        Category.objects.filter(name='Audio').first().delete()
+        self.assertEqual(self.ids(self.search('audio')), [])
+
+        self.cable.delete()
+        self.assertEqual(self.ids(self.search('chargers')), [])
+
+    def test_bulk_writes_are_indexed(self):
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        batch_delete_products(self.user, Product.objects.filter(pk=self.cable.pk))
+        batch_update_products(self.user, Product.objects.filter(pk=self.headphones.pk), {'add_categories': ['Studio']})
+        self.assertEqual(self.ids(self.search('studio')), [self.headphones.id])
+        self.assertEqual(self.ids(self.search('chargers')), [])
+
+    def test_requires_query(self):
+        self.assertEqual(self.search('  ').status_code, 400)
+        self.assertEqual(self.search('lamp', cursor='bogus').status_code, 400)
+
+
+class ProductFilterTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        audio = Category.objects.create(user=self.user, name='Audio')
+        video = Category.objects.create(user=self.user, name='Video')
+        self.cheap = Product.objects.create(user=self.user, name='Cable', price=Decimal('5.00'), rating=2)
+        self.mid = Product.objects.create(
+            user=self.user, name='Speaker', price=Decimal('40.00'), rating=4.5, badge='sale'
+        )
+        self.pricey = Product.objects.create(
+            user=self.user, name='Projector', price=Decimal('300.00'), rating=4, is_available=False
+        )
+        self.cheap.categories.add(audio, video)
+        self.mid.categories.add(audio)
+        self.pricey.categories.add(video)
+
+    def ids(self, query):
+        response = self.client.get(f'/api/products/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return [product['id'] for product in response.data['products']]
+
+    def test_filters(self):
+        self.assertEqual(self.ids('category=Audio'), [self.mid.id, self.cheap.id])
+        self.assertEqual(self.ids('category=Audio&category=Video'), [self.pricey.id, self.mid.id, self.cheap.id])
+        self.assertEqual(self.ids('min_price=10&max_price=100'), [self.mid.id])
+        self.assertEqual(self.ids('badge=sale'), [self.mid.id])
+        self.assertEqual(self.ids('is_available=false'), [self.pricey.id])
+        self.assertEqual(self.ids('min_rating=4&category=Video'), [self.pricey.id])
+
+    def test_total_counts_filtered_products(self):
+        response = self.client.get('/api/products/?category=Video&include_total=true')
+        self.assertEqual(response.data['total'], 2)
+
+    def test_invalid_filters(self):
+        for query in ['badge=bogus', 'min_price=abc', 'min_price=10&max_price=5', 'min_rating=7']:
+            self.assertEqual(self.client.get(f'/api/products/?{query}').status_code, 400, query)
+
+    def test_facet_queries(self):
+        # The tenant's categories, the category counts, then every other count
+        with self.assertNumQueries(3):
+            facets = facet_counts(self.user, {'category': ['Audio']})
+
+        # The category facet ignores the category filter itself...
+        self.assertEqual(facets['category'], [{'value': 'Audio', 'count': 2}, {'value': 'Video', 'count': 2}])
+        # ...while the other dimensions are narrowed by it
+        badges = {facet['value']: facet['count'] for facet in facets['badge']}
+        self.assertEqual(badges['sale'], 1)
+        self.assertEqual(facets['is_available'], [{'value': True, 'count': 2}, {'value': False, 'count': 0}])
+        self.assertEqual([facet['count'] for facet in facets['price']], [1, 1, 0, 0, 0])
+        self.assertEqual([facet['count'] for facet in facets['rating']], [1, 1, 2, 2])
+
+    def test_facets_in_response_and_cache(self):
+        response = self.client.get('/api/products/?facets=true&badge=sale')
+        self.assertEqual(response.data['facets']['category'][0], {'value': 'Audio', 'count': 1})
+        other = self.client.get('/api/products/?facets=true&badge=limited')
+        self.assertEqual(other['X-Cache'], 'MISS')
+        self.assertEqual(other.data['products'], [])
+
+
+class OrderPlacementTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = Customer.objects.create(user=self.user, name='Ann', email='ann@example.com')
+        self.products = self.make_products(5)
+
+    def place(self, items, customer=None):
+        customer = customer or self.customer
+        return self.client.post('/api/orders/', {'customer_id': customer.id, 'items': items}, format='json')
+
+    def test_creates_items_and_total(self):
+        a, b = self.products[0], self.products[3]
+        response = self.place([
+            {'product_id': a.id, 'quantity': 2},
+            {'product_id': b.id, 'quantity': 1},
+            {'product_id': a.id},
+        ])
+        self.assertEqual(response.status_code, 201)
+
+        order = Order.objects.get(pk=response.data['order_id'])
+        self.assertEqual(order.total_amount, a.price * 3 + b.price)
+        self.assertEqual(response.data['total_amount'], str(order.total_amount))
+        items = {item.product_id: (item.quantity, item.price) for item in order.items.all()}
+        self.assertEqual(items, {a.id: (3, a.price), b.id: (1, b.price)})
+
+    def test_query_count_does_not_grow_with_items(self):
+        many = [{'product_id': product.id, 'quantity': 1} for product in self.products]
+        with CaptureQueriesContext(connection) as one_item:
+            self.place(many[:1])
+        with CaptureQueriesContext(connection) as five_items:
+            self.place(many)
+        self.assertEqual(len(one_item.captured_queries), len(five_items.captured_queries))
+
+    def test_rejects_unknown_unavailable_and_foreign_products(self):
+        other = User.objects.create(username='tenant-2')
+        foreign = self.make_products(1, user=other)[0]
+        hidden = self.make_products(1, is_available=False)[0]
+        for product in (foreign, hidden):
+            response = self.place([{'product_id': product.id, 'quantity': 1}])
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.place([{'product_id': 999999}]).status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_rejects_other_tenants_customer(self):
+        other = User.objects.create(username='tenant-2')
+        customer = Customer.objects.create(user=other, name='Bob', email='bob@example.com')
+        response = self.place([{'product_id': self.products[0].id}], customer=customer)
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_payload(self):
+        product_id = self.products[0].id
+        for items in (
+            [],
+            [{'quantity': 1}],
+            [{'product_id': product_id, 'quantity': 0}],
+            [{'product_id': product_id, 'quantity': 2 ** 40}],
+            [{'product_id': product_id, 'quantity': 6000}, {'product_id': product_id, 'quantity': 6000}],
+            [{'product_id': 2 ** 70}],
+        ):
+            self.assertEqual(self.place(items).status_code, 400, items)
+
+    def test_total_must_fit_the_column(self):
+        Product.objects.filter(pk=self.products[0].pk).update(price=Decimal('99999999.99'))
+        response = self.place([{'product_id': self.products[0].id, 'quantity': 2}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Order total is too large')
+        self.assertFalse(Order.objects.exists())
+
+    def test_failed_insert_rolls_back_order(self):
+        with mock.patch.object(OrderItem.objects, 'bulk_create', side_effect=RuntimeError('boom')):
+            response = self.place([{'product_id': self.products[0].id}])
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(Order.objects.exists())
+
+
+class SalesRollupTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = Customer.objects.create(user=self.user, name='Ann', email='ann@example.com')
+        self.speaker, self.cable = self.make_products(2)  # 10.00 and 11.00
+        self.speaker.categories.add(Category.objects.create(user=self.user, name='Audio'))
+        self.today = timezone.localdate()
+
+    def order(self, quantities):
+        return place_order(self.user, self.customer.id, quantities)
+
+    def rollup(self):
+        return DailySales.objects.filter(user=self.user, date=self.today).values_list(
+            'orders_count', 'items_sold', 'revenue'
+        ).first()
+
+    def product_rollups(self):
+        return dict(ProductDailySales.objects.filter(user=self.user).values_list('product_id', 'quantity'))
+
+    def test_paid_orders_are_added_and_cancelled_ones_removed(self):
+        first = self.order({self.speaker.id: 2})
+        second = self.order({self.speaker.id: 1, self.cable.id: 3})
+        self.assertIsNone(self.rollup())  # pending orders are not sales
+
+        first.status = 'paid'
+        first.save()
+        transition_orders([second.id], 'paid')
+        self.assertEqual(self.rollup(), (2, 6, Decimal('63.00')))
+        self.assertEqual(self.product_rollups(), {self.speaker.id: 3, self.cable.id: 3})
+
+        transition_orders([first.id, second.id], 'paid')  # no change, no double count
+        second.refresh_from_db()
+        second.status = 'cancelled'
+        second.save()
+        self.assertEqual(self.rollup(), (1, 2, Decimal('20.00')))
+        self.assertEqual(self.product_rollups(), {self.speaker.id: 2, self.cable.id: 0})
+
+    def test_rebuild_matches_incremental(self):
+        orders = [self.order({self.speaker.id: i, self.cable.id: 1}) for i in range(1, 4)]
+        transition_orders([order.id for order in orders], 'paid')
+        expected = self.rollup(), self.product_rollups()
+
+        DailySales.objects.update(revenue=0, orders_count=0)
+        call_command('rebuild_sales_rollups', start=self.today.isoformat(), stdout=io.StringIO())
+        self.assertEqual((self.rollup(), self.product_rollups()), expected)
+
+    def test_analytics_reads_only_rollups(self):
+        transition_orders([self.order({self.speaker.id: 2, self.cable.id: 1}).id], 'paid')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/analytics/sales/', {'start': self.today.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        order_tables = [connection.ops.quote_name(model._meta.db_table) for model in (Order, OrderItem)]
+        self.assertFalse([q for q in ctx.captured_queries if any(table in q['sql'] for table in order_tables)])
+
+        self.assertEqual(response.data['totals'], {'orders': 1, 'items': 3, 'revenue': '31.00'})
+        self.assertEqual(response.data['days'][-1]['revenue'], '31.00')
+        self.assertEqual(response.data['products'][0]['product_id'], self.speaker.id)
+        self.assertEqual(response.data['categories'], [{'category': 'Audio', 'quantity': 2, 'revenue': '20.00'}])
+
+    def test_invalid_range(self):
+        self.assertEqual(self.client.get('/api/analytics/sales/', {'start': 'yesterday'}).status_code, 400)
+        self.assertEqual(
+            self.client.get('/api/analytics/sales/', {'start': '2026-02-01', 'end': '2026-01-01'}).status_code, 400
+        )
+
+
+class CustomerUpsertTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        Customer.objects.create(user=self.user, name='Old Name', email='ann@example.com', phone='1')
+
+    def csv_upload(self, lines):
+        content = 'name,email,phone,address\n' + '\n'.join(lines) + '\n'
+        return SimpleUploadedFile('customers.csv', content.encode('utf-8'), content_type='text/csv')
+
+    def test_csv_import_reports_counts(self):
+        upload = self.csv_upload([
+            'Ann,ann@example.com,+254700000000,Nairobi',
+            'Bob,bob@example.com,,',
+            ',nobody@example.com,,',
+            'Bad,not-an-email,,',
+        ])
+        response = self.client.post('/api/customers/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            (response.data['inserted'], response.data['updated'], response.data['rejected']), (1, 1, 2)
+        )
+        self.assertEqual([error['row'] for error in response.data['errors']], [3, 4])
+
+        ann = Customer.objects.get(user=self.user, email='ann@example.com')
+        self.assertEqual((ann.name, ann.phone, ann.address), ('Ann', '+254700000000', 'Nairobi'))
+        self.assertEqual(Customer.objects.filter(user=self.user).count(), 2)
+
+    def test_repeated_email_last_row_wins(self):
+        rows = [{'name': 'First', 'email': 'cat@example.com'}, {'name': 'Second', 'email': 'cat@example.com'}]
+        report = upsert_customers(self.user, rows)
+        self.assertEqual((report['inserted'], report['rejected']), (1, 1))
+        self.assertEqual(Customer.objects.get(email='cat@example.com').name, 'Second')
+
+    def test_queries_per_chunk_are_constant(self):
+        rows = [{'name': f'Customer {i}', 'email': f'c{i}@example.com'} for i in range(30)]
+        with CaptureQueriesContext(connection) as ctx:
+            report = upsert_customers(self.user, iter(rows), chunk_size=10)
+        self.assertEqual(report['inserted'], 30)
+        # SAVEPOINT, INSERT ... ON CONFLICT DO NOTHING, RELEASE per chunk
+        self.assertEqual(len(ctx.captured_queries), 3 * 3)
+
+    def test_existing_case_is_kept(self):
+        Customer.objects.create(user=self.user, name='Cat', email='Cat@Example.com')
+        report = upsert_customers(self.user, [
+            {'name': 'Cat Updated', 'email': 'Cat@Example.com'},
+            {'name': 'Dan', 'email': 'dan@example.com'},
+        ])
+        self.assertEqual((report['inserted'], report['updated']), (1, 1))
+        self.assertEqual(Customer.objects.get(email='Cat@Example.com').name, 'Cat Updated')
+        self.assertEqual(Customer.objects.filter(user=self.user).count(), 3)
+
+    def test_other_tenants_are_separate(self):
+        other = User.objects.create(username='tenant-2')
+        report = upsert_customers(other, [{'name': 'Ann', 'email': 'ann@example.com'}])
+        self.assertEqual(report['inserted'], 1)
+        self.assertEqual(Customer.objects.get(user=self.user).name, 'Old Name')
+
+    def test_management_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as csv_file:
+            csv_file.write('name,email\nDan,dan@example.com\nAnn,ann@example.com\n')
+        self.addCleanup(os.remove, csv_file.name)
+        out = io.StringIO()
+        call_command('import_customers', self.user.username, csv_file.name, stdout=out)
+        self.assertIn('1 inserted, 1 updated, 0 rejected', out.getvalue())
+
+
+@override_settings(PAYMENT_CALLBACK_TOKEN='secret')
+class PaymentCallbackTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        customer = Customer.objects.create(user=self.user, name='Ann', email='ann@example.com')
+        product = self.make_products(1)[0]  # 10.00
+        self.order = place_order(self.user, customer.id, {product.id: 2})
+        self.client.force_authenticate(None)
+
+    def callback(self, provider, body, token='secret'):
+        return self.client.post(
+            f'/api/payments/callbacks/{provider}/', body, format='json', HTTP_X_CALLBACK_TOKEN=token
+        )
+
+    def test_staging_is_a_single_insert_and_idempotent(self):
+        body = {'transaction_id': 'ch_1', 'order_id': self.order.id, 'amount': '20.00'}
+        with self.assertNumQueries(1):
+            response = self.callback('card', body)
+        self.assertEqual(response.status_code, 200)
+        self.callback('card', body)
+        self.assertEqual(PaymentCallback.objects.count(), 1)
+
+    def test_mpesa_confirmation_format(self):
+        response = self.callback('mpesa', {'TransID': 'QK1', 'TransAmount': '5', 'BillRefNumber': str(self.order.id)})
+        self.assertEqual(response.data, {'ResultCode': 0, 'ResultDesc': 'Accepted'})
+        staged = PaymentCallback.objects.get()
+        self.assertEqual((staged.transaction_id, staged.amount), ('QK1', Decimal('5.00')))
+
+    def test_rejects_bad_token_and_payloads(self):
+        body = {'transaction_id': 'ch_1', 'order_id': self.order.id, 'amount': '20'}
+        self.assertEqual(self.callback('card', body, token='wrong').status_code, 403)
+        self.assertEqual(self.callback('paypal', body).status_code, 400)
+        self.assertEqual(self.callback('card', {**body, 'amount': '-1'}).status_code, 400)
+        for reference in ['not-a-number', '\u00b2', '\u0661\u0662', '1' * 19]:
+            self.assertEqual(self.callback('card', {**body, 'order_id': reference}).status_code, 400, reference)
+        self.assertFalse(PaymentCallback.objects.exists())
+
+    def test_bad_reference_fails_alone(self):
+        # Staged before references were checked
+        PaymentCallback.objects.create(provider='mpesa', transaction_id='QK0', order_reference='\u00b2', amount=5)
+        self.callback('card', {'transaction_id': 'ch_1', 'order_id': self.order.id, 'amount': '20'})
+        self.assertEqual(process_payment_callbacks(), {'applied': 1, 'rejected': 1, 'deferred': 0, 'orders_paid': 1})
+        self.assertEqual(PaymentCallback.objects.get(transaction_id='QK0').error, 'Invalid order reference')
+
+    def test_processing_creates_payments_and_marks_paid(self):
+        self.callback('mpesa', {'TransID': 'QK1', 'TransAmount': '5', 'BillRefNumber': str(self.order.id)})
+        self.assertEqual(process_payment_callbacks()['orders_paid'], 0)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'pending')
+
+        self.callback('card', {'transaction_id': 'ch_1', 'order_id': self.order.id, 'amount': '15'})
+        self.callback('card', {'transaction_id': 'ch_2', 'order_id': 999999, 'amount': '15'})
+        self.callback('card', {'transaction_id': 'ch_1', 'order_id': self.order.id, 'amount': '15'})
+        out = io.StringIO()
+        call_command('process_payment_callbacks', stdout=out)
+        self.assertIn('Applied 1, rejected 0, deferred 1, 1 orders paid', out.getvalue())
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'paid')
+        self.assertEqual(
+            sorted(self.order.payments.values_list('method', 'transaction_id', 'amount')),
+            [('card', 'ch_1', Decimal('15.00')), ('mpesa', 'QK1', Decimal('5.00'))],
+        )
+        self.assertEqual(DailySales.objects.get(user=self.user).orders_count, 1)
+        self.assertEqual(process_payment_callbacks(), {'applied': 0, 'rejected': 0, 'deferred': 0, 'orders_paid': 0})
+
+    def test_callback_waits_for_its_order(self):
+        self.callback('card', {'transaction_id': 'ch_1', 'order_id': self.order.id + 1, 'amount': '20'})
+        self.assertEqual(process_payment_callbacks()['deferred'], 1)
+        # Not retried before its next attempt is due
+        self.assertEqual(process_payment_callbacks()['deferred'], 0)
+
+        customer = Customer.objects.get(user=self.user)
+        later = place_order(self.user, customer.id, {Product.objects.get().id: 2})
+        self.assertEqual(later.id, self.order.id + 1)
+        PaymentCallback.objects.update(next_attempt_at=timezone.now())
+        result = process_payment_callbacks()
+        self.assertEqual((result['applied'], result['orders_paid']), (1, 1))
+
+    def test_unknown_order_is_rejected_after_the_retry_window(self):
+        self.callback('card', {'transaction_id': 'ch_1', 'order_id': 999999, 'amount': '20'})
+        self.assertEqual(process_payment_callbacks(), {'applied': 0, 'rejected': 0, 'deferred': 1, 'orders_paid': 0})
+
+        PaymentCallback.objects.update(received_at=timezone.now() - timedelta(hours=2), next_attempt_at=None)
+        self.assertEqual(process_payment_callbacks()['rejected'], 1)
+        callback = PaymentCallback.objects.get(transaction_id='ch_1')
+        self.assertEqual((callback.status, callback.error), ('rejected', 'Unknown order'))
+
+
+class OrderListTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = Customer.objects.create(user=self.user, name='Ann', email='ann@example.com')
+        self.products = self.make_products(3)
+        audio = Category.objects.create(user=self.user, name='Audio')
+        for product in self.products:
+            product.categories.add(audio)
+
+    def make_orders(self, count):
+        return [
+            place_order(self.user, self.customer.id, {product.id: i + 1 for product in self.products})
+            for i in range(count)
+        ]
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_query_count_is_constant_per_page(self):
+        self.make_orders(2)
+        small, response = self.count_queries('/api/orders/')
+        self.assertEqual(response.data['count'], 2)
+        self.make_orders(8)
+        large, response = self.count_queries('/api/orders/')
+        self.assertEqual(response.data['count'], 10)
+        self.assertEqual(small, large)
+        self.assertEqual(large, 3)  # orders with customers, items with products, categories
+
+        item = response.data['orders'][0]['items'][0]
+        self.assertEqual(item['product']['categories'], ['Audio'])
+        self.assertEqual(response.data['orders'][0]['customer']['name'], 'Ann')
+
+    def test_product_summary(self):
+        self.make_orders(3)
+        Product.objects.filter(user=self.user).update(image='products/a.png')
+        full, full_response = self.count_queries('/api/orders/')
+        slim, response = self.count_queries('/api/orders/?product=summary')
+        self.assertEqual(slim, full - 1)
+        product = response.data['orders'][0]['items'][0]['product']
+        self.assertEqual(set(product), {'id', 'name', 'price', 'image'})
+        self.assertEqual(product['image'], full_response.data['orders'][0]['items'][0]['product']['image'])
+        self.assertEqual(product['image'], 'http://testserver/media/products/a.png')
+
+    def test_pages_follow_next_cursor_with_equal_timestamps(self):
+        orders = self.make_orders(5)
+        Order.objects.update(created_at=timezone.now())
+        seen, url = [], '/api/orders/?limit=2&product=summary'
+        while url:
+            response = self.client.get(url)
+            seen.extend(order['id'] for order in response.data['orders'])
+            url = f"/api/orders/?limit=2&product=summary&cursor={response.data['next']}" if response.data['next'] else None
+        self.assertEqual(seen, sorted((order.id for order in orders), reverse=True))
+
+    def test_status_filter_and_bad_cursor(self):
+        orders = self.make_orders(2)
+        transition_orders([orders[0].id], 'paid')
+        response = self.client.get('/api/orders/?status=paid')
+        self.assertEqual([order['id'] for order in response.data['orders']], [orders[0].id])
+        self.assertEqual(self.client.get('/api/orders/?cursor=bogus').status_code, 400)
+
+
+@override_settings(ALLOWED_HOSTS=['.example.com', 'localhost', '127.0.0.1', 'testserver'])
+class TenantMiddlewareTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        tenant_cache.clear()
+        self.profile = BusinessProfile.objects.create(user=self.user, business_name='Acme', subdomain='acme')
+        self.middleware = TenantMiddleware(lambda request: request.tenant)
+
+    def resolve(self, host='testserver', **headers):
+        return self.middleware(RequestFactory().get('/', HTTP_HOST=host, headers=headers))
+
+    def test_resolves_host_and_header(self):
+        tenant = self.resolve('acme.example.com:8000')
+        self.assertEqual((tenant.profile_id, tenant.user_id, tenant.subdomain), (self.profile.id, self.user.id, 'acme'))
+        self.assertEqual(self.resolve(**{'retailer-domain': 'ACME'}), tenant)
+        self.assertIsNone(self.resolve('localhost'))
+        self.assertIsNone(self.resolve('127.0.0.1'))
+        self.assertIsNone(self.resolve(**{'retailer-domain': 'bad_label!'}))
+
+    def test_warm_lookups_cost_no_queries(self):
+        self.resolve('acme.example.com')
+        self.resolve('ghost.example.com')
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.resolve('acme.example.com').business_name, 'Acme')
+            self.assertIsNone(self.resolve('ghost.example.com'))
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        # Another process only has the shared cache
+        tenant_cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertIsNotNone(self.resolve('acme.example.com'))
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_saving_profile_invalidates_both_subdomains(self):
+        self.assertIsNone(self.resolve('shop.example.com'))
+        self.resolve('acme.example.com')
+        self.profile.subdomain = 'shop'
+        self.profile.save()
+        self.assertIsNone(self.resolve('acme.example.com'))
+        self.assertEqual(self.resolve('shop.example.com').profile_id, self.profile.id)
+
+        self.profile.delete()
+        self.assertIsNone(self.resolve('shop.example.com'))
+
+    async def test_async_stack(self):
+        async def view(request):
+            return request.tenant
+
+        middleware = TenantMiddleware(view)
+        request = RequestFactory().get('/', HTTP_HOST='acme.example.com')
+        tenant = await middleware(request)
+        self.assertEqual(tenant.subdomain, 'acme')
+
+
+class StorefrontTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        tenant_cache.clear()
+        self.client.force_authenticate(None)
+        BusinessProfile.objects.create(user=self.user, business_name='Acme', subdomain='acme')
+        StoreConfig.objects.create(user=self.user, store_name='Acme Audio')
+        self.products = self.make_products(3)
+        self.products[0].categories.add(Category.objects.create(user=self.user, name='Audio'))
+
+    def test_anonymous_store_and_products(self):
+        response = self.client.get('/api/storefront/acme/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['store']['store_name'], 'Acme Audio')
+        self.assertEqual([c['name'] for c in response.json()['categories']], ['Audio'])
+
+        response = self.client.get('/api/storefront/acme/products/?limit=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 2)
+        self.assertEqual(self.client.get('/api/storefront/ghost/').status_code, 404)
+
+    def test_cdn_headers(self):
+        response = self.client.get('/api/storefront/acme/products/')
+        cache_control = set(response['Cache-Control'].split(', '))
+        self.assertTrue({'public', 's-maxage=300', 'stale-while-revalidate=600'} <= cache_control)
+        self.assertEqual(response['Surrogate-Key'], f'storefront tenant-{self.user.id}')
+        self.assertNotIn('Authorization', response.get('Vary', ''))
+
+        not_modified = self.client.get('/api/storefront/acme/products/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['Surrogate-Key'], response['Surrogate-Key'])
+
+    def test_no_authentication_work(self):
+        self.client.get('/api/storefront/acme/')  # warm the tenant map and the catalog cache
+        with mock.patch('saas.authentication.token_verifier.verify') as verify:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get('/api/storefront/acme/', HTTP_AUTHORIZATION='Bearer token')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        verify.assert_not_called()
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_catalog_writes_invalidate_storefront(self):
+        first = self.client.get('/api/storefront/acme/products/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(user=self.user, name='New', price=Decimal('5.00'))
+        second = self.client.get('/api/storefront/acme/products/')
+        self.assertEqual(second['X-Cache'], 'MISS')
+        self.assertNotEqual(first['ETag'], second['ETag'])
+        self.assertEqual(second.json()['products'][0]['name'], 'New')
+
+
+class SnapshotTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root, STOREFRONT_SNAPSHOTS=True)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.profile = BusinessProfile.objects.create(user=self.user, business_name='Acme', subdomain='acme')
+        self.make_products(3)
+
+    def test_writes_plain_and_compressed_documents(self):
+        path = write_snapshot(self.user.id)
+        paths = snapshot_paths('acme')
+        document = json.loads(path.read_bytes())
+        self.assertEqual(document['subdomain'], 'acme')
+        self.assertEqual(len(document['products']), 3)
+        self.assertEqual(gzip.decompress(paths['gzip'].read_bytes()), path.read_bytes())
+        self.assertEqual(path.stat().st_mode & 0o777, 0o644)
+        self.assertEqual(sorted(p.name for p in path.parent.iterdir()), sorted(p.name for p in paths.values()))
+
+        # Unchanged catalogs leave the files alone
+        mtime = path.stat().st_mtime_ns
+        write_snapshot(self.user.id)
+        self.assertEqual(path.stat().st_mtime_ns, mtime)
+
+        self.assertIsNone(write_snapshot(User.objects.create(username='tenant-2').id))
+
+    def test_catalog_and_profile_changes_schedule_rebuilds(self):
+        with mock.patch('companies.snapshots.snapshot_scheduler.schedule') as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                Product.objects.create(user=self.user, name='New', price=Decimal('5.00'))
+            schedule.assert_called_with(self.user.id)
+
+            write_snapshot(self.user.id)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.profile.subdomain = 'shop'
+                self.profile.save()
+            self.assertFalse(snapshot_paths('acme')['identity'].exists())
+            self.assertEqual(schedule.call_count, 2)
+
+    def test_scheduler_coalesces_changes(self):
+        calls, done = [], threading.Event()
+
+        def callback(user_id):
+            calls.append(user_id)
+            done.set()
+
+        scheduler = SnapshotScheduler(callback, delay=0.2)
+        started = timezone.now()
+        for _ in range(3):
+            scheduler.schedule(1)
+            self.assertFalse(done.wait(0.1))
+        self.assertTrue(done.wait(2))
+        self.assertEqual(calls, [1])
+        # Each change restarted the timer
+        self.assertGreaterEqual((timezone.now() - started).total_seconds(), 0.4)
+
+    def test_stale_render_is_dropped(self):
+        def build_during_a_change(profile):
+            document = build_snapshot(profile)
+            bump_catalog_version(self.user.id)
+            return document
+
+        # The change would also schedule a real rebuild on a timer thread
+        with mock.patch('companies.snapshots.snapshot_scheduler.schedule'), \
+                mock.patch('companies.snapshots.build_snapshot', side_effect=build_during_a_change):
+            self.assertIsNone(write_snapshot(self.user.id))
+        self.assertFalse(snapshot_paths('acme')['identity'].exists())
+        self.assertIsNotNone(write_snapshot(self.user.id))
+
+    def test_command_rebuilds_every_store(self):
+        out = io.StringIO()
+        call_command('rebuild_storefront_snapshots', '--workers', '1', stdout=out)
+        self.assertIn('Wrote 1 storefront snapshots', out.getvalue())
+        self.assertTrue(snapshot_paths('acme')['identity'].exists())
+
+    def test_snapshots_are_not_served_as_immutable(self):
+        write_snapshot(self.user.id)
+        response = self.client.get('/media/storefronts/acme.json')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=0, must-revalidate')
+        response.close()
+
+
+@skipUnless('replica' in settings.DATABASES, "needs the 'replica' alias of saas.test_settings")
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(CatalogTestCase):
+    # The runner collects aliases even from skipped classes
+    databases = {'default', 'replica'} & set(settings.DATABASES)
+
+    def setUp(self):
+        super().setUp()
+        tenant_cache.clear()
+        self.make_products(2)
+        BusinessProfile.objects.create(user=self.user, business_name='Acme', subdomain='acme')
+        # Nothing replicates in tests: give the replica rows of its own
+        User.objects.using('replica').create(id=self.user.id, username=self.user.username)
+        Product.objects.using('replica').create(user_id=self.user.id, name='Replica only', price=Decimal('1.00'))
+
+    def product_names(self, url='/api/products/'):
+        return [product['name'] for product in self.client.get(url).json()['products']]
+
+    def test_catalog_and_storefront_gets_read_the_replica(self):
+        self.assertEqual(self.product_names(), ['Replica only'])
+        self.assertEqual(self.product_names('/api/storefront/acme/products/'), ['Replica only'])
+        self.assertEqual(self.client.get('/api/categories/').json()['total'], 0)
+
+    def test_other_reads_use_the_primary(self):
+        self.assertEqual(Product.objects.count(), 2)
+        with CaptureQueriesContext(connections['replica']) as ctx:
+            self.assertEqual(self.client.get('/api/orders/').status_code, 200)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_writers_read_their_writes(self):
+        response = self.client.post('/api/products/', {'name': 'Fresh', 'price': '3.00'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.product_names(), ['Fresh', 'Product 1', 'Product 0'])
+
+    def test_catalog_change_pins_storefront_to_primary(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(user=self.user, name='Fresh', price=Decimal('3.00'))
+        self.client.force_authenticate(None)
+        self.assertIn('Fresh', self.product_names('/api/storefront/acme/products/'))
+
+    async def test_async_view_reads_the_replica(self):
+        from saas import authentication
+        authentication.user_cache.clear()
+        with mock.patch.object(authentication.token_verifier, 'averify', return_value={'uid': self.user.username}):
+            response = await self.async_client.get('/api/async/products/', headers={'Authorization': 'Bearer token'})
+        self.assertEqual([product['name'] for product in response.json()['products']], ['Replica only'])
@@ -1,11 +1,29 @@
 from django.urls import path
 
-from .views import  CategoryAPIView, ProductAPIView, AssignAdminView
+from .views import (
+    CategoryAPIView, ProductAPIView, AssignAdminView, ProductExportAPIView, CatalogCacheMetricsAPIView,
+    ProductImportAPIView, ProductBatchAPIView, AsyncProductListView, AsyncCategoryListView,
+    ProductSearchAPIView, OrderAPIView, SalesAnalyticsAPIView,
+    CustomerImportAPIView, PaymentCallbackAPIView, StorefrontAPIView, StorefrontProductsAPIView,
+)
 
 urlpatterns = [
     path("assign-admin/", AssignAdminView.as_view(), name="assign-admin"),
     path("products/", ProductAPIView.as_view(), name="products-list-create"),
+    path("products/import/", ProductImportAPIView.as_view(), name="products-import"),
+    path("products/batch/", ProductBatchAPIView.as_view(), name="products-batch"),
+    path("products/search/", ProductSearchAPIView.as_view(), name="products-search"),
+    path("products/export/", ProductExportAPIView.as_view(), name="products-export"),
     path("products/<int:product_id>/", ProductAPIView.as_view(), name="product-detail-update-delete"),
     path("categories/", CategoryAPIView.as_view(), name="categories-list-create"),
     path("categories/<int:category_id>/", CategoryAPIView.as_view(), name="category-detail"),
+    path("customers/import/", CustomerImportAPIView.as_view(), name="customers-import"),
+    path("orders/", OrderAPIView.as_view(), name="orders"),
+    path("payments/callbacks/<str:provider>/", PaymentCallbackAPIView.as_view(), name="payment-callback"),
+    path("analytics/sales/", SalesAnalyticsAPIView.as_view(), name="sales-analytics"),
+    path("storefront/<slug:subdomain>/", StorefrontAPIView.as_view(), name="storefront"),
+    path("storefront/<slug:subdomain>/products/", StorefrontProductsAPIView.as_view(), name="storefront-products"),
+    path("async/products/", AsyncProductListView.as_view(), name="async-products-list"),
+    path("async/categories/", AsyncCategoryListView.as_view(), name="async-categories-list"),
+    path("cache/metrics/", CatalogCacheMetricsAPIView.as_view(), name="catalog-cache-metrics"),
 ]
\ No newline at end of file
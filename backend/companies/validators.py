@@ -0,0 +1,256 @@
+# companies/validators.py
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+
+from .models import Category, Customer, Product
+
+# Largest value of an IntegerField on every supported database
+MAX_INTEGER = 2147483647
+
+
+def fit_decimal_field(value, model, field_name, label):
+    """Round ``value`` to the column's decimal places; ValueError when it
+    has more digits than the column can store"""
+    field = model._meta.get_field(field_name)
+    try:
+        value = value.quantize(Decimal(1).scaleb(-field.decimal_places), rounding=ROUND_HALF_UP)
+    except InvalidOperation:
+        raise ValueError(f'{label} is too large')
+    if len(value.as_tuple().digits) > field.max_digits:
+        raise ValueError(f'{label} is too large')
+    return value
+
+
+def clean_product_data(data):
+    """Validate an incoming product payload.
+
+    Accepts the field names used by the dashboard (``originalPrice``,
+    ``reviews``, ``inStock``) and returns keyword arguments for ``Product``.
+    Raises ValueError with a user-facing message on the first invalid field.
+    """
+    # Validate required fields
+    for field in ['name', 'price']:
+        if field not in data or data[field] is None or data[field] == '':
+            raise ValueError(f'{field} is required')
+
+    name = str(data['name'])
+    if len(name) > Product._meta.get_field('name').max_length:
+        raise ValueError('name is too long')
+
+    # Validate price; NaN and Infinity parse but cannot be compared or stored
+    try:
+        price = Decimal(str(data['price']))
+    except (TypeError, ValueError, InvalidOperation):
+        raise ValueError('Invalid price format')
+    if not price.is_finite():
+        raise ValueError('Invalid price format')
+    if price < 0:
+        raise ValueError('Price cannot be negative')
+    price = fit_decimal_field(price, Product, 'price', 'Price')
+
+    # Validate original_price if provided
+    original_price = None
+    if data.get('originalPrice'):
+        try:
+            original_price = Decimal(str(data['originalPrice']))
+        except (TypeError, ValueError, InvalidOperation):
+            raise ValueError('Invalid original price format')
+        if not original_price.is_finite():
+            raise ValueError('Invalid original price format')
+        if original_price < 0:
+            raise ValueError('Original price cannot be negative')
+        original_price = fit_decimal_field(original_price, Product, 'original_price', 'Original price')
+
+    # Validate rating
+    try:
+        rating = float(data.get('rating') or 0)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid rating format')
+    if not (0 <= rating <= 5):
+        raise ValueError('Rating must be between 0 and 5')
+
+    # Validate reviews_count
+    try:
+        reviews_count = int(data.get('reviews') or 0)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid reviews count format')
+    if reviews_count < 0:
+        raise ValueError('Reviews count cannot be negative')
+    if reviews_count > MAX_INTEGER:
+        raise ValueError('Reviews count is too large')
+
+    badge = data.get('badge') or None
+    if badge is not None and badge not in BADGE_CHOICES:
+        raise ValueError('Invalid badge')
+
+    return {
+        'name': name,
+        'description': data.get('description', ''),
+        'price': price,
+        'original_price': original_price,
+        'rating': rating,
+        'reviews_count': reviews_count,
+        'is_available': str(data.get('inStock', 'true')).lower() in ['true', '1', 'yes'],
+        'badge': badge,
+    }
+
+
+def clean_category_names(names):
+    """Normalise a ``categories`` value to a list of unique, non-empty names."""
+    if names is None:
+        return []
+    if isinstance(names, str):
+        names = [names]
+    max_length = Category._meta.get_field('name').max_length
+    cleaned = []
+    for name in names:
+        name = str(name).strip() if name is not None else ''
+        if len(name) > max_length:
+            raise ValueError('Category name is too long')
+        if name and name not in cleaned:
+            cleaned.append(name)
+    return cleaned
+
+
+BADGE_CHOICES = [value for value, _ in Product._meta.get_field('badge').choices]
+
+
+def clean_batch_patch(patch):
+    """Validate the ``patch`` of a batch product update.
+
+    Supported keys: ``price``, ``price_percent`` (e.g. -10 for 10% off),
+    ``is_available``, ``badge``, ``add_categories`` and ``remove_categories``.
+    """
+    if not isinstance(patch, dict) or not patch:
+        raise ValueError('patch must be a non-empty object')
+
+    unknown = set(patch) - {'price', 'price_percent', 'is_available', 'badge', 'add_categories', 'remove_categories'}
+    if unknown:
+        raise ValueError(f'Unsupported patch fields: {", ".join(sorted(unknown))}')
+    if 'price' in patch and 'price_percent' in patch:
+        raise ValueError('Use either price or price_percent, not both')
+
+    cleaned = {}
+    if 'price' in patch:
+        try:
+            cleaned['price'] = Decimal(str(patch['price']))
+        except (TypeError, ValueError, InvalidOperation):
+            raise ValueError('Invalid price format')
+        if not cleaned['price'].is_finite():
+            raise ValueError('Invalid price format')
+        if cleaned['price'] < 0:
+            raise ValueError('Price cannot be negative')
+
+    if 'price_percent' in patch:
+        try:
+            cleaned['price_percent'] = Decimal(str(patch['price_percent']))
+        except (TypeError, ValueError, InvalidOperation):
+            raise ValueError('Invalid price_percent format')
+        if not cleaned['price_percent'].is_finite():
+            raise ValueError('Invalid price_percent format')
+        if cleaned['price_percent'] <= -100:
+            raise ValueError('price_percent must be greater than -100')
+
+    if 'is_available' in patch:
+        cleaned['is_available'] = str(patch['is_available']).lower() in ['true', '1', 'yes']
+
+    if 'badge' in patch:
+        badge = patch['badge'] or None
+        if badge is not None and badge not in BADGE_CHOICES:
+            raise ValueError('Invalid badge')
+        cleaned['badge'] = badge
+
+    for key in ('add_categories', 'remove_categories'):
+        if key in patch:
+            cleaned[key] = clean_category_names(patch[key])
+
+    return cleaned
+
+
+MAX_ORDER_ITEMS = 500
+MAX_ORDER_QUANTITY = 10000
+# Ids are BigAutoFields
+MAX_ID = 2 ** 63 - 1
+
+
+def _positive_int(value, message, maximum=MAX_ID):
+    if isinstance(value, bool):
+        raise ValueError(message)
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(message)
+    if not 1 <= number <= maximum or str(number) != str(value).strip():
+        raise ValueError(message)
+    return number
+
+
+def clean_order_data(data):
+    """Validate an order payload.
+
+    Expects ``customer_id`` and ``items``, a list of ``{"product_id": ..,
+    "quantity": ..}``. Repeated products are merged and may add up to at
+    most MAX_ORDER_QUANTITY. Returns
+    ``(customer_id, {product_id: quantity})``.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Expected an object')
+    if data.get('customer_id') in (None, ''):
+        raise ValueError('customer_id is required')
+    customer_id = _positive_int(data['customer_id'], 'Invalid customer_id')
+
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        raise ValueError('items must be a non-empty list')
+    if len(items) > MAX_ORDER_ITEMS:
+        raise ValueError(f'An order can have at most {MAX_ORDER_ITEMS} items')
+
+    quantities = {}
+    for item in items:
+        if not isinstance(item, dict) or item.get('product_id') in (None, ''):
+            raise ValueError('Every item needs a product_id')
+        product_id = _positive_int(item['product_id'], 'Invalid product_id')
+        quantity = _positive_int(item.get('quantity', 1), 'Quantity must be a positive integer')
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+        if quantities[product_id] > MAX_ORDER_QUANTITY:
+            raise ValueError(f'Quantity cannot be more than {MAX_ORDER_QUANTITY}')
+    return customer_id, quantities
+
+
+def clean_customer_data(data):
+    """Validate a customer row for the bulk upsert.
+
+    The email is required (it is the upsert key). It is kept as written,
+    matching the case-sensitive (user, email) constraint, so existing
+    customers are updated rather than duplicated under another case.
+    Returns keyword arguments for ``Customer``.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Expected an object')
+
+    name = str(data.get('name') or '').strip()
+    if not name:
+        raise ValueError('name is required')
+    if len(name) > Customer._meta.get_field('name').max_length:
+        raise ValueError('name is too long')
+
+    email = str(data.get('email') or '').strip()
+    if not email:
+        raise ValueError('email is required')
+    try:
+        validate_email(email)
+    except ValidationError:
+        raise ValueError('Invalid email')
+
+    phone = str(data.get('phone') or '').strip() or None
+    if phone and len(phone) > Customer._meta.get_field('phone').max_length:
+        raise ValueError('phone is too long')
+
+    return {
+        'name': name,
+        'email': email,
+        'phone': phone,
+        'address': str(data.get('address') or '').strip() or None,
+    }
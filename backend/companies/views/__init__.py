@@ -1,2 +1,12 @@
 from .products import ProductAPIView, CategoryAPIView
 from .admincreation import AssignAdminView
+from .export import ProductExportAPIView
+from .metrics import CatalogCacheMetricsAPIView
+from .bulk import ProductBatchAPIView, ProductImportAPIView
+from .async_catalog import AsyncCategoryListView, AsyncProductListView
+from .search import ProductSearchAPIView
+from .orders import OrderAPIView
+from .analytics import SalesAnalyticsAPIView
+from .customers import CustomerImportAPIView
+from .payments import PaymentCallbackAPIView
+from .storefront import StorefrontAPIView, StorefrontProductsAPIView
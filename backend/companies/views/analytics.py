@@ -0,0 +1,105 @@
+# views/analytics.py
+import datetime
+import logging
+from decimal import Decimal
+
+from django.db.models import F, Sum
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from companies.models import DailySales, ProductDailySales
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RANGE_DAYS = 30
+MAX_RANGE_DAYS = 366 * 5
+TOP_PRODUCTS = 20
+
+
+def money(value):
+    return str(Decimal(value or 0).quantize(Decimal('0.01')))
+
+
+def parse_date_range(query_params):
+    """``start``/``end`` (inclusive, YYYY-MM-DD) defaulting to the last 30 days"""
+    try:
+        end = datetime.date.fromisoformat(query_params['end']) if query_params.get('end') else timezone.localdate()
+        start = (
+            datetime.date.fromisoformat(query_params['start']) if query_params.get('start')
+            else end - datetime.timedelta(days=DEFAULT_RANGE_DAYS - 1)
+        )
+    except ValueError:
+        raise ValueError('Dates must be formatted as YYYY-MM-DD')
+    if end < start:
+        raise ValueError('end must not be before start')
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise ValueError(f'The range can cover at most {MAX_RANGE_DAYS} days')
+    return start, end
+
+
+class SalesAnalyticsAPIView(APIView):
+    """Revenue per day, product and category, read from the sales rollups"""
+
+    def get(self, request):
+        user = request.user
+        try:
+            start, end = parse_date_range(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            rows = {
+                row['date']: row
+                for row in DailySales.objects.filter(user=user, date__range=(start, end))
+                .values('date', 'orders_count', 'items_sold', 'revenue')
+            }
+            days = []
+            day = start
+            while day <= end:
+                row = rows.get(day, {'orders_count': 0, 'items_sold': 0, 'revenue': 0})
+                days.append({
+                    'date': day.isoformat(),
+                    'orders': row['orders_count'],
+                    'items': row['items_sold'],
+                    'revenue': money(row['revenue']),
+                })
+                day += datetime.timedelta(days=1)
+
+            product_sales = ProductDailySales.objects.filter(user=user, date__range=(start, end))
+            products = (
+                product_sales
+                .values('product_id', name=F('product__name'))
+                .annotate(quantity=Sum('quantity'), revenue=Sum('revenue'))
+                .order_by('-revenue', 'product_id')[:TOP_PRODUCTS]
+            )
+            # A product in several categories counts towards each of them
+            categories = (
+                product_sales
+                .filter(product__categories__isnull=False)
+                .values(category=F('product__categories__name'))
+                .annotate(quantity=Sum('quantity'), revenue=Sum('revenue'))
+                .order_by('-revenue', 'category')
+            )
+
+            return Response({
+                'start': start.isoformat(),
+                'end': end.isoformat(),
+                'totals': {
+                    'orders': sum(day['orders'] for day in days),
+                    'items': sum(day['items'] for day in days),
+                    'revenue': money(sum(row['revenue'] for row in rows.values())),
+                },
+                'days': days,
+                'products': [
+                    {**row, 'revenue': money(row['revenue'])} for row in products
+                ],
+                'categories': [
+                    {**row, 'revenue': money(row['revenue'])} for row in categories
+                ],
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.error(f"Error fetching sales analytics for user {user.username}: {str(e)}")
+            return Response({'error': 'Internal server error'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,151 @@
+# companies/views/async_catalog.py
+import logging
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views import View
+from rest_framework import exceptions, status
+
+from companies.cache import acached_catalog_response, acatalog_etag, acatalog_last_modified
+from companies.filters import facet_counts, filter_cache_params, filter_products, parse_product_filters
+from companies.models import Category, Product, StoreConfig
+from companies.pagination import apaginate_by_id, decode_id_cursor, parse_limit
+from companies.serializers import CategorySerializer, ProductSerializer
+from saas.authentication import aauthenticate
+from saas.db_router import ause_replicas
+
+logger = logging.getLogger(__name__)
+
+
+def json_response(data, status=status.HTTP_200_OK):
+    return JsonResponse(data, status=status, encoder=DjangoJSONEncoder, safe=False)
+
+
+async def aget_store_name(user):
+    """Async ``get_store_name``"""
+    config = await StoreConfig.objects.filter(user=user).only('store_name').afirst()
+    if config is None:
+        logger.warning(f"No StoreConfig found for user: {user.username}")
+        return "My Store"
+    return config.store_name
+
+
+async def acatalog_response(request, user, name, params, build):
+    """Async ``catalog_response``: validators, then the cache, then ``build``."""
+    etag = await acatalog_etag(user.id, name, params)
+    last_modified = await acatalog_last_modified(user.id)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        not_modified['ETag'] = etag
+        return not_modified
+
+    data, hit = await acached_catalog_response(user.id, name, params, build)
+    response = json_response(data)
+    response['X-Cache'] = 'HIT' if hit else 'MISS'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+class AsyncCatalogView(View):
+    """Base for catalog reads served natively on the event loop under ASGI.
+
+    Authenticates with the same Firebase tokens as the DRF views, but without
+    going through DRF, whose request cycle is synchronous.
+    """
+    http_method_names = ['get', 'head', 'options']
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            user = await aauthenticate(request)
+        except exceptions.AuthenticationFailed as e:
+            return json_response({'detail': str(e.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+        if user is None:
+            return json_response(
+                {'detail': 'Authentication credentials were not provided.'},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+        request.user = user
+        await ause_replicas(user.id)
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncProductListView(AsyncCatalogView):
+    """Async twin of ``ProductAPIView.get``: same parameters, same cache
+    entries"""
+
+    async def get(self, request):
+        try:
+            user = request.user
+
+            try:
+                limit = parse_limit(request.GET.get('limit'))
+                last_id = decode_id_cursor(request.GET.get('cursor'))
+                filters = parse_product_filters(request.GET)
+            except ValueError as e:
+                return json_response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            include_total = str(request.GET.get('include_total', '')).lower() in ['true', '1', 'yes']
+            include_facets = str(request.GET.get('facets', '')).lower() in ['true', '1', 'yes']
+
+            async def build():
+                products = filter_products(Product.objects.filter(user=user), filters)
+                page, next_cursor = await apaginate_by_id(ProductSerializer.setup_eager_loading(products), last_id, limit)
+                # Everything the serializer touches has been loaded above
+                serializer = ProductSerializer(page, many=True, context={'request': request})
+                data = {
+                    'products': serializer.data,
+                    'count': len(page),
+                    'next': next_cursor,
+                    'total': await products.acount() if include_total else None,
+                    'store': {
+                        'name': await aget_store_name(user),
+                        'owner': user.username
+                    }
+                }
+                if include_facets:
+                    data['facets'] = await sync_to_async(facet_counts)(user, filters)
+                return data
+
+            params = {
+                'host': request.get_host(),
+                'limit': limit,
+                'after': last_id,
+                'include_total': include_total,
+            }
+            if include_facets:
+                params['facets'] = True
+            params.update(filter_cache_params(filters))
+            return await acatalog_response(request, user, 'products', params, build)
+
+        except Exception as e:
+            logger.error(f"Error fetching products: {str(e)}")
+            return json_response({'error': 'Internal server error'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AsyncCategoryListView(AsyncCatalogView):
+    """Async twin of ``CategoryAPIView.get``; shares its cache entries"""
+
+    async def get(self, request):
+        try:
+            user = request.user
+
+            async def build():
+                categories = [category async for category in Category.objects.filter(user=user).order_by('name')]
+                serializer = CategorySerializer(categories, many=True)
+                return {
+                    'categories': serializer.data,
+                    'total': len(serializer.data),
+                    'store': {
+                        'name': await aget_store_name(user),
+                        'owner': user.username
+                    }
+                }
+
+            return await acatalog_response(request, user, 'categories', None, build)
+
+        except Exception as e:
+            logger.error(f"Error fetching categories: {str(e)}")
+            return json_response({'error': 'Internal server error'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,161 @@
+# views/bulk.py
+import csv
+import io
+import logging
+
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from companies.bulk import batch_delete_products, batch_update_products, import_products, select_products
+from companies.filters import parse_filter_object
+from companies.validators import clean_batch_patch, clean_category_names, clean_product_data
+
+logger = logging.getLogger(__name__)
+
+MAX_IMPORT_ROWS = 50000
+CSV_CATEGORY_SEPARATOR = '|'
+
+
+def read_import_rows(request):
+    """Rows of an import request: a CSV upload or a JSON array"""
+    upload = request.FILES.get('file')
+    if upload is not None:
+        reader = csv.DictReader(io.TextIOWrapper(upload, encoding='utf-8-sig'))
+        rows = []
+        for row in reader:
+            categories = row.get('categories') or ''
+            row['categories'] = categories.split(CSV_CATEGORY_SEPARATOR)
+            rows.append(row)
+        return rows
+
+    data = request.data
+    if isinstance(data, dict):
+        data = data.get('products')
+    if not isinstance(data, list):
+        raise ValueError('Expected a CSV file or a JSON array of products')
+    return data
+
+
+class ProductImportAPIView(APIView):
+    """Create many products at once from CSV or JSON.
+
+    Every row is validated before anything is written; if any row fails the
+    import is rejected with the per-row errors. Otherwise all products,
+    categories and links are inserted in one transaction.
+    """
+
+    def post(self, request):
+        user = request.user
+        try:
+            rows = read_import_rows(request)
+        except (ValueError, csv.Error, UnicodeDecodeError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not rows:
+            return Response({'error': 'No products to import'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > MAX_IMPORT_ROWS:
+            return Response(
+                {'error': f'At most {MAX_IMPORT_ROWS} products can be imported at once'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        cleaned, errors = [], []
+        for index, row in enumerate(rows, start=1):
+            if not isinstance(row, dict):
+                errors.append({'row': index, 'error': 'Expected an object'})
+                continue
+            try:
+                cleaned.append((clean_product_data(row), clean_category_names(row.get('categories'))))
+            except ValueError as e:
+                errors.append({'row': index, 'error': str(e)})
+
+        if errors:
+            return Response({
+                'error': 'Import rejected, fix the listed rows and retry',
+                'errors': errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            products = import_products(user, cleaned)
+        except Exception as e:
+            logger.error(f"Error importing products for user {user.username}: {str(e)}")
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        logger.info(f"Imported {len(products)} products for user: {user.username}")
+        return Response({
+            'message': 'Products imported successfully',
+            'imported': len(products),
+            'user': user.username
+        }, status=status.HTTP_201_CREATED)
+
+
+class ProductBatchAPIView(APIView):
+    """Update or delete many products with set-based statements.
+
+    The body selects products with ``ids`` (a list of product ids) and/or
+    ``filter`` (the product list filters of companies.filters as an object:
+    ``category``, ``badge``, ``min_price``, ``max_price``, ``is_available``,
+    ``min_rating``). A selection that matches the whole catalog must say so
+    with ``"all": true``, so a mistyped or empty filter cannot rewrite or
+    delete every product.
+    """
+
+    def get_products(self, request):
+        data = request.data
+        if not isinstance(data, dict):
+            raise ValueError('Provide ids and/or filter to select products')
+        ids = data.get('ids')
+        # bool is an int subclass; true/false are not product ids
+        if ids is not None and (not isinstance(ids, list) or not all(type(i) is int for i in ids)):
+            raise ValueError('ids must be a list of product ids')
+        filters = parse_filter_object(data['filter']) if data.get('filter') is not None else {}
+        select_all = data.get('all') is True
+        if ids is None and not filters and not select_all:
+            raise ValueError('Provide ids and/or a non-empty filter to select products, or "all": true')
+        if select_all and (ids is not None or filters):
+            raise ValueError('"all" cannot be combined with ids or filter')
+        return select_products(request.user, ids=ids, filters=filters)
+
+    def patch(self, request):
+        """Apply ``patch`` to every selected product"""
+        user = request.user
+        try:
+            products = self.get_products(request)
+            patch = clean_batch_patch(request.data.get('patch'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            updated = batch_update_products(user, products, patch)
+        except Exception as e:
+            logger.error(f"Error batch updating products for user {user.username}: {str(e)}")
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        logger.info(f"Batch updated {updated} products for user: {user.username}")
+        return Response({
+            'message': 'Products updated successfully',
+            'updated': updated,
+            'user': user.username
+        }, status=status.HTTP_200_OK)
+
+    def delete(self, request):
+        """Delete every selected product"""
+        user = request.user
+        try:
+            products = self.get_products(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            deleted = batch_delete_products(user, products)
+        except Exception as e:
+            logger.error(f"Error batch deleting products for user {user.username}: {str(e)}")
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        logger.info(f"Batch deleted {deleted} products for user: {user.username}")
+        return Response({
+            'message': 'Products deleted successfully',
+            'deleted': deleted,
+            'user': user.username
+        }, status=status.HTTP_200_OK)
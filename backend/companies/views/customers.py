@@ -0,0 +1,49 @@
+# views/customers.py
+import csv
+import logging
+
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from companies.customers import iter_csv_rows, upsert_customers
+
+logger = logging.getLogger(__name__)
+
+
+class CustomerImportAPIView(APIView):
+    """Insert or update many customers, matched on email.
+
+    Accepts a CSV upload (``file``, columns ``name,email,phone,address``) or
+    a JSON array of the same fields. Valid rows are written even if others
+    are rejected; the response reports inserted, updated and rejected counts.
+    """
+
+    def post(self, request):
+        user = request.user
+        upload = request.FILES.get('file')
+        if upload is not None:
+            rows = iter_csv_rows(upload)
+        else:
+            rows = request.data
+            if isinstance(rows, dict):
+                rows = rows.get('customers')
+            if not isinstance(rows, list):
+                return Response(
+                    {'error': 'Expected a CSV file or a JSON array of customers'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        try:
+            report = upsert_customers(user, rows)
+        except (csv.Error, UnicodeDecodeError) as e:
+            return Response({'error': f'Invalid CSV: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"Error importing customers for user {user.username}: {str(e)}")
+            return Response({'error': 'Internal server error'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        logger.info(
+            f"Imported customers for user {user.username}: {report['inserted']} inserted, "
+            f"{report['updated']} updated, {report['rejected']} rejected"
+        )
+        return Response({'message': 'Customers imported', **report}, status=status.HTTP_200_OK)
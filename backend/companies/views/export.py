@@ -0,0 +1,114 @@
+# views/export.py
+import logging
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import prefetch_related_objects
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from companies.models import Product
+from companies.serializers import ProductSerializer
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'products.ndjson'),
+    'json': ('application/json', 'products.json'),
+}
+
+
+def iter_product_chunks(queryset, chunk_size):
+    """Yield lists of products read through a server-side cursor.
+
+    Memory stays bounded by the chunk size whatever the size of the catalog.
+    """
+    rows = queryset.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+async def aiter_product_chunks(queryset, chunk_size):
+    """Async ``iter_product_chunks``"""
+    chunk = []
+    async for product in queryset.aiterator(chunk_size=chunk_size):
+        chunk.append(product)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def encode_chunk(encoder, chunk, output, context, first):
+    """One chunk of the export body; categories are prefetched per chunk"""
+    prefetch_related_objects(chunk, 'categories')
+    rows = ProductSerializer(chunk, many=True, context=context).data
+    if output == 'json':
+        body = ','.join(encoder.encode(row) for row in rows)
+        return body if first else ',' + body
+    return ''.join(encoder.encode(row) + '\n' for row in rows)
+
+
+def stream_products(queryset, output, context):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    first = True
+    if output == 'json':
+        yield '['
+    for chunk in iter_product_chunks(queryset, EXPORT_CHUNK_SIZE):
+        yield encode_chunk(encoder, chunk, output, context, first)
+        first = False
+    if output == 'json':
+        yield ']'
+
+
+async def astream_products(queryset, output, context):
+    """Async ``stream_products``.
+
+    Under ASGI Django would drain a sync iterator into a list before
+    sending anything, so the export is streamed from an async one there.
+    """
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    encode = sync_to_async(encode_chunk)
+    first = True
+    if output == 'json':
+        yield '['
+    async for chunk in aiter_product_chunks(queryset, EXPORT_CHUNK_SIZE):
+        yield await encode(encoder, chunk, output, context, first)
+        first = False
+    if output == 'json':
+        yield ']'
+
+
+class ProductExportAPIView(APIView):
+    """Stream the user's whole catalog as NDJSON or a JSON array"""
+
+    def get(self, request):
+        user = request.user
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            return Response(
+                {'error': f'output must be one of: {", ".join(EXPORT_FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        content_type, filename = EXPORT_FORMATS[output]
+        products = Product.objects.filter(user=user).select_related('primary_category').order_by('id')
+
+        logger.info(f"Exporting products as {output} for user: {user.username}")
+        stream = astream_products if isinstance(request._request, ASGIRequest) else stream_products
+        response = StreamingHttpResponse(
+            stream(products, output, {'request': request}),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
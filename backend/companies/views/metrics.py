@@ -0,0 +1,14 @@
+# views/metrics.py
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from companies.cache import catalog_cache_metrics
+
+
+class CatalogCacheMetricsAPIView(APIView):
+    """Hit/miss counters of the catalog response cache"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(catalog_cache_metrics(), status=status.HTTP_200_OK)
@@ -0,0 +1,77 @@
+# views/orders.py
+import logging
+
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from companies.models import Order
+from companies.orders import OrderError, place_order
+from companies.pagination import decode_created_cursor, paginate_by_created, parse_limit
+from companies.serializers import OrderSerializer, OrderSummarySerializer
+from companies.validators import clean_order_data
+
+logger = logging.getLogger(__name__)
+
+
+class OrderAPIView(APIView):
+    """API for orders"""
+
+    def get(self, request):
+        """Get a page of the user's orders, newest first.
+
+        Pass ``limit`` and the ``next`` cursor of the previous page to
+        continue, ``status`` to filter, and ``product=summary`` for a slim
+        product (id, name, price, image) in each item. The page is loaded
+        with a fixed number of queries whatever its size.
+        """
+        user = request.user
+        try:
+            limit = parse_limit(request.query_params.get('limit'))
+            after = decode_created_cursor(request.query_params.get('cursor'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        summary = request.query_params.get('product') == 'summary'
+        serializer_class = OrderSummarySerializer if summary else OrderSerializer
+
+        try:
+            orders = Order.objects.filter(user=user)
+            if request.query_params.get('status'):
+                orders = orders.filter(status=request.query_params['status'])
+            page, next_cursor = paginate_by_created(
+                serializer_class.setup_eager_loading(orders, summary=summary), after, limit
+            )
+            serializer = serializer_class(page, many=True, context={'request': request})
+            return Response({
+                'orders': serializer.data,
+                'count': len(page),
+                'next': next_cursor,
+            }, status=status.HTTP_200_OK)
+        except Exception as e:
+            logger.error(f"Error fetching orders for user {user.username}: {str(e)}")
+            return Response({'error': 'Internal server error'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def post(self, request):
+        """Place an order for one of the user's customers"""
+        user = request.user
+        try:
+            customer_id, quantities = clean_order_data(request.data)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            order = place_order(user, customer_id, quantities)
+        except OrderError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"Error placing order for user {user.username}: {str(e)}")
+            return Response({'error': 'Internal server error'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        logger.info(f"Created order {order.id} for user: {user.username}")
+        return Response({
+            'message': 'Order created successfully',
+            'order_id': order.id,
+            'total_amount': str(order.total_amount),
+            'status': order.status,
+            'items': len(quantities),
+        }, status=status.HTTP_201_CREATED)
@@ -0,0 +1,49 @@
+# views/payments.py
+import hmac
+import logging
+
+from django.conf import settings
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from companies.payments import stage_callback
+
+logger = logging.getLogger(__name__)
+
+
+def callback_token_valid(request):
+    expected = getattr(settings, 'PAYMENT_CALLBACK_TOKEN', None)
+    if not expected:
+        return False
+    token = request.headers.get('X-Callback-Token') or request.query_params.get('token') or ''
+    return hmac.compare_digest(token.encode('utf-8'), expected.encode('utf-8'))
+
+
+class PaymentCallbackAPIView(APIView):
+    """Receives payment provider callbacks.
+
+    Only stages the callback (one INSERT, idempotent on the provider's
+    transaction id); ``manage.py process_payment_callbacks`` applies them.
+    Providers authenticate with the shared PAYMENT_CALLBACK_TOKEN, not with
+    Firebase.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request, provider):
+        if not callback_token_valid(request):
+            return Response({'error': 'Invalid callback token'}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            transaction_id = stage_callback(provider, request.data)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"Error staging {provider} callback: {str(e)}")
+            return Response({'error': 'Internal server error'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        if provider == 'mpesa':
+            # Daraja expects this acknowledgement body
+            return Response({'ResultCode': 0, 'ResultDesc': 'Accepted'}, status=status.HTTP_200_OK)
+        return Response({'message': 'Callback accepted', 'transaction_id': transaction_id}, status=status.HTTP_200_OK)
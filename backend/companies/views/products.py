@@ -6,42 +6,106 @@ from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from decimal import Decimal
 import logging
 from companies.serializers import CategorySerializer, ProductSerializer
 from companies.models import Category, Product, StoreConfig
+from companies.pagination import decode_id_cursor, paginate_by_id, parse_limit
+from companies.bulk import resolve_category_ids
+from companies.filters import facet_counts, filter_cache_params, filter_products, parse_product_filters
+from companies.images import schedule_image_variants
+from companies.validators import clean_category_names, clean_product_data
+from companies.cache import cached_catalog_response, catalog_etag, catalog_last_modified
+from saas.db_router import ReplicaReadMixin
 
 logger = logging.getLogger(__name__)
 
-class ProductAPIView(APIView):
+
+def get_store_name(user):
+    """Store name from the user's StoreConfig, with the default fallback"""
+    try:
+        return StoreConfig.objects.get(user=user).store_name
+    except StoreConfig.DoesNotExist:
+        logger.warning(f"No StoreConfig found for user: {user.username}")
+        return "My Store"
+
+
+def catalog_response(request, user, name, params, build):
+    """Answer a catalog read from its validators, the cache, or ``build``.
+
+    Conditional requests whose ETag/Last-Modified still match get a 304
+    before anything is serialized.
+    """
+    etag = catalog_etag(user.id, name, params)
+    last_modified = catalog_last_modified(user.id)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        not_modified['ETag'] = etag
+        return not_modified
+
+    data, hit = cached_catalog_response(user.id, name, params, build)
+    response = Response(data, status=status.HTTP_200_OK)
+    response['X-Cache'] = 'HIT' if hit else 'MISS'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+class ProductAPIView(ReplicaReadMixin, APIView):
     """API for products management"""
     # permission_classes = [IsAdminUser]
 
     def get(self, request):
-        """Get all products for the user"""
+        """Get a page of the user's products, newest first.
+
+        Pass ``limit`` and the ``next`` cursor of the previous page to continue.
+        ``include_total=true`` adds the product count. The list can be narrowed
+        with the filters of companies.filters; ``facets=true`` adds the counts
+        per category, badge, availability, price range and rating. Responses
+        are cached per catalog version, see companies.cache.
+        """
         try:
             user = request.user
 
-            # Get store config for additional metadata
             try:
-                store_config = StoreConfig.objects.get(user=user)
-                store_name = store_config.store_name
-            except StoreConfig.DoesNotExist:
-                store_name = "My Store"
-
-            products = Product.objects.filter(user=user).prefetch_related('categories').order_by('-id')
-            print("products", products) 
-            serializer = ProductSerializer(products, many=True, context={'request': request})
-            print("serializer.data", serializer.data)
-
-            return Response({
-                'products': serializer.data,
-                'total': len(serializer.data),
-                'store': {
-                    'name': store_name,
-                    'owner': user.username
+                limit = parse_limit(request.query_params.get('limit'))
+                last_id = decode_id_cursor(request.query_params.get('cursor'))
+                filters = parse_product_filters(request.query_params)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            include_total = str(request.query_params.get('include_total', '')).lower() in ['true', '1', 'yes']
+            include_facets = str(request.query_params.get('facets', '')).lower() in ['true', '1', 'yes']
+
+            def build():
+                products = filter_products(Product.objects.filter(user=user), filters)
+                page, next_cursor = paginate_by_id(ProductSerializer.setup_eager_loading(products), last_id, limit)
+                serializer = ProductSerializer(page, many=True, context={'request': request})
+                data = {
+                    'products': serializer.data,
+                    'count': len(page),
+                    'next': next_cursor,
+                    'total': products.count() if include_total else None,
+                    'store': {
+                        'name': get_store_name(user),
+                        'owner': user.username
+                    }
                 }
-            }, status=status.HTTP_200_OK)
+                if include_facets:
+                    data['facets'] = facet_counts(user, filters)
+                return data
+
+            params = {
+                'host': request.get_host(),
+                'limit': limit,
+                'after': last_id,
+                'include_total': include_total,
+            }
+            if include_facets:
+                params['facets'] = True
+            params.update(filter_cache_params(filters))
+            return catalog_response(request, user, 'products', params, build)
 
         except Exception as e:
             logger.error(f"Error fetching products: {str(e)}")
@@ -52,88 +116,20 @@ class ProductAPIView(APIView):
         try:
             user = request.user
             data = request.data
-            print("data", data)
-
-            # Validate required fields
-            required_fields = ['name', 'price']
-            for field in required_fields:
-                if field not in data or data[field] is None or data[field] == '':
-                    return Response(
-                        {'error': f'{field} is required'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
 
-            # Validate price
             try:
-                price = Decimal(str(data['price']))
-                if price < 0:
-                    return Response(
-                        {'error': 'Price cannot be negative'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-            except (TypeError, ValueError, Decimal.InvalidOperation):
-                return Response(
-                    {'error': 'Invalid price format'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            # Validate original_price if provided
-            original_price = None
-            if data.get('originalPrice'):
-                try:
-                    original_price = Decimal(str(data['originalPrice']))
-                    if original_price < 0:
-                        return Response(
-                            {'error': 'Original price cannot be negative'},
-                            status=status.HTTP_400_BAD_REQUEST
-                        )
-                except (TypeError, ValueError, Decimal.InvalidOperation):
-                    return Response(
-                        {'error': 'Invalid original price format'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-
-            # Validate rating
-            try:
-                rating = float(data.get('rating', 0))
-                if not (0 <= rating <= 5):
-                    return Response(
-                        {'error': 'Rating must be between 0 and 5'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-            except (TypeError, ValueError):
-                return Response(
-                    {'error': 'Invalid rating format'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            # Validate reviews_count
-            try:
-                reviews_count = int(data.get('reviews', 0))
-                if reviews_count < 0:
-                    return Response(
-                        {'error': 'Reviews count cannot be negative'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-            except (TypeError, ValueError):
-                return Response(
-                    {'error': 'Invalid reviews count format'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+                fields = clean_product_data(data)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
             # Create product
             product = Product.objects.create(
                 user=user,
-                name=data.get('name', ''),
-                description=data.get('description', ''),
-                price=price,
-                original_price=original_price,
-                image = request.FILES.get('image', None),
-                rating=rating,
-                reviews_count=reviews_count,
-                is_available=str(data.get('inStock', 'true')).lower() in ['true', '1', 'yes'],
-                badge=data.get('badge', None)
+                image=request.FILES.get('image', None),
+                **fields
             )
+            if product.image:
+                schedule_image_variants(product)
 
             # Handle categories
             category_names = data.get('categories', [])
@@ -215,8 +211,13 @@ class ProductAPIView(APIView):
                         status=status.HTTP_400_BAD_REQUEST
                     )
 
+            image_changed = False
             if 'image' in data:
+                previous_image = product.image.name
                 product.image = data['image'] or ''
+                image_changed = product.image.name != previous_image or bool(request.FILES.get('image'))
+                if image_changed:
+                    product.image_variants = {}
 
             if 'rating' in data and data['rating'] is not None:
                 try:
@@ -255,23 +256,24 @@ class ProductAPIView(APIView):
                 product.badge = data['badge']
 
             product.save()
+            if image_changed and product.image:
+                schedule_image_variants(product)
 
-            # Update categories
+            # Update categories: only write the difference to the through table
             if 'categories' in data:
-                product.categories.clear()
-                category_names = data['categories']
-                if isinstance(category_names, str):
-                    category_names = [category_names]
-
-                for cat_name in category_names:
-                    if not cat_name:
-                        continue
-                    category, created = Category.objects.get_or_create(
-                        user=user,
-                        name=cat_name,
-                        defaults={'description': f'{cat_name} products'}
-                    )
-                    product.categories.add(category)
+                if hasattr(data, 'getlist'):
+                    requested = clean_category_names(data.getlist('categories'))
+                else:
+                    requested = clean_category_names(data['categories'])
+                current = dict(product.categories.values_list('name', 'id'))
+
+                removed_ids = [cat_id for name, cat_id in current.items() if name not in requested]
+                if removed_ids:
+                    product.categories.remove(*removed_ids)
+
+                added_names = [name for name in requested if name not in current]
+                if added_names:
+                    product.categories.add(*resolve_category_ids(user, added_names).values())
 
             logger.info(f"Updated product {product_id} for user: {user.username}")
             return Response({
@@ -311,7 +313,7 @@ class ProductAPIView(APIView):
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 @method_decorator(csrf_exempt, name='dispatch')
-class CategoryAPIView(APIView):
+class CategoryAPIView(ReplicaReadMixin, APIView):
     """API for categories management"""
     permission_classes = [IsAuthenticated]
 
@@ -321,25 +323,19 @@ class CategoryAPIView(APIView):
             user = request.user
             logger.debug(f"Fetching categories for user: {user.username}")
 
-            # Get store config for additional metadata
-            try:
-                store_config = StoreConfig.objects.get(user=user)
-                store_name = store_config.store_name
-            except StoreConfig.DoesNotExist:
-                store_name = "My Store"
-                logger.warning(f"No StoreConfig found for user: {user.username}")
-
-            categories = Category.objects.filter(user=user).order_by('name')
-            serializer = CategorySerializer(categories, many=True)
-
-            return Response({
-                'categories': serializer.data,
-                'total': len(serializer.data),
-                'store': {
-                    'name': store_name,
-                    'owner': user.username
+            def build():
+                categories = Category.objects.filter(user=user).order_by('name')
+                serializer = CategorySerializer(categories, many=True)
+                return {
+                    'categories': serializer.data,
+                    'total': len(serializer.data),
+                    'store': {
+                        'name': get_store_name(user),
+                        'owner': user.username
+                    }
                 }
-            }, status=status.HTTP_200_OK)
+
+            return catalog_response(request, user, 'categories', None, build)
 
         except Exception as e:
             logger.error(f"Error fetching categories: {str(e)}")
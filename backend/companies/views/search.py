@@ -0,0 +1,78 @@
+# views/search.py
+import logging
+
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from companies.models import Product
+from companies.pagination import decode_score_cursor, encode_cursor, parse_limit
+from companies.search import search_products, search_terms
+from companies.serializers import ProductSerializer
+from companies.views.products import catalog_response
+
+logger = logging.getLogger(__name__)
+
+SEARCH_PAGE_SIZE = 20
+
+
+class ProductSearchAPIView(APIView):
+    """Full-text search over the user's products"""
+
+    def get(self, request):
+        """Ranked products matching ``q`` in their name, categories or description.
+
+        Each result carries its ``rank`` and a ``highlight`` of the name and
+        description with matches wrapped in ``<mark>``. Pass the ``next``
+        cursor to get the following page.
+        """
+        try:
+            user = request.user
+            query = request.query_params.get('q', '')
+            if not search_terms(query):
+                return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+            try:
+                limit = parse_limit(request.query_params.get('limit'), default=SEARCH_PAGE_SIZE)
+                after = decode_score_cursor(request.query_params.get('cursor'))
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            def build():
+                matches = search_products(user.id, query, after=after, limit=limit + 1)
+                next_cursor = None
+                if len(matches) > limit:
+                    matches = matches[:limit]
+                    next_cursor = encode_cursor({'score': matches[-1][1], 'id': matches[-1][0]})
+
+                products = ProductSerializer.setup_eager_loading(
+                    Product.objects.filter(user=user, pk__in=[match[0] for match in matches])
+                ).in_bulk()
+                matches = [match for match in matches if match[0] in products]
+                serializer = ProductSerializer(
+                    [products[match[0]] for match in matches], many=True, context={'request': request}
+                )
+                results = []
+                for data, (_, score, name, description) in zip(serializer.data, matches):
+                    data['rank'] = score
+                    data['highlight'] = {'name': name, 'description': description}
+                    results.append(data)
+
+                return {
+                    'query': query,
+                    'results': results,
+                    'count': len(results),
+                    'next': next_cursor,
+                }
+
+            params = {
+                'host': request.get_host(),
+                'q': query,
+                'limit': limit,
+                'after': after,
+            }
+            return catalog_response(request, user, 'search', params, build)
+
+        except Exception as e:
+            logger.error(f"Error searching products: {str(e)}")
+            return Response({'error': 'Internal server error'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
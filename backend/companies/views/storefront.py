@@ -0,0 +1,154 @@
+# views/storefront.py
+import logging
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework import permissions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from companies.cache import cached_catalog_response, catalog_etag, catalog_last_modified
+from companies.filters import filter_cache_params, filter_products, parse_product_filters
+from companies.models import Category, Product, StoreConfig
+from companies.pagination import decode_id_cursor, paginate_by_id, parse_limit
+from companies.serializers import CategorySerializer, ProductSerializer, StoreConfigSerializer
+from companies.tenants import lookup_tenant, normalize_subdomain
+from saas.db_router import ReplicaReadMixin
+
+logger = logging.getLogger(__name__)
+
+
+def surrogate_keys(tenant):
+    """Cache tags of a tenant's storefront responses.
+
+    Purging ``tenant-<user id>`` on the proxy drops one store;
+    ``storefront`` drops them all.
+    """
+    return f'storefront tenant-{tenant.user_id}'
+
+
+def add_public_cache_headers(response, tenant):
+    patch_cache_control(
+        response,
+        public=True,
+        max_age=getattr(settings, 'STOREFRONT_CACHE_MAX_AGE', 60),
+        s_maxage=getattr(settings, 'STOREFRONT_CACHE_S_MAXAGE', 300),
+        stale_while_revalidate=getattr(settings, 'STOREFRONT_STALE_WHILE_REVALIDATE', 600),
+    )
+    keys = surrogate_keys(tenant)
+    response['Surrogate-Key'] = keys  # Fastly, Varnish
+    response['Cache-Tag'] = keys.replace(' ', ',')  # Cloudflare, Akamai
+    return response
+
+
+def storefront_response(request, tenant, name, params, build):
+    """``catalog_response`` for anonymous readers, with shared-cache headers.
+
+    Entries live under the tenant's catalog version, so the dashboard's
+    writes invalidate them like any other catalog read.
+    """
+    name = f'storefront:{name}'
+    etag = catalog_etag(tenant.user_id, name, params)
+    last_modified = catalog_last_modified(tenant.user_id)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        not_modified['ETag'] = etag
+        return add_public_cache_headers(not_modified, tenant)
+
+    data, hit = cached_catalog_response(tenant.user_id, name, params, build)
+    response = Response(data, status=status.HTTP_200_OK)
+    response['X-Cache'] = 'HIT' if hit else 'MISS'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return add_public_cache_headers(response, tenant)
+
+
+class StorefrontView(ReplicaReadMixin, APIView):
+    """Base for the public, read-only storefront API.
+
+    Shoppers are anonymous: no authentication or permission work runs, and
+    the store is found from the subdomain in the URL through the in-memory
+    tenant map (companies.tenants).
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+    # One representation per URL, so a CDN never serves the browsable API
+    renderer_classes = [JSONRenderer]
+    http_method_names = ['get', 'head', 'options']
+
+    def initial(self, request, *args, **kwargs):
+        self.tenant = lookup_tenant(normalize_subdomain(kwargs.get('subdomain')))
+        super().initial(request, *args, **kwargs)
+
+    def replica_owner(self, request):
+        return self.tenant.user_id if self.tenant is not None else None
+
+    def store_not_found(self):
+        return Response({'error': 'Store not found'}, status=status.HTTP_404_NOT_FOUND)
+
+
+class StorefrontAPIView(StorefrontView):
+    def get(self, request, subdomain):
+        """Store configuration and categories of one store"""
+        tenant = self.tenant
+        if tenant is None:
+            return self.store_not_found()
+        try:
+            def build():
+                config = StoreConfig.objects.filter(user_id=tenant.user_id).first()
+                categories = Category.objects.filter(user_id=tenant.user_id).order_by('name')
+                return {
+                    'store': StoreConfigSerializer(config or StoreConfig(user_id=tenant.user_id)).data,
+                    'business_name': tenant.business_name,
+                    'subdomain': tenant.subdomain,
+                    'categories': CategorySerializer(categories, many=True).data,
+                }
+
+            return storefront_response(request, tenant, 'home', None, build)
+
+        except Exception as e:
+            logger.error(f"Error fetching storefront {subdomain}: {str(e)}")
+            return Response({'error': 'Internal server error'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class StorefrontProductsAPIView(StorefrontView):
+    def get(self, request, subdomain):
+        """A page of one store's products, newest first.
+
+        Takes the ``limit``/``cursor`` pagination and the filters of
+        ``ProductAPIView.get``.
+        """
+        tenant = self.tenant
+        if tenant is None:
+            return self.store_not_found()
+        try:
+            try:
+                limit = parse_limit(request.query_params.get('limit'))
+                last_id = decode_id_cursor(request.query_params.get('cursor'))
+                filters = parse_product_filters(request.query_params)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            def build():
+                products = filter_products(Product.objects.filter(user_id=tenant.user_id), filters)
+                page, next_cursor = paginate_by_id(ProductSerializer.setup_eager_loading(products), last_id, limit)
+                serializer = ProductSerializer(page, many=True, context={'request': request})
+                return {
+                    'products': serializer.data,
+                    'count': len(page),
+                    'next': next_cursor,
+                }
+
+            params = {
+                'host': request.get_host(),
+                'limit': limit,
+                'after': last_id,
+            }
+            params.update(filter_cache_params(filters))
+            return storefront_response(request, tenant, 'products', params, build)
+
+        except Exception as e:
+            logger.error(f"Error fetching storefront products {subdomain}: {str(e)}")
+            return Response({'error': 'Internal server error'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
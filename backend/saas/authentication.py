@@ -1,10 +1,19 @@
 # saas/authentication.py
+import copy
 import os
 import firebase_admin
-from firebase_admin import auth, credentials
+from asgiref.sync import sync_to_async
+from firebase_admin import credentials
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from rest_framework import authentication, exceptions
 
+from saas.token_verifier import GOOGLE_CERTS_URL, FirebaseTokenVerifier, PublicKeyCache
+from saas.ttl_cache import TTLCache
+
 # Build absolute path to firebase-key.json
 current_dir = os.path.dirname(os.path.abspath(__file__))
 cred_path = os.path.join(current_dir, "firebase-key.json")
@@ -15,6 +24,123 @@ if not firebase_admin._apps:
 
 User = get_user_model()
 
+# Verifies ID tokens against Google's signing keys held in memory instead of
+# going through firebase_admin on every request.
+token_verifier = FirebaseTokenVerifier(
+    project_id=getattr(settings, 'FIREBASE_PROJECT_ID', None) or firebase_admin.get_app().project_id,
+    key_cache=PublicKeyCache(url=getattr(settings, 'FIREBASE_CERTS_URL', GOOGLE_CERTS_URL)),
+    token_cache_size=getattr(settings, 'FIREBASE_TOKEN_CACHE_SIZE', 10000),
+)
+
+# uid -> (user, claims fingerprint). Kept per process and, optionally, in the
+# shared Django cache so most requests never touch the auth_user table.
+user_cache = TTLCache(
+    maxsize=getattr(settings, 'FIREBASE_USER_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'FIREBASE_USER_CACHE_TTL', 60),
+)
+
+
+def _user_cache_key(uid):
+    return f'auth:user:{uid}'
+
+
+def claims_fingerprint(decoded_token):
+    """Fingerprint of the claims we mirror onto the Django user."""
+    return 'admin' if decoded_token.get('admin', False) else 'user'
+
+
+def forget_user(uid):
+    user_cache.delete(uid)
+    if getattr(settings, 'FIREBASE_USER_CACHE_SHARED', True):
+        cache.delete(_user_cache_key(uid))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def _invalidate_cached_user(sender, instance, **kwargs):
+    forget_user(instance.username)
+
+
+def _cached_user(uid):
+    entry = user_cache.get(uid)
+    if entry is None and getattr(settings, 'FIREBASE_USER_CACHE_SHARED', True):
+        entry = cache.get(_user_cache_key(uid))
+        if entry is not None:
+            user_cache.set(uid, entry)
+    return entry
+
+
+def _store_user(uid, user, fingerprint):
+    entry = (user, fingerprint)
+    user_cache.set(uid, entry)
+    if getattr(settings, 'FIREBASE_USER_CACHE_SHARED', True):
+        cache.set(_user_cache_key(uid), entry, user_cache.ttl)
+
+
+def resolve_user(decoded_token):
+    """Return the Django user for a verified token, creating it if needed."""
+    uid = decoded_token['uid']
+    fingerprint = claims_fingerprint(decoded_token)
+
+    entry = _cached_user(uid)
+    if entry is not None and entry[1] == fingerprint:
+        # Hand out a copy so concurrent requests never share one instance
+        return copy.copy(entry[0])
+
+    if entry is not None:
+        user = copy.copy(entry[0])
+    else:
+        user, created = User.objects.get_or_create(
+            username=uid,
+            defaults={
+                'email': decoded_token.get('email', ''),
+                'first_name': decoded_token.get('name', '').split(' ')[0] if decoded_token.get('name') else '',
+                'last_name': decoded_token.get('name', '').split(' ')[-1] if decoded_token.get('name') else '',
+            }
+        )
+
+    # Sync admin claim with Django staff/superuser
+    is_admin = decoded_token.get("admin", False)
+    if is_admin and (not user.is_staff or not user.is_superuser):
+        user.is_staff = True
+        user.is_superuser = True
+        user.save(update_fields=["is_staff", "is_superuser"])
+    elif not is_admin and (user.is_staff or user.is_superuser):
+        # Optional: demote if claim removed
+        user.is_staff = False
+        user.is_superuser = False
+        user.save(update_fields=["is_staff", "is_superuser"])
+
+    _store_user(uid, user, fingerprint)
+    return copy.copy(user)
+
+
+async def aresolve_user(decoded_token):
+    """Async ``resolve_user``; only goes to a thread when the cache misses."""
+    entry = user_cache.get(decoded_token['uid'])
+    if entry is not None and entry[1] == claims_fingerprint(decoded_token):
+        return copy.copy(entry[0])
+    return await sync_to_async(resolve_user)(decoded_token)
+
+
+async def aauthenticate(request):
+    """Authenticate a plain (non-DRF) async view request.
+
+    Returns the user, or None when no Authorization header was sent; raises
+    AuthenticationFailed for a bad token.
+    """
+    auth_header = request.META.get('HTTP_AUTHORIZATION')
+    if not auth_header:
+        return None
+
+    try:
+        id_token = auth_header.split(' ').pop()
+        decoded_token = await token_verifier.averify(id_token)
+        return await aresolve_user(decoded_token)
+    except Exception as e:
+        raise exceptions.AuthenticationFailed(f'Invalid authentication token: {str(e)}')
+
+
 class FirebaseAuthentication(authentication.BaseAuthentication):
     def authenticate(self, request):
         auth_header = request.META.get('HTTP_AUTHORIZATION')
@@ -23,30 +149,8 @@ class FirebaseAuthentication(authentication.BaseAuthentication):
 
         try:
             id_token = auth_header.split(' ').pop()
-            decoded_token = auth.verify_id_token(id_token)
-            uid = decoded_token['uid']
-
-            user, created = User.objects.get_or_create(
-                username=uid,
-                defaults={
-                    'email': decoded_token.get('email', ''),
-                    'first_name': decoded_token.get('name', '').split(' ')[0] if decoded_token.get('name') else '',
-                    'last_name': decoded_token.get('name', '').split(' ')[-1] if decoded_token.get('name') else '',
-                }
-            )
-
-            # Sync admin claim with Django staff/superuser
-            is_admin = decoded_token.get("admin", False)
-            if is_admin and (not user.is_staff or not user.is_superuser):
-                user.is_staff = True
-                user.is_superuser = True
-                user.save(update_fields=["is_staff", "is_superuser"])
-            elif not is_admin and (user.is_staff or user.is_superuser):
-                # Optional: demote if claim removed
-                user.is_staff = False
-                user.is_superuser = False
-                user.save(update_fields=["is_staff", "is_superuser"])
-
+            decoded_token = token_verifier.verify(id_token)
+            user = resolve_user(decoded_token)
             return (user, None)
 
         except Exception as e:
@@ -0,0 +1,158 @@
+# saas/db_router.py
+"""Read-replica routing.
+
+Reads go to a replica only inside a request whose view opted in with
+``use_replicas`` (the catalog and storefront GETs); everything else,
+including every write, stays on ``default``. Once a request writes, the
+rest of it reads from the primary, and ReplicaPinMiddleware keeps users who
+wrote (with POST, PUT, ...) on the primary for REPLICA_PIN_SECONDS so their
+next reads see the change despite replication lag.
+"""
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+PRIMARY = 'default'
+
+
+class RequestState:
+    """Routing decisions of one request, shared with the threads it uses"""
+    __slots__ = ('replica', 'wrote')
+
+    def __init__(self):
+        self.replica = None
+        self.wrote = False
+
+
+_state = ContextVar('db_request_state', default=None)
+
+
+def replica_aliases():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def _pin_key(user_id):
+    return f'db:pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    cache.set(_pin_key(user_id), True, getattr(settings, 'REPLICA_PIN_SECONDS', 10))
+
+
+def _choose_replica(state, pinned):
+    # Earlier writes (e.g. authentication creating the user) are unrelated
+    # to what the view is about to read
+    replicas = replica_aliases()
+    if state is None or pinned or not replicas:
+        return None
+    # One replica per request, so every read sees the same point in time
+    state.replica = random.choice(replicas)
+    return state.replica
+
+
+def use_replicas(user_id=None):
+    """Let the rest of the current request read from a replica.
+
+    Does nothing outside ReplicaPinMiddleware, without replicas, or while
+    ``user_id``'s recent writes may not have replicated yet. Returns the
+    chosen alias or None.
+    """
+    state = _state.get()
+    if state is None:
+        return None
+    return _choose_replica(state, user_id is not None and cache.get(_pin_key(user_id)))
+
+
+async def ause_replicas(user_id=None):
+    """Async ``use_replicas``"""
+    state = _state.get()
+    if state is None:
+        return None
+    return _choose_replica(state, user_id is not None and await cache.aget(_pin_key(user_id)))
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.replica is None:
+            return None
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            # The request now reads its own writes
+            state.replica = None
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaReadMixin:
+    """For APIViews whose safe requests may be answered from a replica.
+
+    ``replica_owner`` names the tenant whose writes must be visible.
+    """
+
+    def replica_owner(self, request):
+        return request.user.id
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            use_replicas(self.replica_owner(request))
+
+
+class ReplicaPinMiddleware:
+    """Tracks the routing of each request and pins writers to the primary."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RequestState()
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote and request.method not in SAFE_METHODS:
+            self._pin_writer(request)
+        return response
+
+    async def __acall__(self, request):
+        state = RequestState()
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote and request.method not in SAFE_METHODS:
+            # request.user may still be a lazy, session-backed object
+            await sync_to_async(self._pin_writer)(request)
+        return response
+
+    @staticmethod
+    def _pin_writer(request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            pin_to_primary(user.id)
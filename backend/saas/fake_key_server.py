@@ -0,0 +1,84 @@
+# saas/fake_key_server.py
+"""An offline stand-in for Google's token signing key endpoint, used by the
+token verifier tests and the bench_token_verification command."""
+import datetime
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import jwt
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+
+
+def make_signing_key(kid):
+    """Return (private_key, pem_certificate) for a throwaway RSA key."""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, kid)])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(private_key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(private_key, hashes.SHA256())
+    )
+    return private_key, cert.public_bytes(serialization.Encoding.PEM).decode('utf-8')
+
+
+class FakeKeyServer:
+    """Serves x509 certificates the way Google's securetoken endpoint does."""
+
+    def __init__(self, max_age=3600):
+        self.certs = {}
+        self.max_age = max_age
+        self.hits = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.hits += 1
+                body = json.dumps(server.certs).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Cache-Control', f'public, max-age={server.max_age}, must-revalidate')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = HTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_port}/certs'
+
+    def add_key(self, kid):
+        private_key, pem = make_signing_key(kid)
+        self.certs[kid] = pem
+        return private_key
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def make_token(private_key, kid, project_id, **overrides):
+    now = int(time.time())
+    claims = {
+        'iss': f'https://securetoken.google.com/{project_id}',
+        'aud': project_id,
+        'sub': 'user-123',
+        'iat': now,
+        'exp': now + 3600,
+        'email': 'owner@example.com',
+    }
+    claims.update(overrides)
+    return jwt.encode(claims, private_key, algorithm='RS256', headers={'kid': kid})
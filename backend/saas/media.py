@@ -0,0 +1,61 @@
+# saas/media.py
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.views.decorators.http import require_safe
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Names written by saas.storage.ContentAddressedStorage: [dir/]ab/cd/abcd<sha256>.ext
+CONTENT_ADDRESSED_RE = re.compile(r'(?:[^/]+/)?([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}(?:\.[^/.]+)?')
+# Storefront snapshots (companies.snapshots) are rewritten in place
+SNAPSHOT_CACHE_CONTROL = 'public, max-age=0, must-revalidate'
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve an uploaded file.
+
+    Content-addressed names are cached forever. Files uploaded before
+    ContentAddressedStorage keep their names and can be overwritten, so they
+    get MEDIA_CACHE_MAX_AGE (one hour by default) instead.
+
+    With MEDIA_ACCEL_REDIRECT_PREFIX (nginx) or MEDIA_SENDFILE (Apache,
+    lighttpd) the web server sends the bytes and the worker only returns
+    headers; the FileResponse fallback is for development.
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except Exception:
+        raise Http404('Invalid media path')
+
+    content_type, encoding = mimetypes.guess_type(path)
+    content_type = content_type or 'application/octet-stream'
+
+    accel_prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', None)
+    if accel_prefix:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{path}"
+    elif getattr(settings, 'MEDIA_SENDFILE', False):
+        if not os.path.isfile(full_path):
+            raise Http404('Media file not found')
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = full_path
+    else:
+        if not os.path.isfile(full_path):
+            raise Http404('Media file not found')
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+
+    snapshot_dir = getattr(settings, 'STOREFRONT_SNAPSHOT_DIR', 'storefronts').strip('/')
+    if path.startswith(f'{snapshot_dir}/'):
+        response['Cache-Control'] = SNAPSHOT_CACHE_CONTROL
+    elif CONTENT_ADDRESSED_RE.fullmatch(path):
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    else:
+        response['Cache-Control'] = f"public, max-age={getattr(settings, 'MEDIA_CACHE_MAX_AGE', 3600)}"
+    return response
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -49,6 +50,8 @@ MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'middleware.tenant_middleware.TenantMiddleware',
+    'saas.db_router.ReplicaPinMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -87,9 +90,23 @@ DATABASES = {
         'PASSWORD': 'saas1234',
         'HOST': 'localhost',
         'PORT': '5432',
+        # Persistent connections, checked before each request reuses them
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Read replicas (saas.db_router): each host in DATABASE_REPLICA_HOSTS
+# (comma-separated) becomes an alias replica1, replica2, ... with the
+# primary's credentials. Catalog and storefront GETs read from them.
+for _index, _host in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_HOSTS', '').split(',')), 1):
+    DATABASES[f'replica{_index}'] = {**DATABASES['default'], 'HOST': _host.strip(), 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['saas.db_router.ReplicaRouter']
+# Seconds a tenant reads from the primary after writing; keep above the replication lag
+REPLICA_PIN_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -160,3 +177,78 @@ CORS_ALLOW_ALL_ORIGINS = True
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# Uploads are stored under their content hash (saas.storage), so identical
+# files are shared and their URLs can be cached as immutable. Files uploaded
+# before that keep their old names and are cached for MEDIA_CACHE_MAX_AGE.
+STORAGES = {
+    'default': {'BACKEND': 'saas.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# Let the web server send media bytes instead of a Python worker (saas.media).
+# nginx: set to the `internal` location aliasing MEDIA_ROOT, e.g. '/protected-media/'
+MEDIA_ACCEL_REDIRECT_PREFIX = None
+# Apache mod_xsendfile / lighttpd
+MEDIA_SENDFILE = False
+MEDIA_CACHE_MAX_AGE = 3600
+
+# Shared cache, required: catalog versions (companies.cache), resolved users
+# (saas.authentication), tenant invalidations (companies.tenants) and replica
+# pins (saas.db_router) must be seen by every worker process. The checks in
+# companies.checks refuse to start on a process-local backend.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', 'redis://localhost:6379/0'),
+    }
+}
+# Only for single-process setups (the test runner): allow LocMemCache
+ALLOW_PROCESS_LOCAL_CACHE = False
+
+# Firebase ID token verification
+FIREBASE_CERTS_URL = 'https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com'
+FIREBASE_TOKEN_CACHE_SIZE = 10000
+FIREBASE_USER_CACHE_TTL = 60  # seconds a resolved uid -> user mapping is trusted
+FIREBASE_USER_CACHE_SHARED = True  # also keep resolved users in the default cache
+
+# Host -> tenant resolution (middleware.tenant_middleware). Each process
+# trusts its own copy for TENANT_CACHE_TTL seconds after a profile changes.
+TENANT_CACHE_TTL = 30
+TENANT_CACHE_SIZE = 20000
+TENANT_SHARED_CACHE_TIMEOUT = 3600
+
+# Catalog response cache (companies.cache); entries are keyed by a per-tenant
+# catalog version, so this only bounds how long unused entries linger.
+CATALOG_CACHE_TIMEOUT = 300
+
+# Cache-Control of the public storefront API (companies.views.storefront):
+# browsers keep responses for max-age, CDNs for s-maxage and may serve them
+# stale while refetching. Purge a store early by its `tenant-<id>` surrogate key.
+STOREFRONT_CACHE_MAX_AGE = 60
+STOREFRONT_CACHE_S_MAXAGE = 300
+STOREFRONT_STALE_WHILE_REVALIDATE = 600
+
+# Pre-rendered storefront documents (companies.snapshots), written to
+# MEDIA_ROOT/STOREFRONT_SNAPSHOT_DIR once a store's catalog has been quiet for
+# STOREFRONT_SNAPSHOT_DEBOUNCE seconds. `pip install brotli` adds .br copies.
+STOREFRONT_SNAPSHOTS = True
+STOREFRONT_SNAPSHOT_DIR = 'storefronts'
+STOREFRONT_SNAPSHOT_DEBOUNCE = 5
+
+# Text search configuration of the PostgreSQL product search index
+# (companies.search); run rebuild_search_index after changing it.
+SEARCH_CONFIG = 'english'
+
+# Worker threads resizing uploaded product images (companies.images)
+IMAGE_VARIANT_WORKERS = 2
+
+# Shared secret payment providers must send with their callbacks, as the
+# X-Callback-Token header or the `token` query parameter. Callbacks are
+# refused while it is unset.
+PAYMENT_CALLBACK_TOKEN = os.environ.get('PAYMENT_CALLBACK_TOKEN')
+# A callback can arrive before its order is visible: it is retried every
+# PAYMENT_CALLBACK_RETRY_DELAY seconds and rejected only once it is older
+# than PAYMENT_CALLBACK_RETRY_WINDOW seconds.
+PAYMENT_CALLBACK_RETRY_DELAY = 30
+PAYMENT_CALLBACK_RETRY_WINDOW = 3600
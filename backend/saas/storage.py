@@ -0,0 +1,36 @@
+# saas/storage.py
+import hashlib
+import os
+import posixpath
+
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """File storage that names every file after the SHA-256 of its content.
+
+    ``products/photo.png`` is stored as ``products/ab/cd/abcd....png``. The
+    same bytes uploaded twice, by any tenant, end up as one file, and since a
+    name can never point at different content the files can be cached
+    forever. Because files are shared, callers must not delete them when one
+    referencing row goes away.
+    """
+
+    content_addressed = True
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+
+        top_dir = name.replace('\\', '/').split('/')[0] if '/' in name else ''
+        ext = os.path.splitext(name)[1].lower()
+        return posixpath.join(top_dir, digest[:2], digest[2:4], f'{digest}{ext}')
+
+    def _save(self, name, content):
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
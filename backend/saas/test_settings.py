@@ -0,0 +1,31 @@
+# saas/test_settings.py
+"""Settings for running the test suite without PostgreSQL:
+
+    python manage.py test --settings=saas.test_settings
+
+Two local SQLite files stand in for the primary and a read replica. The
+replica is not replicated to and starts out unused; the routing tests
+enable it and seed it themselves. No Redis is needed either.
+"""
+from saas.settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db-replica.sqlite3',
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+    },
+}
+
+DATABASE_REPLICAS = []
+
+# The test runner is a single process
+CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+ALLOW_PROCESS_LOCAL_CACHE = True
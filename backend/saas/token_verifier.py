@@ -0,0 +1,177 @@
+# saas/token_verifier.py
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+import urllib.request
+
+import jwt
+from asgiref.sync import sync_to_async
+from cryptography import x509
+
+from saas.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_CERTS_URL = (
+    'https://www.googleapis.com/robot/v1/metadata/x509/'
+    'securetoken@system.gserviceaccount.com'
+)
+
+MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+
+class InvalidTokenError(ValueError):
+    pass
+
+
+class PublicKeyCache:
+    """Keeps Google's token signing keys in memory.
+
+    Keys are refreshed according to the ``Cache-Control: max-age`` header of
+    the certificate endpoint. Once a key set is close to expiry the refresh
+    happens on a background thread while requests keep using the old keys.
+    """
+
+    def __init__(self, url=GOOGLE_CERTS_URL, refresh_margin=300, min_refresh_interval=30, timeout=10):
+        self.url = url
+        self.refresh_margin = refresh_margin
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self._keys = {}
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def _fetch(self):
+        with urllib.request.urlopen(self.url, timeout=self.timeout) as response:
+            certs = json.loads(response.read().decode('utf-8'))
+            cache_control = response.headers.get('Cache-Control', '')
+
+        match = MAX_AGE_RE.search(cache_control)
+        max_age = int(match.group(1)) if match else 3600
+
+        keys = {
+            kid: x509.load_pem_x509_certificate(pem.encode('utf-8')).public_key()
+            for kid, pem in certs.items()
+        }
+        now = time.monotonic()
+        self._keys = keys
+        self._fetched_at = now
+        self._expires_at = now + max_age
+        logger.debug(f"Fetched {len(keys)} signing keys, valid for {max_age}s")
+
+    def _background_refresh(self):
+        try:
+            with self._lock:
+                self._fetch()
+        except Exception as e:
+            logger.warning(f"Background signing key refresh failed: {str(e)}")
+        finally:
+            self._refreshing = False
+
+    def get_keys(self):
+        now = time.monotonic()
+        if self._keys and now < self._expires_at - self.refresh_margin:
+            return self._keys
+
+        if self._keys and now < self._expires_at:
+            # Still valid: serve the current keys and refresh off the request path.
+            if not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target=self._background_refresh, daemon=True).start()
+            return self._keys
+
+        with self._lock:
+            if not self._keys or time.monotonic() >= self._expires_at:
+                self._fetch()
+        return self._keys
+
+    def get_key(self, kid):
+        key = self.get_keys().get(kid)
+        if key is not None:
+            return key
+
+        # Google rotates keys ahead of time; an unknown kid usually means our
+        # copy is stale. Refetch, but never hammer the endpoint.
+        with self._lock:
+            if time.monotonic() - self._fetched_at >= self.min_refresh_interval:
+                self._fetch()
+        return self._keys.get(kid)
+
+
+class FirebaseTokenVerifier:
+    """Verifies Firebase ID tokens locally.
+
+    Performs the same checks as ``firebase_admin.auth.verify_id_token`` but
+    against an in-memory key cache, and remembers already verified tokens
+    (keyed by their SHA-256) until they expire.
+    """
+
+    def __init__(self, project_id, key_cache=None, token_cache_size=10000, clock_skew=0):
+        if not project_id:
+            raise ValueError('A Firebase project ID is required to verify ID tokens')
+        self.project_id = project_id
+        self.issuer = f'https://securetoken.google.com/{project_id}'
+        self.key_cache = key_cache or PublicKeyCache()
+        self.token_cache = TTLCache(maxsize=token_cache_size)
+        self.clock_skew = clock_skew
+
+    def verify(self, id_token):
+        token_hash = hashlib.sha256(id_token.encode('utf-8')).hexdigest()
+        cached = self.token_cache.get(token_hash)
+        if cached is not None:
+            return dict(cached)
+
+        decoded = self._decode(id_token)
+        ttl = decoded['exp'] - time.time()
+        self.token_cache.set(token_hash, decoded, ttl=ttl)
+        return dict(decoded)
+
+    async def averify(self, id_token):
+        """Async ``verify``: cached tokens are answered on the event loop,
+        the rest are decoded in a worker thread (a key refresh may block)."""
+        token_hash = hashlib.sha256(id_token.encode('utf-8')).hexdigest()
+        cached = self.token_cache.get(token_hash)
+        if cached is not None:
+            return dict(cached)
+        return await sync_to_async(self.verify, thread_sensitive=False)(id_token)
+
+    def _decode(self, id_token):
+        try:
+            header = jwt.get_unverified_header(id_token)
+        except jwt.PyJWTError as e:
+            raise InvalidTokenError(f'Malformed ID token: {str(e)}')
+
+        if header.get('alg') != 'RS256':
+            raise InvalidTokenError('ID token has incorrect algorithm')
+        kid = header.get('kid')
+        if not kid:
+            raise InvalidTokenError('ID token has no "kid" claim')
+
+        key = self.key_cache.get_key(kid)
+        if key is None:
+            raise InvalidTokenError('ID token was signed with an unknown key')
+
+        try:
+            decoded = jwt.decode(
+                id_token,
+                key,
+                algorithms=['RS256'],
+                audience=self.project_id,
+                issuer=self.issuer,
+                leeway=self.clock_skew,
+                options={'require': ['exp', 'iat', 'aud', 'iss', 'sub']},
+            )
+        except jwt.PyJWTError as e:
+            raise InvalidTokenError(str(e))
+
+        sub = decoded.get('sub')
+        if not isinstance(sub, str) or not sub or len(sub) > 128:
+            raise InvalidTokenError('ID token has an invalid "sub" claim')
+
+        decoded['uid'] = sub
+        return decoded
@@ -12,23 +12,29 @@ const ProductsContent = ({ isDarkMode }) => {
   const [loading, setLoading] = useState(false);
   const [deleteModalVisible, setDeleteModalVisible] = useState(false);
   const [productToDelete, setProductToDelete] = useState(null);
+  // Cursor of the next page; null once every product has been loaded
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  // Fetch one page of products, newest first
+  const fetchProducts = async (cursor = null) => {
+    const setBusy = cursor ? setLoadingMore : setLoading;
+    setBusy(true);
+    try {
+      const response = await api.get('/api/products/', {
+        params: cursor ? { cursor } : {},
+      });
+      const page = response.data.products || [];
+      setProducts((prev) => (cursor ? [...prev, ...page] : page));
+      setNextCursor(response.data.next || null);
+    } catch (err) {
+      message.error(err.response?.data?.error || 'Failed to fetch products');
+    } finally {
+      setBusy(false);
+    }
+  };
 
-  // Fetch products
   useEffect(() => {
-    const fetchProducts = async () => {
-      setLoading(true);
-      try {
-        const response = await api.get('/api/products/');
-        console.log('response', response.data);
-
-        setProducts(response.data.products || []);
-      } catch (err) {
-        message.error(err.response?.data?.error || 'Failed to fetch products');
-      } finally {
-        setLoading(false);
-      }
-    };
-
     fetchProducts();
   }, []);
 
@@ -44,7 +50,8 @@ const ProductsContent = ({ isDarkMode }) => {
         message.success('Product updated successfully');
       } else {
         const response = await api.post('/api/products/', formData);
-        setProducts((prev) => [...prev, response.data]);
+        // The list is newest first
+        setProducts((prev) => [response.data, ...prev]);
         message.success('Product created successfully');
       }
     } catch (err) {
@@ -184,6 +191,19 @@ const ProductsContent = ({ isDarkMode }) => {
         </div>
       </div>
 
+      {/* Load more */}
+      {nextCursor && (
+        <div className="flex justify-center">
+          <button
+            onClick={() => fetchProducts(nextCursor)}
+            disabled={loadingMore}
+            className="px-4 py-2 rounded-lg border border-gray-300 dark:border-gray-600 hover:bg-gray-100 dark:hover:bg-gray-700 transition-colors disabled:opacity-50"
+          >
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
+
       {/* Product Modal */}
       <ProductModal
         isOpen={isModalOpen}